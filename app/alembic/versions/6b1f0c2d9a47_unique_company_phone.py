@@ -0,0 +1,52 @@
+"""unique company_phone
+
+Revision ID: 6b1f0c2d9a47
+Revises: d449fe0b9f5f
+Create Date: 2026-10-17 09:12:41.530214
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "6b1f0c2d9a47"
+down_revision: Union[str, None] = "d449fe0b9f5f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Collapse leads that share a phone number onto the oldest row before
+    # the unique index is created, keeping their owner info attached.
+    op.execute(
+        """
+        UPDATE businessownerinfo AS o
+        SET business_lead_id = d.keep_id
+        FROM (
+            SELECT id, MIN(id) OVER (PARTITION BY company_phone) AS keep_id
+            FROM businesslead
+        ) AS d
+        WHERE o.business_lead_id = d.id AND d.id <> d.keep_id
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM businesslead AS b
+        USING businesslead AS k
+        WHERE b.company_phone = k.company_phone AND b.id > k.id
+        """
+    )
+    op.create_index(
+        op.f("ix_businesslead_company_phone"),
+        "businesslead",
+        ["company_phone"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f("ix_businesslead_company_phone"), table_name="businesslead"
+    )
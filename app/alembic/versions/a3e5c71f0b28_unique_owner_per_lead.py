@@ -0,0 +1,42 @@
+"""unique owner per lead
+
+Revision ID: a3e5c71f0b28
+Revises: 6b1f0c2d9a47
+Create Date: 2026-10-17 19:58:12.304117
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a3e5c71f0b28"
+down_revision: Union[str, None] = "6b1f0c2d9a47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Earlier scrapes appended a new owner on every update of a lead, keep
+    # the most recent one, the relationship only ever exposed one.
+    op.execute(
+        """
+        DELETE FROM businessownerinfo AS o
+        USING businessownerinfo AS k
+        WHERE o.business_lead_id = k.business_lead_id AND o.id < k.id
+        """
+    )
+    op.create_index(
+        op.f("ix_businessownerinfo_business_lead_id"),
+        "businessownerinfo",
+        ["business_lead_id"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f("ix_businessownerinfo_business_lead_id"),
+        table_name="businessownerinfo",
+    )
@@ -0,0 +1,92 @@
+"""credit ledger
+
+Revision ID: a5d1e7c3f940
+Revises: f3b9c6e1d258
+Create Date: 2026-10-17 23:41:27.530214
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a5d1e7c3f940"
+down_revision: Union[str, None] = "f3b9c6e1d258"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "credit",
+        sa.Column(
+            "reserved_credit", sa.Integer(), nullable=False, server_default="0"
+        ),
+    )
+    op.create_table(
+        "monthlyusage",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("month", sa.Date(), nullable=False),
+        sa.Column("credits_used", sa.Integer(), nullable=False),
+        sa.Column("money_spent", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("user_id", "month"),
+    )
+
+    # balance rows for users that only reserved free credits so far
+    op.execute(
+        """
+        INSERT INTO credit (
+            user_id, total_credit, used_credit, created_at, updated_at
+        )
+        SELECT DISTINCT r.user_id, 0, 0, now(), now()
+        FROM reservedcredit r
+        WHERE r.status = 'reserved'
+          AND NOT EXISTS (SELECT 1 FROM credit c WHERE c.user_id = r.user_id)
+        """
+    )
+    # on one balance row per user, b2c8f4a6d371 sums the duplicate rows
+    op.execute(
+        """
+        UPDATE credit SET reserved_credit = r.total
+        FROM (
+            SELECT user_id, sum(credits_reserved) AS total
+            FROM reservedcredit
+            WHERE status = 'reserved'
+            GROUP BY user_id
+        ) r
+        WHERE credit.id = (
+            SELECT min(c.id) FROM credit c WHERE c.user_id = r.user_id
+        )
+        """
+    )
+    op.alter_column("credit", "reserved_credit", server_default=None)
+
+    op.execute(
+        """
+        INSERT INTO monthlyusage (user_id, month, credits_used, money_spent)
+        SELECT user_id, date_trunc('month', search_time)::date,
+               sum(credits_used), 0
+        FROM searchhistory
+        WHERE user_id IS NOT NULL AND credits_used <> 0
+        GROUP BY 1, 2
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO monthlyusage (user_id, month, credits_used, money_spent)
+        SELECT user_id, date_trunc('month', created_at)::date, 0, sum(amount)
+        FROM transaction
+        WHERE user_id IS NOT NULL AND status = 'succeeded'
+        GROUP BY 1, 2
+        ON CONFLICT (user_id, month)
+        DO UPDATE SET money_spent = excluded.money_spent
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("monthlyusage")
+    op.drop_column("credit", "reserved_credit")
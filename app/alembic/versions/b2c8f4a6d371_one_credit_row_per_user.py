@@ -0,0 +1,65 @@
+"""one credit row per user
+
+Revision ID: b2c8f4a6d371
+Revises: a5d1e7c3f940
+Create Date: 2026-10-18 00:36:52.417085
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b2c8f4a6d371"
+down_revision: Union[str, None] = "a5d1e7c3f940"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # get_credit could race into a second row for a user, fold those into
+    # the oldest one
+    op.execute(
+        """
+        UPDATE credit SET
+            total_credit = d.total_credit,
+            used_credit = d.used_credit,
+            reserved_credit = d.reserved_credit
+        FROM (
+            SELECT min(id) AS id, sum(total_credit) AS total_credit,
+                   sum(used_credit) AS used_credit,
+                   sum(reserved_credit) AS reserved_credit
+            FROM credit
+            GROUP BY user_id
+            HAVING count(*) > 1
+        ) d
+        WHERE credit.id = d.id
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM credit c
+        USING credit keep
+        WHERE keep.user_id = c.user_id AND keep.id < c.id
+        """
+    )
+    op.create_index(
+        op.f("ix_credit_user_id"), "credit", ["user_id"], unique=True
+    )
+
+    # every user gets a balance row, credit changes only update it
+    op.execute(
+        """
+        INSERT INTO credit (
+            user_id, total_credit, used_credit, reserved_credit,
+            created_at, updated_at
+        )
+        SELECT id, 0, 0, 0, now(), now() FROM "user"
+        ON CONFLICT (user_id) DO NOTHING
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_credit_user_id"), table_name="credit")
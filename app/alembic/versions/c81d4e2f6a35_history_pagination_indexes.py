@@ -0,0 +1,41 @@
+"""history pagination indexes
+
+Revision ID: c81d4e2f6a35
+Revises: a3e5c71f0b28
+Create Date: 2026-10-17 21:14:40.512093
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c81d4e2f6a35"
+down_revision: Union[str, None] = "a3e5c71f0b28"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Pages of a user's history are read in (time, id) order, a backward
+    # scan of these indexes serves both offset and keyset pages.
+    op.create_index(
+        "ix_searchhistory_user_id_search_time_id",
+        "searchhistory",
+        ["user_id", "search_time", "id"],
+    )
+    op.create_index(
+        "ix_transaction_user_id_created_at_id",
+        "transaction",
+        ["user_id", "created_at", "id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_transaction_user_id_created_at_id", table_name="transaction"
+    )
+    op.drop_index(
+        "ix_searchhistory_user_id_search_time_id", table_name="searchhistory"
+    )
@@ -0,0 +1,32 @@
+"""trigram search indexes
+
+Revision ID: d47a9b3c1e82
+Revises: c81d4e2f6a35
+Create Date: 2026-10-17 21:52:06.118740
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d47a9b3c1e82"
+down_revision: Union[str, None] = "c81d4e2f6a35"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # lower(x) ILIKE '%query%' and similarity(lower(x), query) can both use
+    # a trigram index on the same expression. Business types are searched
+    # in memory, see app/workflows/business_types.py
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        "CREATE INDEX ix_address_city_trgm "
+        "ON address USING gin (lower(city) gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_address_city_trgm", table_name="address")
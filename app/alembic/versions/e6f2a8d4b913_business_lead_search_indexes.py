@@ -0,0 +1,98 @@
+"""business lead search indexes
+
+Revision ID: e6f2a8d4b913
+Revises: d47a9b3c1e82
+Create Date: 2026-10-17 22:31:47.260415
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e6f2a8d4b913"
+down_revision: Union[str, None] = "d47a9b3c1e82"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # businesslead holds millions of rows, the indexes are built without
+    # blocking the ingestion of new leads
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_businesslead_business_type_state_city",
+            "businesslead",
+            ["business_type", "state", "city"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_businesslead_business_type_city",
+            "businesslead",
+            ["business_type", "city"],
+            postgresql_concurrently=True,
+        )
+        # a prefix of both indexes above
+        op.drop_index(
+            "ix_businesslead_business_type",
+            table_name="businesslead",
+            postgresql_concurrently=True,
+        )
+
+        # the upsert on company_phone keeps using the unique index, which
+        # now covers id as well
+        op.create_index(
+            "ix_businesslead_company_phone_id",
+            "businesslead",
+            ["company_phone"],
+            unique=True,
+            postgresql_include=["id"],
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_businesslead_company_phone",
+            table_name="businesslead",
+            postgresql_concurrently=True,
+        )
+        op.execute(
+            "ALTER INDEX ix_businesslead_company_phone_id "
+            "RENAME TO ix_businesslead_company_phone"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_businesslead_company_phone_key",
+            "businesslead",
+            ["company_phone"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_businesslead_company_phone",
+            table_name="businesslead",
+            postgresql_concurrently=True,
+        )
+        op.execute(
+            "ALTER INDEX ix_businesslead_company_phone_key "
+            "RENAME TO ix_businesslead_company_phone"
+        )
+
+        op.create_index(
+            "ix_businesslead_business_type",
+            "businesslead",
+            ["business_type"],
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_businesslead_business_type_city",
+            table_name="businesslead",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_businesslead_business_type_state_city",
+            table_name="businesslead",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,36 @@
+"""people lead address index
+
+Revision ID: f3b9c6e1d258
+Revises: e6f2a8d4b913
+Create Date: 2026-10-17 23:08:15.904377
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f3b9c6e1d258"
+down_revision: Union[str, None] = "e6f2a8d4b913"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_peoplelead_state_city_street",
+            "peoplelead",
+            ["state", "city", "street"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_peoplelead_state_city_street",
+            table_name="peoplelead",
+            postgresql_concurrently=True,
+        )
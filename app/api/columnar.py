@@ -0,0 +1,155 @@
+import io
+import json
+import types
+import typing
+from collections.abc import Iterable, Iterator, Sequence
+from datetime import datetime
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlmodel import SQLModel
+
+from app.models import BusinessLead, BusinessOwnerInfo, PeopleLead
+
+STRING_MAP = pa.map_(pa.string(), pa.string())
+
+_ARROW_TYPES = {
+    str: pa.string(),
+    int: pa.int64(),
+    float: pa.float64(),
+    datetime: pa.timestamp("us"),
+    # JSON columns
+    list: pa.list_(pa.string()),
+    dict: STRING_MAP,
+}
+
+
+def _arrow_type(model: type[SQLModel], name: str) -> pa.DataType:
+    annotation = model.model_fields[name].annotation
+    if isinstance(annotation, types.UnionType):
+        # optional fields, X | None
+        (annotation,) = (
+            arg for arg in typing.get_args(annotation) if arg is not type(None)
+        )
+    return _ARROW_TYPES[typing.get_origin(annotation) or annotation]
+
+
+def arrow_schema(
+    source: str, headers: list[str], view: str = "default"
+) -> pa.Schema:
+    """
+    Arrow schema of an export with the given headers, typed after the
+    model fields. The expanded people view has one phone and one email
+    per row instead of lists.
+    """
+    model = BusinessLead if source == "business" else PeopleLead
+    expanded = source != "business" and view != "default"
+    fields = []
+    for header in headers:
+        if "." in header:
+            arrow_type = _arrow_type(BusinessOwnerInfo, header.split(".")[1])
+        elif expanded and header in ("phones", "emails"):
+            arrow_type = pa.string()
+        else:
+            arrow_type = _arrow_type(model, header)
+        fields.append(pa.field(header, arrow_type))
+    return pa.schema(fields)
+
+
+def _string_map(value: dict | None) -> dict[str, str] | None:
+    # scraped JSON objects may hold nested values, those are kept as JSON
+    if value is None:
+        return None
+    return {
+        key: (
+            item if item is None or isinstance(item, str) else json.dumps(item)
+        )
+        for key, item in value.items()
+    }
+
+
+def record_batch(
+    schema: pa.Schema, rows: Sequence[Sequence[Any]]
+) -> pa.RecordBatch:
+    columns = list(zip(*rows, strict=True)) if rows else [()] * len(schema)
+    arrays = []
+    for column, field in zip(columns, schema, strict=True):
+        if field.type == STRING_MAP:
+            column = [_string_map(value) for value in column]
+        arrays.append(pa.array(column, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _ChunkSink(io.RawIOBase):
+    # file object for the arrow writers that hands out what was written
+    # since the last drain
+    def __init__(self) -> None:
+        self.parts: list[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def _stream(
+    writer: Any,
+    sink: _ChunkSink,
+    schema: pa.Schema,
+    chunks: Iterable[Sequence[Sequence[Any]]],
+) -> Iterator[bytes]:
+    for rows in chunks:
+        writer.write_batch(record_batch(schema, rows))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def stream_arrow(
+    schema: pa.Schema, chunks: Iterable[Sequence[Sequence[Any]]]
+) -> Iterator[bytes]:
+    # Arrow IPC stream format, one zstd compressed record batch per chunk
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(
+        sink, schema, options=pa.ipc.IpcWriteOptions(compression="zstd")
+    )
+    yield sink.drain()
+    yield from _stream(writer, sink, schema, chunks)
+
+
+def stream_parquet(
+    schema: pa.Schema, chunks: Iterable[Sequence[Sequence[Any]]]
+) -> Iterator[bytes]:
+    # one row group per chunk, the footer is written once all are sent
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    yield from _stream(writer, sink, schema, chunks)
+
+
+# format -> (stream, media type, file name)
+COLUMNAR_FORMATS = {
+    "arrow": (
+        stream_arrow,
+        "application/vnd.apache.arrow.stream",
+        "file.arrow",
+    ),
+    "parquet": (
+        stream_parquet,
+        "application/vnd.apache.parquet",
+        "file.parquet",
+    ),
+}
@@ -8,11 +8,13 @@ from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
 from sqlmodel import Session
 
+from app import crud
 from app.core import security
 from app.core.config import settings
 from app.core.db import engine
 from app.core.logs import get_logger
-from app.models import TokenPayload, User
+from app.models import TokenPayload, User, UserPublic
+from app.workflows.user_cache import get_user_snapshot
 
 logger = get_logger()
 
@@ -31,8 +33,19 @@ SessionDep = Annotated[Session, Depends(get_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
-def get_current_user(session: SessionDep, token: TokenDep) -> User:
-    logger.info("Getting current user")
+def find_user_by_email(session: Session, email: str) -> User | None:
+    """
+    Look the user up and give the connection back to the pool, for routes
+    that await bcrypt next. The user is detached with its columns loaded.
+    Lookup and release run in one thread, a burst of requests waiting for
+    connections cannot hold the threads that would release them.
+    """
+    user = crud.get_user_by_email(session=session, email=email)
+    session.close()
+    return user
+
+
+def _token_user_id(token: str) -> int | None:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
@@ -44,19 +57,41 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = session.get(User, token_data.sub)
+    return token_data.sub
+
+
+def _check_user(user: User | UserPublic | None) -> None:
     if not user:
         logger.error("Could not get user")
         raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
         logger.error("User is not active")
         raise HTTPException(status_code=400, detail="Inactive user")
-    return user
+
+
+def get_current_user(session: SessionDep, token: TokenDep) -> User:
+    logger.info("Getting current user")
+    user = session.get(User, _token_user_id(token))
+    _check_user(user)
+    return user  # type: ignore
 
 
 CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
+def get_current_identity(session: SessionDep, token: TokenDep) -> UserPublic:
+    """
+    Cached read-only snapshot of the current user, for routes that do not
+    change the user. Most requests are answered without a query.
+    """
+    snapshot = get_user_snapshot(session, _token_user_id(token))  # type: ignore
+    _check_user(snapshot)
+    return snapshot  # type: ignore
+
+
+CurrentIdentity = Annotated[UserPublic, Depends(get_current_identity)]
+
+
 def get_current_active_superuser(current_user: CurrentUser) -> User:
     if not current_user.is_superuser:
         logger.exception("User is not a superuser")
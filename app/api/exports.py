@@ -0,0 +1,118 @@
+import zlib
+from collections.abc import Callable, Iterable, Iterator
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import Integer, any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine import Row
+from sqlmodel import Session, select
+from sqlmodel.sql.expression import Select
+
+from app.core.db import engine
+from app.models import BusinessLead, BusinessOwnerInfo, PeopleLead
+
+# leads per query, or per fetch of a server-side cursor, of an export
+EXPORT_CHUNK_SIZE = 1000
+
+
+def in_new_session(
+    export: Callable[..., Iterator[Any]], *args: Any
+) -> Iterator[Any]:
+    # a streamed response is sent after the request session is closed,
+    # so the export runs in a session of its own
+    with Session(engine) as session:
+        yield from export(session, *args)
+
+
+def gzip_stream(chunks: Iterable[str]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def lead_columns(source: str, headers: list[str]) -> list[Any]:
+    # the column behind every export header, employee.* is the owner
+    model = BusinessLead if source == "business" else PeopleLead
+    return [
+        (
+            getattr(BusinessOwnerInfo, header.split(".", 1)[1])
+            if "." in header
+            else getattr(model, header)
+        )
+        for header in headers
+    ]
+
+
+def _lead_rows(source: str, headers: list[str], *columns: Any) -> Select:
+    statement = select(*lead_columns(source, headers), *columns)
+    if source == "business":
+        statement = statement.select_from(BusinessLead).outerjoin(
+            BusinessOwnerInfo
+        )
+    return statement
+
+
+def _expand_people_row(row: Row, phones: int, emails: int) -> list[tuple]:
+    # one row per phone and email combination
+    expanded = []
+    for phone in row[phones] or [None]:
+        for email in row[emails] or [None]:
+            values = list(row)
+            values[phones], values[emails] = phone, email
+            expanded.append(tuple(values))
+    return expanded
+
+
+def iter_search_history_rows(
+    session: Session,
+    source: str,
+    lead_ids: list[int],
+    headers: list[str],
+    view: str = "default",
+) -> Iterator[list[Row] | list[tuple]]:
+    """
+    Column tuples of the leads of a search history, one value per header,
+    in chunks of EXPORT_CHUNK_SIZE and in the order they were found.
+    """
+    model = BusinessLead if source == "business" else PeopleLead
+    expand = source != "business" and view != "default"
+    for start in range(0, len(lead_ids), EXPORT_CHUNK_SIZE):
+        ids = lead_ids[start : start + EXPORT_CHUNK_SIZE]
+        statement = _lead_rows(source, headers, model.id).where(
+            model.id == any_(bindparam("ids", ids, type_=ARRAY(Integer)))
+        )
+        rows = {row[-1]: row[:-1] for row in session.exec(statement)}
+
+        chunk = [rows[lead_id] for lead_id in ids if lead_id in rows]
+        if expand:
+            phones, emails = headers.index("phones"), headers.index("emails")
+            chunk = [
+                expanded
+                for row in chunk
+                for expanded in _expand_people_row(row, phones, emails)
+            ]
+        yield chunk
+
+
+def iter_admin_rows(
+    session: Session,
+    source: str,
+    headers: list[str],
+    received_date: datetime | None = None,
+) -> Iterator[list[Row]]:
+    """
+    Column tuples of all leads of a source, one value per header, newest
+    first, in chunks of EXPORT_CHUNK_SIZE fetched from a server-side cursor.
+    """
+    model = BusinessLead if source == "business" else PeopleLead
+    statement = _lead_rows(source, headers)
+    if received_date:
+        statement = statement.where(model.received_date >= received_date)
+    statement = statement.order_by(model.received_date.desc())
+    yield from session.exec(
+        statement.execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    ).partitions()
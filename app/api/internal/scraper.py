@@ -1,12 +1,20 @@
-from fastapi import APIRouter, BackgroundTasks, responses, status
+from typing import Any
 
-from app.api.deps import ScrapperAuthTokenDep, SessionDep
+from fastapi import APIRouter, Request, responses, status
+
+from app.api.deps import ScrapperAuthTokenDep
 from app.core.logs import get_logger
+from app.core.tasks.ingestion_queue import enqueue_batch
+from app.core.tasks.ndjson_ingestion import NDJSONError, ingest_ndjson
 from app.core.tasks.process_scraped_data import (
     process_people_data,
     process_scraped_data,
 )
-from app.models import BusinessLeadInternal, PeopleLeadInternal
+from app.models import (
+    BusinessLeadInternal,
+    IngestionReport,
+    PeopleLeadInternal,
+)
 
 router = APIRouter()
 
@@ -25,15 +33,13 @@ logger = get_logger()
 )
 def create_scraped_data(
     scraped_data: list[BusinessLeadInternal],
-    session: SessionDep,
     has_access: ScrapperAuthTokenDep,
-    background_tasks: BackgroundTasks,
 ) -> responses.Response:
     """
-    [Internal Only] Pass scraped data to the background task for processing.
+    [Internal Only] Queue scraped data for the ingestion worker.
     """
     logger.info(
-        "Pass business leads to the background task for processing - function create_scraped_data"
+        "Queue business leads for the ingestion worker - function create_scraped_data"
     )
     if not has_access:
         logger.error("Unauthorized")
@@ -43,8 +49,8 @@ def create_scraped_data(
         logger.error("No Content")
         return responses.Response(status_code=status.HTTP_204_NO_CONTENT)
 
-    background_tasks.add_task(process_scraped_data, scraped_data, session)
-    logger.info("Scraped")
+    message_id = enqueue_batch("business", scraped_data)
+    logger.info(f"Queued as {message_id}")
     return responses.Response(status_code=status.HTTP_202_ACCEPTED)
 
 
@@ -60,15 +66,13 @@ def create_scraped_data(
 )
 def create_business_leads(
     business_leads: list[BusinessLeadInternal],
-    session: SessionDep,
     has_access: ScrapperAuthTokenDep,
-    background_tasks: BackgroundTasks,
 ) -> responses.Response:
     """
-    [Internal Only] Pass scraped data to the background task for processing.
+    [Internal Only] Queue scraped data for the ingestion worker.
     """
     logger.info(
-        "Pass business leads to the background task for processing - function create_scraped_data"
+        "Queue business leads for the ingestion worker - function create_business_leads"
     )
     if not has_access:
         logger.error("Unauthorized")
@@ -78,8 +82,8 @@ def create_business_leads(
         logger.error("No Content")
         return responses.Response(status_code=status.HTTP_204_NO_CONTENT)
 
-    background_tasks.add_task(process_scraped_data, business_leads, session)
-    logger.info("Scraped")
+    message_id = enqueue_batch("business", business_leads)
+    logger.info(f"Queued as {message_id}")
     return responses.Response(status_code=status.HTTP_202_ACCEPTED)
 
 
@@ -95,15 +99,13 @@ def create_business_leads(
 )
 def create_people_leads(
     people_leads: list[PeopleLeadInternal],
-    session: SessionDep,
     has_access: ScrapperAuthTokenDep,
-    background_tasks: BackgroundTasks,
 ) -> responses.Response:
     """
-    [Internal Only] Pass scraped data to the background task for processing.
+    [Internal Only] Queue scraped data for the ingestion worker.
     """
     logger.info(
-        "Pass people leads to the background task for processing - function create_scraped_data"
+        "Queue people leads for the ingestion worker - function create_people_leads"
     )
     if not has_access:
         logger.error("Unauthorized")
@@ -113,6 +115,84 @@ def create_people_leads(
         logger.error("No Content")
         return responses.Response(status_code=status.HTTP_204_NO_CONTENT)
 
-    background_tasks.add_task(process_people_data, people_leads, session)
-    logger.info("Scraped")
+    message_id = enqueue_batch("people", people_leads)
+    logger.info(f"Queued as {message_id}")
     return responses.Response(status_code=status.HTTP_202_ACCEPTED)
+
+
+async def _ingest_stream(
+    request: Request, schema: type, processor: Any
+) -> Any:
+    gzipped = request.headers.get("content-encoding", "").lower() == "gzip"
+    try:
+        return await ingest_ndjson(
+            request.stream(), schema, processor, gzipped=gzipped
+        )
+    except NDJSONError as e:
+        # chunks before the broken part of the body are already saved, the
+        # report tells the client where to resume
+        logger.error(f"Bad Request: {e}")
+        content: dict[str, Any] = {"detail": str(e)}
+        if e.report is not None:
+            content["report"] = e.report.model_dump()
+        return responses.JSONResponse(
+            content, status_code=status.HTTP_400_BAD_REQUEST
+        )
+
+
+@router.post(
+    "/scraped-data/stream",
+    response_model=IngestionReport,
+    responses={
+        "400": {"description": "Bad Request"},
+        "401": {"description": "Unauthorized"},
+    },
+    include_in_schema=False,
+)
+async def stream_scraped_data(
+    request: Request,
+    has_access: ScrapperAuthTokenDep,
+) -> Any:
+    """
+    [Internal Only] Save business leads sent as NDJSON, one lead per line,
+    gzip-compressed when Content-Encoding is gzip. Rows are validated and
+    upserted in chunks while the body is read, the response reports the
+    accepted and rejected rows of every chunk.
+    """
+    logger.info("Stream business leads - function stream_scraped_data")
+    if not has_access:
+        logger.error("Unauthorized")
+        return responses.Response(status_code=status.HTTP_401_UNAUTHORIZED)
+
+    return await _ingest_stream(
+        request, BusinessLeadInternal, process_scraped_data
+    )
+
+
+@router.post(
+    "/people-leads/stream",
+    response_model=IngestionReport,
+    responses={
+        "400": {"description": "Bad Request"},
+        "401": {"description": "Unauthorized"},
+    },
+    include_in_schema=False,
+)
+async def stream_people_leads(
+    request: Request,
+    has_access: ScrapperAuthTokenDep,
+) -> Any:
+    """
+    [Internal Only] Save people leads sent as NDJSON, one lead per line,
+    gzip-compressed when Content-Encoding is gzip. Rows are validated and
+    inserted in chunks while the body is read, the response reports the
+    accepted and rejected rows of every chunk.
+    """
+    logger.info("Stream people leads - function stream_people_leads")
+    if not has_access:
+        logger.error("Unauthorized")
+        return responses.Response(status_code=status.HTTP_401_UNAUTHORIZED)
+
+    return await _ingest_stream(
+        request, PeopleLeadInternal, process_people_data
+    )
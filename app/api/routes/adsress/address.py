@@ -1,21 +1,50 @@
-from fastapi import APIRouter
-from fastapi_pagination import LimitOffsetPage, paginate
+from fastapi import APIRouter, Depends
+from fastapi_pagination import LimitOffsetPage
+from fastapi_pagination.cursor import CursorPage
+from fastapi_pagination.ext.sqlmodel import paginate
 from sqlmodel import func, select
+from sqlmodel.sql.expression import SelectOfScalar
 
-from app.api.deps import CurrentUser, SessionDep
+from app.api.deps import SessionDep, get_current_identity
 from app.models import Address, PublicAddress
 
 router = APIRouter()
 
 
-@router.get("/", response_model=LimitOffsetPage[PublicAddress])
-def read_address(
-    city: str, session: SessionDep, current_user: CurrentUser
-) -> LimitOffsetPage[PublicAddress]:
-    statement = (
+def _address_statement(city: str) -> SelectOfScalar[Address]:
+    # the filter is served by the trigram index on lower(city), matches
+    # are ranked by trigram similarity. id breaks ties between addresses of
+    # the same city, pages need a total order. The filter drops NULL
+    # cities, coalesce only tells the cursor pages so.
+    search = city.lower()
+    return (
         select(Address)
-        .where(func.lower(Address.city).ilike(f"%{city.lower()}%"))
-        .order_by(Address.city)
+        .where(func.lower(Address.city).ilike(f"%{search}%"))
+        .order_by(
+            func.similarity(func.lower(Address.city), search).desc(),
+            func.coalesce(Address.city, ""),
+            Address.id,
+        )
     )
-    address = session.exec(statement).all()
-    return paginate(address)
+
+
+@router.get(
+    "/",
+    dependencies=[Depends(get_current_identity)],
+    response_model=LimitOffsetPage[PublicAddress],
+)
+def read_address(
+    city: str, session: SessionDep
+) -> LimitOffsetPage[PublicAddress]:
+    return paginate(session, _address_statement(city))
+
+
+@router.get(
+    "/cursor",
+    dependencies=[Depends(get_current_identity)],
+    response_model=CursorPage[PublicAddress],
+)
+def read_address_cursor(
+    city: str, session: SessionDep
+) -> CursorPage[PublicAddress]:
+    return paginate(session, _address_statement(city))
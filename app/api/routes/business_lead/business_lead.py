@@ -1,23 +1,18 @@
 import datetime
-import logging
 from typing import Any
 
 from fastapi import APIRouter, HTTPException, Query
-from sqlmodel import select
 
 from app.api.deps import CurrentUser, SessionDep
 from app.core.logs import get_logger
-from app.models import (
-    BusinessLead,
-    BusinessLeadPublic,
-    SearchHistory,
-    SearchHistoryCreate,
-)
-from app.workflows.credits import use_credit
+from app.models import BusinessLeadPublic, SearchHistory, SearchHistoryCreate
+from app.workflows.business_types import get_business_type_catalog
+from app.workflows.credits import consume_credit
+from app.workflows.leads import search_business_leads
+from app.workflows.ledger import record_usage
 
 router = APIRouter()
 
-logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
 logger = get_logger()
 
 
@@ -59,7 +54,6 @@ def read_business_lead(
         )
 
     logger.info("Retrieving business leads - function read_business_lead.")
-    statement = select(BusinessLead)
 
     # Validate input parameters
     if not businesses or not (cities or states):
@@ -71,21 +65,22 @@ def read_business_lead(
             detail="Businesses and cities or states parameters are required.",
         )
 
-    # Apply filters based on the input parameters
-    if businesses:
-        statement = statement.where(BusinessLead.business_type.in_(businesses))
-    if states:
-        statement = statement.where(BusinessLead.state.in_(states))
-    if cities:
-        statement = statement.where(BusinessLead.city.in_(cities))
+    # business types are checked against the in-memory catalog, in the
+    # spelling the leads are stored with
+    businesses, unknown = get_business_type_catalog(session).resolve(
+        businesses
+    )
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown business types: {', '.join(unknown)}",
+        )
 
-    # Limit the results to the requested limit
-    statement = statement.limit(limit)
+    statement = search_business_leads(businesses, states, cities, limit)
     business_leads = session.exec(statement).all()
 
     # If no free access left and user has available credits, use credits
     credits_to_use = min(limit, len(business_leads))
-    credits_remaining = credits_to_use
 
     created_access_log = SearchHistoryCreate(
         user_id=current_user.id,
@@ -100,15 +95,23 @@ def read_business_lead(
 
     db_access_log = SearchHistory.model_validate(created_access_log)
     session.add(db_access_log)
-    session.commit()
-
-    if current_user.free_credit > 0:
-        credits_used_from_free = min(credits_to_use, current_user.free_credit)
-        credits_remaining -= credits_used_from_free
-        current_user.free_credit -= credits_used_from_free
+    record_usage(
+        session,
+        current_user.id,  # type: ignore
+        db_access_log.credits_used,
+        db_access_log.search_time,
+    )
 
-    if credits_remaining > 0:
-        use_credit(session, current_user.id, credits_remaining)
+    # free credits first, checked against the balance of the moment, the
+    # search history and the credits are committed together
+    try:
+        consume_credit(session, current_user.id, credits_to_use)  # type: ignore
+    except ValueError:
+        session.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="You have no available credits.",
+        )
 
     session.commit()
     logger.info(f"Found {len(business_leads)} business leads")
@@ -1,21 +1,84 @@
-from fastapi import APIRouter
-from fastapi_pagination import LimitOffsetPage, paginate
-from sqlmodel import func, select
+from collections.abc import Sequence
+from typing import Any
 
-from app.api.deps import CurrentUser, SessionDep
-from app.models import BusinessType, PublicBusinessType
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi_pagination import LimitOffsetPage, create_page, paginate
+from fastapi_pagination.api import resolve_params
+from fastapi_pagination.cursor import CursorPage
+
+from app.api.deps import SessionDep, get_current_identity
+from app.models import PublicBusinessType
+from app.workflows.business_types import (
+    BusinessTypeCatalog,
+    get_business_type_catalog,
+)
 
 router = APIRouter()
 
 
-@router.get("/", response_model=LimitOffsetPage[PublicBusinessType])
-def read_business_types(
-    name: str, session: SessionDep, current_user: CurrentUser
-) -> LimitOffsetPage[PublicBusinessType]:
-    statement = (
-        select(BusinessType)
-        .where(func.lower(BusinessType.name).ilike(f"%{name.lower()}%"))
-        .order_by(BusinessType.name)
+def _cursor_page(
+    business_types: Sequence[PublicBusinessType],
+) -> CursorPage[PublicBusinessType]:
+    # the catalog is in memory, so the cursor is simply the position of
+    # the first item of the page
+    params = resolve_params()
+    raw_params = params.to_raw_params()
+    try:
+        start = int(raw_params.cursor or 0)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor value")
+    end = start + raw_params.size
+    return create_page(
+        business_types[start:end],
+        params=params,
+        next_=str(end) if end < len(business_types) else None,
+        previous=str(max(start - raw_params.size, 0)) if start else None,
     )
-    business_types = session.exec(statement).all()
-    return paginate(business_types)
+
+
+def _not_modified(
+    request: Request, response: Response, catalog: BusinessTypeCatalog
+) -> Response | None:
+    # a page only changes with the catalog, clients revalidate their copy
+    # with the catalog version
+    etag = f'"{catalog.version}"'
+    if request.headers.get("If-None-Match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return None
+
+
+@router.get(
+    "/",
+    dependencies=[Depends(get_current_identity)],
+    response_model=LimitOffsetPage[PublicBusinessType],
+)
+def read_business_types(
+    name: str,
+    request: Request,
+    response: Response,
+    session: SessionDep,
+) -> Any:
+    catalog = get_business_type_catalog(session)
+    not_modified = _not_modified(request, response, catalog)
+    if not_modified:
+        return not_modified
+    return paginate(catalog.search(name), safe=True)
+
+
+@router.get(
+    "/cursor",
+    dependencies=[Depends(get_current_identity)],
+    response_model=CursorPage[PublicBusinessType],
+)
+def read_business_types_cursor(
+    name: str,
+    request: Request,
+    response: Response,
+    session: SessionDep,
+) -> Any:
+    catalog = get_business_type_catalog(session)
+    not_modified = _not_modified(request, response, catalog)
+    if not_modified:
+        return not_modified
+    return _cursor_page(catalog.search(name))
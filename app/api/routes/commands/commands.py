@@ -1,17 +1,33 @@
+import json
+import uuid
+from collections.abc import AsyncIterator, Iterator
 from datetime import datetime
-from typing import Any
+from typing import Any, Literal
 
 from fastapi import APIRouter, HTTPException, Query, status
-from fastapi.responses import FileResponse, JSONResponse, Response
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from sqlmodel import select
-
-from app.api.deps import CurrentUser, ScrapperAuthTokenDep, SessionDep
-from app.api.write_to_csv import write_to_csv
+from starlette.concurrency import run_in_threadpool
+
+from app.api.columnar import COLUMNAR_FORMATS, arrow_schema
+from app.api.deps import (
+    CurrentIdentity,
+    CurrentUser,
+    ScrapperAuthTokenDep,
+    SessionDep,
+)
+from app.api.exports import (
+    gzip_stream,
+    in_new_session,
+    iter_admin_rows,
+    iter_search_history_rows,
+)
+from app.api.write_to_csv import stream_csv
+from app.core.config import settings
 from app.core.logs import get_logger
 from app.models import (
     Address,
     BusinessLead,
-    PeopleLead,
     PeopleLeadDataRequest,
     ReservedCredit,
     ScraperEventData,
@@ -20,10 +36,20 @@ from app.models import (
     SearchHistoryCreate,
     User,
 )
-from app.workflows.credits import release_credit, reserve_credit, use_credit
+from app.workflows.business_types import get_business_type_catalog
+from app.workflows.credits import (
+    PENDING_TASK_PREFIX,
+    release_credit,
+    reserve_credit,
+)
+from app.workflows.leads import resolve_lead_ids
+from app.workflows.ledger import record_usage
 from app.workflows.scraper import (
+    apply_scraper_event_progress,
+    iter_scraper_progress,
+    publish_scraper_progress,
+    read_scraper_event,
     send_start_scraper_command,
-    update_scraper_data_event_from_redis,
 )
 
 headers_people = ["name", "age", "phones", "emails"]
@@ -48,29 +74,31 @@ router = APIRouter()
 
 logger = get_logger()
 
-
-def _update_search_history(session: SessionDep, user: User, data: dict):
-    statement = select(SearchHistory).where(
-        SearchHistory.user_id == user.id,
-        SearchHistory.task_id == data["task_id"],
+ExportFormat = Literal["csv", "arrow", "parquet"]
+
+
+def _columnar_response(
+    export_format: str,
+    source: str,
+    headers: list[str],
+    view: str,
+    rows: Iterator[Any],
+) -> StreamingResponse:
+    stream, media_type, filename = COLUMNAR_FORMATS[export_format]
+    return StreamingResponse(
+        stream(arrow_schema(source, headers, view), rows),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
-    search_history = session.exec(statement).first()
-    if search_history:
-        search_history.status = data["status"]
-        session.commit()
 
 
-@router.post("/start-scraper", responses={200: {"description": "OK"}})
-def start_scraper(
-    data: PeopleLeadDataRequest | ScrapingDataRequest,
-    current_user: CurrentUser,
+def _check_start_request(
     session: SessionDep,
-    source: str = Query("business", description="Filter leads by source"),
-) -> Response:
-    """
-    [Internal Only] Start scaper, should be hidden from the public API later
-    """
-
+    current_user: User,
+    data: PeopleLeadDataRequest | ScrapingDataRequest,
+    source: str,
+) -> Response | None:
+    # validates and completes data, returns the response of a bad request
     if not source:
         raise HTTPException(
             status_code=400,
@@ -105,6 +133,20 @@ def start_scraper(
             status_code=status.HTTP_400_BAD_REQUEST,
         )
 
+    if source == "business":
+        data.businesses, unknown = get_business_type_catalog(session).resolve(
+            data.businesses
+        )
+        if unknown:
+            return JSONResponse(
+                content={
+                    "detail": "Unknown business types: {names}".format(
+                        names=", ".join(unknown)
+                    )
+                },
+                status_code=status.HTTP_400_BAD_REQUEST,
+            )
+
     if (
         source == "business"
         and not data.cities
@@ -149,62 +191,187 @@ def start_scraper(
                         },
                         status_code=status.HTTP_400_BAD_REQUEST,
                     )
+    return None
 
-    start_task = send_start_scraper_command(
-        session, current_user, data, source
-    )
 
-    if not start_task["status"]:
-        return JSONResponse(
-            content={"detail": "Failed to start the scraper"},
-            status_code=status.HTTP_400_BAD_REQUEST,
+def _reserve_search(
+    session: SessionDep,
+    current_user: User,
+    data: PeopleLeadDataRequest | ScrapingDataRequest,
+    source: str,
+) -> tuple[ReservedCredit, SearchHistory]:
+    # the reservation and the search history are committed before the
+    # scraper starts, under a provisional task id replaced by the one the
+    # scraper API returns. The progress flusher releases reservations left
+    # pending, see release_stale_reservations.
+    task_id = f"{PENDING_TASK_PREFIX}{uuid.uuid4().hex}"
+    try:
+        reserved_credit = reserve_credit(
+            session, current_user, data.limit, task_id
+        )
+    except ValueError:
+        session.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="You have no available credits.",
         )
-
-    reserve_credit(session, current_user, data.limit, start_task["task_id"])
 
     created_access_log = SearchHistoryCreate(
         user_id=current_user.id,
         internal_search_ids={"internal_search_ids": []},  # type: ignore
         credits_used=0,
         source=source,
-        task_id=start_task["task_id"],
+        task_id=task_id,
         status="In progress",
         search_time=datetime.now(),
     )
 
-    db_access_log = SearchHistory.model_validate(created_access_log)
-    session.add(db_access_log)
+    search_history = SearchHistory.model_validate(created_access_log)
+    session.add(search_history)
+    session.commit()
+    return reserved_credit, search_history
+
+
+def _attach_task(
+    session: SessionDep,
+    reserved_credit: ReservedCredit,
+    search_history: SearchHistory,
+    task_id: str,
+) -> None:
+    reserved_credit.task_id = task_id
+    search_history.task_id = task_id
+    session.add(reserved_credit)
+    session.add(search_history)
     session.commit()
 
+
+def _cancel_reservation(
+    session: SessionDep,
+    reserved_credit: ReservedCredit,
+    search_history: SearchHistory,
+) -> None:
+    # the scraper did not start, the reserved credits are given back
+    session.rollback()
+    release_credit(session, reserved_credit, 0)
+    session.delete(search_history)
+    session.commit()
+
+
+@router.post("/start-scraper", responses={200: {"description": "OK"}})
+async def start_scraper(
+    data: PeopleLeadDataRequest | ScrapingDataRequest,
+    current_user: CurrentUser,
+    session: SessionDep,
+    source: str = Query("business", description="Filter leads by source"),
+) -> Response:
+    """
+    [Internal Only] Start scaper, should be hidden from the public API later
+    """
+    # the database work runs in the thread pool, the scraper request on the
+    # event loop
+    bad_request = await run_in_threadpool(
+        _check_start_request, session, current_user, data, source
+    )
+    if bad_request is not None:
+        return bad_request
+
+    reserved_credit, search_history = await run_in_threadpool(
+        _reserve_search, session, current_user, data, source
+    )
+
+    try:
+        start_task = await send_start_scraper_command(
+            session, current_user, data, source
+        )
+    except Exception:
+        await run_in_threadpool(
+            _cancel_reservation, session, reserved_credit, search_history
+        )
+        raise
+
+    if not start_task["status"]:
+        await run_in_threadpool(
+            _cancel_reservation, session, reserved_credit, search_history
+        )
+        return JSONResponse(
+            content={"detail": "Failed to start the scraper"},
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
+
+    await run_in_threadpool(
+        _attach_task,
+        session,
+        reserved_credit,
+        search_history,
+        start_task["task_id"],
+    )
     return JSONResponse(
         {"event_id": start_task["internal_id"]}, status_code=status.HTTP_200_OK
     )
 
 
 @router.get("/get-scraper-status", response_model=ScraperEventData)
-def get_scraper_status(
+async def get_scraper_status(
     session: SessionDep,
-    current_user: CurrentUser,
+    current_user: CurrentIdentity,
     event_id: int,
 ):
     """
     [Internal Only] Get scaper status, should be hidden from the public API later
     """
     logger.info("Getting scrapper status - function get_scraper_status")
-    event = update_scraper_data_event_from_redis(session, event_id)
-    result = event.copy()
-    if type(event) is not dict:
-        data = {
-            "task_id": event.task_id,
-            "status": event.status,
-        }
-        _update_search_history(session, current_user, data)
-    if "status" in event and event["status"] == 404:
+    # read only, the progress flusher copies the progress to the database
+    event = await read_scraper_event(session, event_id, current_user.id)
+    if event is None:
         return JSONResponse(
             {"detail": f"Scraper event with id {event_id} not found"},
             status_code=status.HTTP_404_NOT_FOUND,
         )
-    return result
+    return event
+
+
+def _server_sent_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.get(
+    "/scraper-status/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def stream_scraper_status(
+    session: SessionDep,
+    current_user: CurrentIdentity,
+    event_id: int,
+) -> Response:
+    """
+    Scraper progress as Server-Sent Events, instead of polling
+    get-scraper-status. The first "progress" event has the whole state,
+    the next ones the changed fields only, the stream ends when the
+    scraper finished. Progress is read from redis, nothing is written.
+    """
+    event = await run_in_threadpool(session.get, ScraperEventData, event_id)
+    if event is None or event.user_id != current_user.id:
+        return JSONResponse(
+            {"detail": f"Scraper event with id {event_id} not found"},
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
+
+    async def server_sent_events() -> AsyncIterator[str]:
+        async for delta in iter_scraper_progress(
+            event, settings.SCRAPER_PROGRESS_POLL_SECONDS
+        ):
+            if delta:
+                yield _server_sent_event("progress", delta)
+            else:
+                # keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        server_sent_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post(
@@ -225,71 +392,59 @@ def finish_notification(
         "Scraper finished, reserved credits will be released - function finish_notification"
     )
 
-    reserved_credit = (
-        session.query(ReservedCredit).filter_by(task_id=task_id).first()
-    )
-
-    event = session.query(ScraperEventData).filter_by(task_id=task_id).first()
-    source = event.source
+    event = session.exec(
+        select(ScraperEventData).where(ScraperEventData.task_id == task_id)
+    ).first()
+    reserved_credit = session.exec(
+        select(ReservedCredit).where(ReservedCredit.task_id == task_id)
+    ).first()
+    search_history = session.exec(
+        select(SearchHistory).where(SearchHistory.task_id == task_id)
+    ).first()
+    if event is None or reserved_credit is None or search_history is None:
+        logger.error(
+            f"No scraper event, reservation or search for task {task_id}"
+        )
+        return JSONResponse(
+            {"detail": f"Task {task_id} was not started by this API"},
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
 
-    update_scraper_data_event_from_redis(session, event.id)
+    internal_search_ids = resolve_lead_ids(session, event.source, data)
 
-    event = session.query(ScraperEventData).filter_by(task_id=task_id).first()
+    # credit release, event status and search history are committed
+    # together, a failure leaves the reservation untouched
+    apply_scraper_event_progress(session, event)
 
     credits_to_use = min(
         reserved_credit.credits_reserved, event.scraped_results
     )
-    credits_remaining = credits_to_use
 
     user = session.get(User, reserved_credit.user_id)
 
-    if user.free_credit > 0:
-        credits_used_from_free = min(credits_to_use, user.free_credit)
-        credits_remaining -= credits_used_from_free
-        user.free_credit -= credits_used_from_free
-
-    release_credit(session, reserved_credit, credits_remaining)
-
-    session.commit()
-
-    event = session.query(ScraperEventData).filter_by(task_id=task_id).first()
+    # free credits first, the reservation covers the credits used
+    release_credit(session, reserved_credit, credits_to_use)
 
     event.status = "finished"
 
-    session.commit()
-
-    if source == "business":
-        internal_search_ids = []
-        for item in data:
-            business_lead = (
-                session.query(BusinessLead)
-                .filter_by(company_phone=item)
-                .first()
-            )
-            if business_lead:
-                internal_search_ids.append(business_lead.id)
-    else:
-        internal_search_ids = []
-        for item in data:
-            people_lead = (
-                session.query(PeopleLead).filter_by(name=item).first()
-            )
-            if people_lead:
-                internal_search_ids.append(people_lead.id)
-
-    statement = select(SearchHistory).where(
-        SearchHistory.user_id == user.id, SearchHistory.task_id == task_id
+    # the search moves to the month it finished in, with its final credits
+    record_usage(
+        session,
+        user.id,
+        -search_history.credits_used,
+        search_history.search_time,
     )
-    search_history = session.exec(statement).first()
     search_history.credits_used = credits_to_use
     search_history.internal_search_ids = {
-        "internal_search_ids": [
-            internal_search_id for internal_search_id in internal_search_ids
-        ]
+        "internal_search_ids": internal_search_ids
     }
     search_history.search_time = datetime.now()
+    record_usage(session, user.id, credits_to_use, search_history.search_time)
     search_history.status = "Finished"
+    event_id = event.id
     session.commit()
+    # ends the progress streams of the event
+    publish_scraper_progress(event_id, status="finished")
 
     return Response(status_code=status.HTTP_200_OK)
 
@@ -300,9 +455,12 @@ def finish_notification(
 )
 def download_csv(
     session: SessionDep,
-    current_user: CurrentUser,
+    current_user: CurrentIdentity,
     search_history_id: int,
     view: str = Query(default="default"),
+    export_format: ExportFormat = Query(
+        "csv", alias="format", description="csv, arrow (IPC stream) or parquet"
+    ),
 ) -> Any:
     """
     Retrieve People/business leads and send it as a CSV file.
@@ -321,58 +479,29 @@ def download_csv(
             {"message": "No search history found."}, status_code=404
         )
 
-    internal_searches = []
     if search_history.source == "business":
-        looking_for = BusinessLead
         headers = headers_business
     else:
-        looking_for = PeopleLead
         headers = headers_people
-    for internal_search_id in search_history.internal_search_ids[
-        "internal_search_ids"
-    ]:
-        statement = select(looking_for).where(
-            looking_for.id == internal_search_id,
-        )
-        internal_search = session.exec(statement).first()
-        if internal_search:
-            if view == "default" or search_history.source == "business":
-                internal_searches.append(internal_search)
-
-            if search_history.source != "business" and view != "default":
-                if (
-                    len(internal_search.phones) > 0
-                    and len(internal_search.emails) > 0
-                ):
-                    for phone in internal_search.phones:
-                        for email in internal_search.emails:
-                            additional_search = internal_search.copy()
-                            additional_search.phones = phone
-                            additional_search.emails = email
-                            internal_searches.append(additional_search)
-                elif len(internal_search.phones) == 0:
-                    for email in internal_search.emails:
-                        additional_search = internal_search.copy()
-                        additional_search.emails = email
-                        internal_searches.append(additional_search)
-                elif len(internal_search.emails) == 0:
-                    for phone in internal_search.phones:
-                        additional_search = internal_search.copy()
-                        additional_search.phones = phone
-                        internal_searches.append(additional_search)
-                else:
-                    internal_searches.append(internal_search)
-
-    csv_file_path = "file.csv"
-    logger.info(f"Found {len(internal_searches)} leads")
-
-    write_to_csv(csv_file_path, headers, internal_searches)
-    logger.info(
-        f"{len(internal_searches)} leads were written to {csv_file_path}"
+    lead_ids = search_history.internal_search_ids["internal_search_ids"]
+    logger.info(f"Streaming {len(lead_ids)} leads as {export_format}")
+
+    rows = in_new_session(
+        iter_search_history_rows,
+        search_history.source,
+        lead_ids,
+        headers,
+        view,
     )
+    if export_format != "csv":
+        return _columnar_response(
+            export_format, search_history.source, headers, view, rows
+        )
 
-    return FileResponse(
-        csv_file_path, media_type="text/csv", filename=csv_file_path
+    return StreamingResponse(
+        stream_csv(headers, rows),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="file.csv"'},
     )
 
 
@@ -381,12 +510,15 @@ def download_csv(
     description="Retrieve leads and send it as a CSV file for superuser.",
 )
 def download_csv_admin(
-    session: SessionDep,
     current_user: CurrentUser,
     received_date: datetime = Query(
         None, description="Filter leads by received date"
     ),
     source: str = Query(BusinessLead, description="Filter leads by source"),
+    compress: bool = Query(False, description="Send the CSV gzip-compressed"),
+    export_format: ExportFormat = Query(
+        "csv", alias="format", description="csv, arrow (IPC stream) or parquet"
+    ),
 ):
     if not current_user.is_superuser:
         raise HTTPException(
@@ -397,24 +529,25 @@ def download_csv_admin(
     logger.info(
         "Retrieving leads and send it as a CSV file - function download_csv_admin."
     )
-    if source == "business":
-        looking_for = BusinessLead
-        headers = headers_business
-    else:
-        looking_for = PeopleLead
-        headers = headers_people
-    statement = select(looking_for)
-
-    if received_date:
-        statement = statement.where(looking_for.received_date >= received_date)
-
-    statement = statement.order_by(looking_for.received_date.desc())
-    leads = session.exec(statement).all()
-    csv_file_path = "file.csv"
-    logger.info(f"Found {len(leads)} leads")
-
-    write_to_csv(csv_file_path, headers, leads)
+    headers = headers_business if source == "business" else headers_people
+    rows = in_new_session(iter_admin_rows, source, headers, received_date)
+    if export_format != "csv":
+        # parquet is compressed column by column, compress is for csv only
+        return _columnar_response(
+            export_format, source, headers, "default", rows
+        )
 
-    return FileResponse(
-        csv_file_path, media_type="text/csv", filename=csv_file_path
+    content = stream_csv(headers, rows)
+    if compress:
+        return StreamingResponse(
+            gzip_stream(content),
+            media_type="application/gzip",
+            headers={
+                "Content-Disposition": 'attachment; filename="file.csv.gz"'
+            },
+        )
+    return StreamingResponse(
+        content,
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="file.csv"'},
     )
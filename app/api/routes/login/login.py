@@ -4,13 +4,20 @@ from typing import Annotated, Any
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import HTMLResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
 
 from app import crud
-from app.api.deps import CurrentUser, SessionDep, get_current_active_superuser
+from app.api.deps import (
+    CurrentUser,
+    SessionDep,
+    find_user_by_email,
+    get_current_active_superuser,
+)
 from app.core import security
 from app.core.config import settings
 from app.core.logs import get_logger
-from app.core.security import get_password_hash
+from app.core.rate_limit import RateLimiter
+from app.core.security import get_password_hash_async
 from app.models import Message, NewPassword, Token, UserPublic
 from app.utils import (
     generate_password_reset_token,
@@ -23,9 +30,16 @@ router = APIRouter()
 
 logger = get_logger()
 
+# failed logins per email, shared by all the processes
+login_failures = RateLimiter(
+    "login_failures",
+    settings.LOGIN_MAX_FAILED_ATTEMPTS,
+    settings.LOGIN_FAILED_WINDOW_SECONDS,
+)
+
 
 @router.post("/login/access-token")
-def login_access_token(
+async def login_access_token(
     session: SessionDep,
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
 ) -> Token:
@@ -35,10 +49,24 @@ def login_access_token(
     logger.info(
         "OAuth2 compatible token login, get an access token for future requests - function login_access_token"
     )
-    user = crud.authenticate(
-        session=session, email=form_data.username, password=form_data.password
+    email = form_data.username.lower()
+    # redis and the database run in the thread pool, bcrypt in the
+    # password pool
+    retry_after = await run_in_threadpool(login_failures.retry_after, email)
+    if retry_after:
+        logger.error("Too many failed logins")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many failed login attempts, try again later",
+            headers={"Retry-After": str(retry_after)},
+        )
+    user = await run_in_threadpool(
+        find_user_by_email, session, form_data.username
     )
-    if not user:
+    if not user or not await security.verify_password_async(
+        form_data.password, user.hashed_password
+    ):
+        await run_in_threadpool(login_failures.hit, email)
         logger.error("Incorrect email or password")
         raise HTTPException(
             status_code=400, detail="Incorrect email or password"
@@ -93,7 +121,7 @@ def recover_password(email: str, session: SessionDep) -> Message:
 
 
 @router.post("/reset-password/")
-def reset_password(session: SessionDep, body: NewPassword) -> Message:
+async def reset_password(session: SessionDep, body: NewPassword) -> Message:
     """
     Reset password
     """
@@ -102,7 +130,7 @@ def reset_password(session: SessionDep, body: NewPassword) -> Message:
     if not email:
         logger.error("Password reset token not found")
         raise HTTPException(status_code=400, detail="Invalid token")
-    user = crud.get_user_by_email(session=session, email=email)
+    user = await run_in_threadpool(find_user_by_email, session, email)
     if not user:
         logger.error("The user with this email does not exist in the system.")
         raise HTTPException(
@@ -112,10 +140,10 @@ def reset_password(session: SessionDep, body: NewPassword) -> Message:
     elif not user.is_active:
         logger.error("User not active")
         raise HTTPException(status_code=400, detail="Inactive user")
-    hashed_password = get_password_hash(password=body.new_password)
+    hashed_password = await get_password_hash_async(body.new_password)
     user.hashed_password = hashed_password
     session.add(user)
-    session.commit()
+    await run_in_threadpool(session.commit)
     logger.info("Password updated was successful")
     return Message(message="Password updated successfully")
 
@@ -1,24 +1,22 @@
 import datetime
-import logging
 from typing import Any
 
 from fastapi import APIRouter, Body, HTTPException, Query
-from sqlmodel import select
 
 from app.api.deps import CurrentUser, SessionDep
 from app.core.logs import get_logger
 from app.models import (
     PeopleDataRequest,
-    PeopleLead,
     PeopleLeadPublic,
     SearchHistory,
     SearchHistoryCreate,
 )
-from app.workflows.credits import use_credit
+from app.workflows.credits import consume_credit
+from app.workflows.leads import search_people_leads
+from app.workflows.ledger import record_usage
 
 router = APIRouter()
 
-logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
 logger = get_logger()
 
 
@@ -56,7 +54,6 @@ def read_people_lead(
         )
 
     logger.info("Retrieving people leads - function read_people_lead.")
-    people_leads = []
 
     # Validate input parameters
     if len(data) <= 0:
@@ -74,26 +71,11 @@ def read_people_lead(
                 detail="Cities or states parameters are required.",
             )
 
-        if not item.streets or len(item.streets) == 0:
-            statement = select(PeopleLead).where(
-                PeopleLead.city == item.city,
-                PeopleLead.state == item.state,
-            )
-        else:
-            statement = select(PeopleLead).where(
-                PeopleLead.city == item.city,
-                PeopleLead.state == item.state,
-                PeopleLead.street.in_(item.streets),
-            )
-
-        # Limit the results to the requested limit
-        statement = statement.limit(limit)
-        people_lead = session.exec(statement).all()
-        people_leads.extend(people_lead)
+    # all items in one round trip, up to limit leads each
+    people_leads = session.exec(search_people_leads(data, limit)).all()
 
     # If no free access left and user has available credits, use credits
     credits_to_use = min(limit, len(people_leads))
-    credits_remaining = credits_to_use
 
     created_access_log = SearchHistoryCreate(
         user_id=current_user.id,
@@ -108,15 +90,23 @@ def read_people_lead(
 
     db_access_log = SearchHistory.model_validate(created_access_log)
     session.add(db_access_log)
-    session.commit()
-
-    if current_user.free_credit > 0:
-        credits_used_from_free = min(credits_to_use, current_user.free_credit)
-        credits_remaining -= credits_used_from_free
-        current_user.free_credit -= credits_used_from_free
+    record_usage(
+        session,
+        current_user.id,  # type: ignore
+        db_access_log.credits_used,
+        db_access_log.search_time,
+    )
 
-    if credits_remaining > 0:
-        use_credit(session, current_user.id, credits_remaining)
+    # free credits first, checked against the balance of the moment, the
+    # search history and the credits are committed together
+    try:
+        consume_credit(session, current_user.id, credits_to_use)  # type: ignore
+    except ValueError:
+        session.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="You have no available credits.",
+        )
 
     session.commit()
     logger.info(f"Found {len(people_leads)} people leads")
@@ -2,35 +2,43 @@ import datetime
 import re
 from typing import Annotated, Any
 
-from fastapi import APIRouter, Body, Depends, HTTPException
-from fastapi_pagination import LimitOffsetPage, paginate
-from sqlmodel import select
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from fastapi_pagination import LimitOffsetPage
+from fastapi_pagination.cursor import CursorPage
+from fastapi_pagination.ext.sqlmodel import paginate
+from sqlmodel import Session, select
+from sqlmodel.sql.expression import SelectOfScalar
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import JSONResponse
 
 from app import crud
-from app.api.deps import CurrentUser, SessionDep, get_current_active_superuser
+from app.api.deps import (
+    CurrentIdentity,
+    CurrentUser,
+    SessionDep,
+    find_user_by_email,
+    get_current_active_superuser,
+)
 from app.core.config import settings
 from app.core.logs import get_logger
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash_async, verify_password_async
 from app.models import (
-    BusinessLead,
-    BusinessOwnerInfo,
-    Education,
-    House,
     Message,
-    PeopleLead,
     PublicSearchHistory,
     PublicTransaction,
     SearchHistory,
     Transaction,
     UpdatePassword,
+    User,
     UserCreate,
     UserPublic,
     UserRegister,
+    UserStats,
     UserUpdateMe,
-    Work,
 )
 from app.utils import generate_new_account_email, send_email
+from app.workflows.leads import load_search_history_leads
+from app.workflows.stats import get_monthly_stats
 
 router = APIRouter()
 
@@ -45,6 +53,25 @@ def verify_url(url, pattern):
         return False
 
 
+def _create_user(
+    session: Session, user_create: UserCreate, hashed_password: str
+) -> UserPublic:
+    # serialized here, the credit properties query the database
+    user = crud.create_user(
+        session=session,
+        user_create=user_create,
+        hashed_password=hashed_password,
+    )
+    return UserPublic.model_validate(user)
+
+
+def _save_password(session: Session, user: User, hashed_password: str) -> None:
+    user.hashed_password = hashed_password
+    user.last_password_reset_time = datetime.datetime.now()
+    session.add(user)
+    session.commit()
+
+
 @router.post(
     "/",
     dependencies=[Depends(get_current_active_superuser)],
@@ -52,7 +79,7 @@ def verify_url(url, pattern):
     description="By this endpoint superuser can create other users, so superuser must be authorized",
     include_in_schema=False,
 )
-def create_user(
+async def create_user(
     *,
     session: SessionDep,
     user_in: Annotated[
@@ -83,7 +110,7 @@ def create_user(
     Create new user.
     """
     logger.info(f"Creating new user {user_in}")
-    user = crud.get_user_by_email(session=session, email=user_in.email)
+    user = await run_in_threadpool(find_user_by_email, session, user_in.email)
     if user:
         logger.error("The user with this email already exists in the system.")
         raise HTTPException(
@@ -91,14 +118,18 @@ def create_user(
             detail="The user with this email already exists in the system.",
         )
 
-    user = crud.create_user(session=session, user_create=user_in)
+    hashed_password = await get_password_hash_async(user_in.password)
+    user = await run_in_threadpool(
+        _create_user, session, user_in, hashed_password
+    )
     if settings.emails_enabled and user_in.email:
         email_data = generate_new_account_email(
             email_to=user_in.email,
             username=user_in.email,
             password=user_in.password,
         )
-        send_email(
+        await run_in_threadpool(
+            send_email,
             email_to=user_in.email,
             subject=email_data.subject,
             html_content=email_data.html_content,
@@ -245,7 +276,7 @@ def update_user_me(
     response_model=Message,
     description="By this endpoint user can update the password.",
 )
-def update_password_me(
+async def update_password_me(
     *,
     session: SessionDep,
     body: Annotated[
@@ -286,7 +317,10 @@ def update_password_me(
     """
 
     logger.info("Updating password.")
-    if not verify_password(
+    # bcrypt runs in the password pool, the connection goes back to the
+    # pool meanwhile
+    await run_in_threadpool(session.close)
+    if not await verify_password_async(
         body.current_password, current_user.hashed_password
     ):
         logger.error("Incorrect password")
@@ -297,11 +331,10 @@ def update_password_me(
             status_code=400,
             detail="New password cannot be the same as the current one",
         )
-    hashed_password = get_password_hash(body.new_password)
-    current_user.hashed_password = hashed_password
-    current_user.last_password_reset_time = datetime.datetime.now()
-    session.add(current_user)
-    session.commit()
+    hashed_password = await get_password_hash_async(body.new_password)
+    await run_in_threadpool(
+        _save_password, session, current_user, hashed_password
+    )
     logger.info("Password updated successfully.")
     return Message(message="Password updated successfully")
 
@@ -309,9 +342,10 @@ def update_password_me(
 @router.get(
     "/me",
     response_model=UserPublic,
-    description="This endpoint returns information about the current user if he is authorized.",
+    description="This endpoint returns information about the current user if he is authorized. "
+    f"The credits may be up to {settings.USER_CACHE_TTL} seconds old.",
 )
-def read_user_me(current_user: CurrentUser) -> Any:
+def read_user_me(current_user: CurrentIdentity) -> Any:
     """
     Get current user.
     """
@@ -319,6 +353,23 @@ def read_user_me(current_user: CurrentUser) -> Any:
     return current_user
 
 
+@router.get(
+    "/me/stats",
+    response_model=UserStats,
+    description="This endpoint returns the usage of the authorized user in a "
+    "month, the current one by default. The numbers may be up to "
+    f"{settings.USER_STATS_CACHE_TTL} seconds old.",
+)
+def read_user_me_stats(
+    session: SessionDep,
+    current_user: CurrentIdentity,
+    month: datetime.date | None = Query(
+        None, description="Any day of the month, e.g. 2024-06-01"
+    ),
+) -> Any:
+    return get_monthly_stats(session, current_user.id, month)  # type: ignore
+
+
 @router.delete(
     "/me",
     response_model=Message,
@@ -346,7 +397,7 @@ def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
     response_model=UserPublic,
     description="By this endpoint user can register a new user.",
 )
-def register_user(
+async def register_user(
     session: SessionDep,
     user_in: Annotated[
         UserRegister,
@@ -436,7 +487,7 @@ def register_user(
     Create new user without the need to be logged in.
     """
     logger.info(f"Creating new user {user_in}")
-    user = crud.get_user_by_email(session=session, email=user_in.email)
+    user = await run_in_threadpool(find_user_by_email, session, user_in.email)
     if user:
         logger.error("The user with this email already exists in the system.")
         raise HTTPException(
@@ -447,26 +498,43 @@ def register_user(
     user_data = user_in.model_dump(exclude_unset=True, mode="json")
 
     user_create = UserCreate.model_validate(user_data)
-    user = crud.create_user(session=session, user_create=user_create)
+    hashed_password = await get_password_hash_async(user_create.password)
+    user = await run_in_threadpool(
+        _create_user, session, user_create, hashed_password
+    )
     logger.info("User created successfully.")
     return user
 
 
+def _search_history_statement(user_id: int) -> SelectOfScalar[SearchHistory]:
+    return (
+        select(SearchHistory)
+        .where(SearchHistory.user_id == user_id)
+        .order_by(SearchHistory.search_time.desc(), SearchHistory.id.desc())
+    )
+
+
 @router.get(
     "/me/search-history",
     response_model=LimitOffsetPage[PublicSearchHistory],
     description="This endpoint returns search history for the authorized user.",
 )
 def get_search_history(
-    session: SessionDep, current_user: CurrentUser
+    session: SessionDep, current_user: CurrentIdentity
 ) -> LimitOffsetPage[PublicSearchHistory]:
-    statement = (
-        select(SearchHistory)
-        .where(SearchHistory.user_id == current_user.id)
-        .order_by(SearchHistory.search_time.desc(), SearchHistory.id.desc())
-    )
-    search_history = session.exec(statement).all()
-    return paginate(search_history)
+    return paginate(session, _search_history_statement(current_user.id))
+
+
+@router.get(
+    "/me/search-history/cursor",
+    response_model=CursorPage[PublicSearchHistory],
+    description="This endpoint returns search history for the authorized user, "
+    "page by page. Pass the next_page cursor of a page to get the next one.",
+)
+def get_search_history_cursor(
+    session: SessionDep, current_user: CurrentIdentity
+) -> CursorPage[PublicSearchHistory]:
+    return paginate(session, _search_history_statement(current_user.id))
 
 
 @router.get(
@@ -474,7 +542,13 @@ def get_search_history(
     description="This endpoint returns one search history for the authorized user by id.",
 )
 def get_one_search_history(
-    session: SessionDep, current_user: CurrentUser, search_history_id: int
+    session: SessionDep,
+    current_user: CurrentIdentity,
+    search_history_id: int,
+    offset: int = Query(0, ge=0, description="Skip the first leads"),
+    limit: int | None = Query(
+        None, ge=1, description="Return at most this many leads"
+    ),
 ) -> Any:
     statement = select(SearchHistory).where(
         SearchHistory.user_id == current_user.id,
@@ -485,58 +559,19 @@ def get_one_search_history(
         return JSONResponse(
             {"message": "No search history found."}, status_code=404
         )
-    internal_searches = []
-    for internal_search_id in search_history.internal_search_ids[
-        "internal_search_ids"
-    ]:
-        if search_history.source == "business":
-            statement = select(BusinessLead).where(
-                BusinessLead.id == internal_search_id,
-            )
-            internal_search = session.exec(statement).first()
-            internal_search = internal_search.dict()
 
-            statement = select(BusinessOwnerInfo).where(
-                BusinessOwnerInfo.business_lead_id == internal_search_id
-            )
-            business_owner_info = session.exec(statement).first()
-
-            if internal_search:
-                internal_search["employee"] = business_owner_info
-                internal_searches.append(internal_search)
-        else:
-            statement = select(PeopleLead).where(
-                PeopleLead.id == internal_search_id,
-            )
-            internal_search = session.exec(statement).first()
-            internal_search = internal_search.dict()
-
-            statement = select(House).where(
-                House.id == internal_search["house_id"]
-            )
-            house = session.exec(statement).first()
-
-            statement = select(Education).where(
-                Education.id == internal_search["education_id"]
-            )
-            education = session.exec(statement).first()
-
-            works = []
-            if type(internal_search["works_id"]) == list:
-                for work_id in internal_search["works_id"]:
-                    statement = select(Work).where(Work.id == work_id)
-                    work = session.exec(statement).first()
-                    works.append(work)
-
-            if internal_search:
-                internal_search["house"] = house
-                internal_search["education"] = education
-                internal_search["works"] = works
-                internal_searches.append(internal_search)
+    lead_ids = search_history.internal_search_ids["internal_search_ids"]
+    end = None if limit is None else offset + limit
+    internal_searches = load_search_history_leads(
+        session, search_history.source, lead_ids[offset:end]
+    )
     result = {
         "user_id": search_history.user_id,
         "search_time": search_history.search_time,
         "internal_search": internal_searches,
+        "total": len(lead_ids),
+        "offset": offset,
+        "limit": limit,
         "credits_used": search_history.credits_used,
         "source": search_history.source,
         "task_id": search_history.task_id,
@@ -545,6 +580,14 @@ def get_one_search_history(
     return result
 
 
+def _billing_history_statement(user_id: int) -> SelectOfScalar[Transaction]:
+    return (
+        select(Transaction)
+        .where(Transaction.user_id == user_id)
+        .order_by(Transaction.created_at.desc(), Transaction.id.desc())
+    )
+
+
 @router.get(
     "/me/billing-history",
     response_model=LimitOffsetPage[PublicTransaction],
@@ -552,12 +595,19 @@ def get_one_search_history(
     include_in_schema=False,
 )
 def get_billing_history(
-    session: SessionDep, current_user: CurrentUser
+    session: SessionDep, current_user: CurrentIdentity
 ) -> LimitOffsetPage[PublicTransaction]:
-    statement = (
-        select(Transaction)
-        .where(Transaction.user_id == current_user.id)
-        .order_by(Transaction.created_at.desc(), Transaction.id.desc())
-    )
-    billing_history = session.exec(statement).all()
-    return paginate(billing_history)
+    return paginate(session, _billing_history_statement(current_user.id))
+
+
+@router.get(
+    "/me/billing-history/cursor",
+    response_model=CursorPage[PublicTransaction],
+    description="This endpoint returns billing history for the authorized user, "
+    "page by page. Pass the next_page cursor of a page to get the next one.",
+    include_in_schema=False,
+)
+def get_billing_history_cursor(
+    session: SessionDep, current_user: CurrentIdentity
+) -> CursorPage[PublicTransaction]:
+    return paginate(session, _billing_history_statement(current_user.id))
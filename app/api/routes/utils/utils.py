@@ -1,9 +1,10 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Body, Depends
+from fastapi import APIRouter, Body, Depends, HTTPException, status
 from pydantic.networks import EmailStr
 
 from app.api.deps import get_current_active_superuser
+from app.core.redis_client import ping_redis
 from app.models import Message
 from app.utils import generate_test_email, send_email
 
@@ -28,3 +29,16 @@ def test_email(email_to: EmailStr) -> Message:
         html_content=email_data.html_content,
     )
     return Message(message="Test email sent")
+
+
+@router.get("/health-check/", include_in_schema=False)
+async def health_check() -> bool:
+    """
+    Health check of the API and its redis connection.
+    """
+    if not await ping_redis():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Redis is not reachable",
+        )
+    return True
@@ -1,46 +1,114 @@
 import csv
+from collections.abc import Callable, Iterable, Iterator, Sequence
 from io import StringIO
-from typing import Sequence
+from operator import attrgetter, itemgetter
+from typing import Any
 
 from app.models import BusinessLeadPublic, PeopleLeadPublic
 
+Projection = Callable[[Any], tuple]
 
-def write_to_csv(
-    csv_file_path: str,
-    headers: list[str],
-    scraped_datas: Sequence[BusinessLeadPublic] | Sequence[PeopleLeadPublic],
-) -> None:
-    output = StringIO()
-    writer = csv.writer(output)
 
-    # Write the headers to the CSV file
-    writer.writerow(headers)
+def _tuple_getter(names: list[str]) -> Callable[[Any], tuple]:
+    # attrgetter returns a bare value instead of a tuple for a single name
+    getter = attrgetter(*names)
+    if len(names) == 1:
+        return lambda data: (getter(data),)
+    return getter
+
+
+def _tuple_getter_by_index(indexes: list[int]) -> Callable[[tuple], tuple]:
+    getter = itemgetter(*indexes)
+    if len(indexes) == 1:
+        return lambda values: (getter(values),)
+    return getter
+
+
+def _nested_getter(root: str, names: list[str]) -> Callable[[Any], tuple]:
+    get_root = attrgetter(root)
+    get_values = _tuple_getter(names)
+    missing = (None,) * len(names)
+
+    def getter(data: Any) -> tuple:
+        root_value = get_root(data)
+        return get_values(root_value) if root_value else missing
+
+    return getter
+
 
-    # Write the data to the CSV file
-    for data in scraped_datas:
-        row = []
-        for header in headers:
-            # Check if the header has a nested attribute (e.g., 'owner.person_position')
-            if "." in header:
-                # Split the header to get the root attribute and the nested attribute
-                root_attr, nested_attr = header.split(".", 1)
+def compile_projection(headers: list[str]) -> Projection:
+    """
+    Build the function that turns an object into its CSV row once per
+    export. Headers such as employee.person_name read the attribute of the
+    nested object, or None when there is no nested object.
+    """
+    flat = [header for header in headers if "." not in header]
+    nested: dict[str, list[str]] = {}
+    for header in headers:
+        if "." in header:
+            root, name = header.split(".", 1)
+            nested.setdefault(root, []).append(name)
 
-                # Get the root attribute object
-                root_value = getattr(data, root_attr, None)
+    # every group is read with a single attrgetter call, the values are
+    # then put back in header order
+    getters = [_tuple_getter(flat)] if flat else []
+    getters += [_nested_getter(root, names) for root, names in nested.items()]
+    columns = flat + [
+        f"{root}.{name}" for root, names in nested.items() for name in names
+    ]
+    if columns == headers:
+        # already in header order, the usual case
+        order = None
+    else:
+        order = _tuple_getter_by_index([columns.index(h) for h in headers])
 
-                # If the root attribute exists and is an object, get the nested attribute
-                if root_value:
-                    value = getattr(root_value, nested_attr, None)
-                else:
-                    value = None
-            else:
-                # If it's not a nested attribute, get the value directly
-                value = getattr(data, header, None)
+    if len(getters) == 1 and order is None:
+        return getters[0]
 
-            row.append(value)
+    def project(data: Any) -> tuple:
+        values = ()
+        for getter in getters:
+            values += getter(data)
+        return order(values) if order else values
 
-        writer.writerow(row)
+    return project
 
-    # Save the CSV content to the specified file path
+
+def _rows(scraped_datas: Sequence[Any], projection: Projection) -> Iterable:
+    # rows of a Core query are already in header order
+    if scraped_datas and isinstance(scraped_datas[0], Sequence):
+        return scraped_datas
+    return map(projection, scraped_datas)
+
+
+def write_to_csv(
+    csv_file_path: str,
+    headers: list[str],
+    scraped_datas: (
+        Sequence[BusinessLeadPublic]
+        | Sequence[PeopleLeadPublic]
+        | Sequence[tuple]
+    ),
+) -> None:
     with open(csv_file_path, "w", newline="") as file:
-        file.write(output.getvalue())
+        writer = csv.writer(file)
+        writer.writerow(headers)
+        writer.writerows(_rows(scraped_datas, compile_projection(headers)))
+
+
+def stream_csv(
+    headers: list[str], chunks: Iterable[Sequence[Any]]
+) -> Iterator[str]:
+    # the header first, then the CSV text of one chunk at a time, so only
+    # a single chunk is ever held in memory
+    projection = compile_projection(headers)
+    output = StringIO()
+    writer = csv.writer(output)
+    writer.writerow(headers)
+    yield output.getvalue()
+
+    for chunk in chunks:
+        output.seek(0)
+        output.truncate()
+        writer.writerows(_rows(chunk, projection))
+        yield output.getvalue()
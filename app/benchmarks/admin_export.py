@@ -0,0 +1,145 @@
+"""
+Compare the streamed admin CSV export with the .all() + write_to_csv
+export it replaced, on a synthetic business lead table.
+
+    python -m app.benchmarks.admin_export --sizes 10000 100000 1000000
+
+The synthetic rows are generated in the database, half of them with owner
+info, inside a transaction that is rolled back at the end. Peak memory is
+the peak of Python allocations while the export runs.
+"""
+
+import argparse
+import logging
+import tempfile
+import tracemalloc
+from collections.abc import Callable
+
+from sqlalchemy import text
+from sqlmodel import Session, select
+
+from app.api.exports import gzip_stream, iter_admin_rows
+from app.api.routes.commands.commands import headers_business
+from app.api.write_to_csv import stream_csv, write_to_csv
+from app.benchmarks.utils import report, rollback_session, timed
+from app.models import BusinessLead
+
+INSERT_LEADS = text(
+    """
+    INSERT INTO businesslead (
+        company_name, company_address, company_phone, website,
+        business_type, state, country, city, zip_code, schedule_dict,
+        tags, services, scraped_date, received_date
+    )
+    SELECT
+        'Company ' || g, g || ' Main St', 'admin-bench-' || g,
+        'https://company' || g || '.example.com',
+        (ARRAY['Plumber', 'Dentist', 'Bakery'])[1 + g % 3],
+        (ARRAY['CA', 'NY', 'TX'])[1 + g % 3], 'United States',
+        (ARRAY['Austin', 'Boston', 'Denver'])[1 + g % 3],
+        lpad((g % 100000)::text, 5, '0'), '{"Monday": "9AM-5PM"}',
+        '["synthetic"]', '["benchmark"]', now(),
+        now() - g * interval '1 second'
+    FROM generate_series(1, :count) AS g
+    """
+)
+
+INSERT_OWNERS = text(
+    """
+    INSERT INTO businessownerinfo (
+        company_socials, person_name, person_position, person_socials,
+        person_summary, business_management, person_email, person_phone,
+        business_lead_id
+    )
+    SELECT
+        '["https://www.facebook.com/company"]', 'Owner ' || id, 'Owner',
+        '["https://www.linkedin.com/in/owner"]', 'Synthetic owner',
+        '{"owner": "Owner"}', 'owner' || id || '@example.com',
+        '+1555' || id, id
+    FROM businesslead
+    WHERE company_phone LIKE 'admin-bench-%' AND id % 2 = 0
+    """
+)
+
+
+def legacy_export(session: Session) -> None:
+    # the export download_csv_admin used before streaming
+    statement = select(BusinessLead).order_by(
+        BusinessLead.received_date.desc()
+    )
+    leads = session.exec(statement).all()
+    with tempfile.NamedTemporaryFile(suffix=".csv") as file:
+        write_to_csv(file.name, headers_business, leads)
+
+
+def streamed_export(session: Session, compress: bool = False) -> None:
+    content = stream_csv(
+        headers_business,
+        iter_admin_rows(session, "business", headers_business),
+    )
+    for _ in gzip_stream(content) if compress else content:
+        pass
+
+
+def peak_memory(func: Callable[..., None], *args) -> int:
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10000, 100000, 1000000]
+    )
+    parser.add_argument(
+        "--legacy-max",
+        type=int,
+        default=100000,
+        help="skip the legacy export above this size, it lazy loads the "
+        "owner of every lead with its own query",
+    )
+    parser.add_argument(
+        "--memory",
+        action="store_true",
+        help="also run every export under tracemalloc and report its peak",
+    )
+    args = parser.parse_args()
+
+    # statement logging would dominate the measurement
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+    for size in args.sizes:
+        implementations = [
+            ("streamed", lambda session: streamed_export(session)),
+            (
+                "streamed + gzip",
+                lambda session: streamed_export(session, True),
+            ),
+        ]
+        if size <= args.legacy_max:
+            implementations.append(("legacy .all()", legacy_export))
+
+        with rollback_session() as session:
+            # only the synthetic rows are exported, the rest of the table
+            # is hidden for the duration of the transaction
+            session.exec(text("DELETE FROM businessownerinfo"))
+            session.exec(text("DELETE FROM businesslead"))
+            session.exec(INSERT_LEADS, params={"count": size})
+            session.exec(INSERT_OWNERS)
+            session.exec(text("ANALYZE businesslead"))
+
+            for name, implementation in implementations:
+                session.expunge_all()
+                report(name, size, timed(implementation, session))
+                if args.memory:
+                    session.expunge_all()
+                    peak = peak_memory(implementation, session)
+                    print(f"{'':<32} peak memory {peak / 2**20:>10.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Compare the set-based business lead upsert with the record-by-record loop
+it replaced.
+
+    python -m app.benchmarks.bulk_upsert --sizes 1000 10000 100000
+
+Every run happens inside a transaction that is rolled back at the end.
+"""
+
+import argparse
+import datetime
+import logging
+
+from sqlmodel import Session, select
+
+from app.benchmarks.synthetic import business_leads
+from app.benchmarks.utils import report, rollback_session, timed
+from app.core.tasks.process_scraped_data import process_scraped_data
+from app.models import BusinessLead, BusinessLeadInternal, BusinessOwnerInfo
+
+
+def legacy_process_scraped_data(
+    scraped_data: list[BusinessLeadInternal], session: Session
+) -> None:
+    # the loop process_scraped_data used before the bulk upsert
+    for data in scraped_data:
+        if not data.company_phone:
+            continue
+
+        scraped_record = data.model_dump(exclude_unset=True)
+        scraped_record["received_date"] = datetime.datetime.now()
+        employee = scraped_record.pop("employee", None)
+        statement = select(BusinessLead).where(
+            BusinessLead.company_phone == data.company_phone
+        )
+        db_data = session.exec(statement).first()
+
+        if db_data:
+            db_data.sqlmodel_update(scraped_record)
+            session.add(db_data)
+        else:
+            db_obj = BusinessLead.model_validate(scraped_record)
+            session.add(db_obj)
+            session.flush()
+
+        if employee:
+            employee["business_lead_id"] = db_data.id if db_data else db_obj.id
+            session.add(BusinessOwnerInfo.model_validate(employee))
+
+    session.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 10000, 100000]
+    )
+    parser.add_argument(
+        "--skip-legacy",
+        action="store_true",
+        help="only run the bulk path, the loop needs minutes at 100k rows",
+    )
+    args = parser.parse_args()
+
+    # statement logging would dominate the measurement
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+    implementations = [("bulk upsert", process_scraped_data)]
+    if not args.skip_legacy:
+        implementations.append(("legacy loop", legacy_process_scraped_data))
+
+    for size in args.sizes:
+        leads = business_leads(size)
+        for name, implementation in implementations:
+            with rollback_session() as session:
+                report(
+                    f"{name} (insert)",
+                    size,
+                    timed(implementation, leads, session),
+                )
+                report(
+                    f"{name} (update)",
+                    size,
+                    timed(implementation, leads, session),
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Time the read_business_lead query for each filter combination on a
+synthetic business lead table, with the composite indexes or with the
+single-column indexes they replaced.
+
+    python -m app.benchmarks.business_lead_search --sizes 100000 1000000
+    python -m app.benchmarks.business_lead_search --legacy
+
+The rows are generated in the database, 300 business types over 2,000
+cities in 50 states, inside a transaction that is rolled back at the end.
+"""
+
+import argparse
+import logging
+import time
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.benchmarks.utils import rollback_session
+from app.workflows.leads import search_business_leads
+
+INSERT_LEADS = text(
+    """
+    INSERT INTO businesslead (
+        company_name, company_address, company_phone, business_type,
+        state, country, city, scraped_date, received_date
+    )
+    SELECT
+        'Company ' || g, g || ' Main St', 'search-bench-' || g,
+        'Type ' || g % 300, 'State ' || g % 2000 % 50, 'United States',
+        'City ' || g % 2000, now(), now()
+    FROM generate_series(1, :count) AS g
+    """
+)
+
+# the single-column business_type index instead of the composite ones
+LEGACY_INDEXES = [
+    "DROP INDEX ix_businesslead_business_type_state_city",
+    "DROP INDEX ix_businesslead_business_type_city",
+    "CREATE INDEX ix_businesslead_business_type "
+    "ON businesslead (business_type)",
+]
+
+BUSINESSES = ["Type 1", "Type 2", "Type 3"]
+FILTERS = {
+    "types + states": (["State 1", "State 2"], None),
+    "types + states + cities": (["State 1", "State 2"], ["City 51"]),
+    "types + cities": (None, ["City 51", "City 1052"]),
+}
+
+
+def best_of(session: Session, statement, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        session.exec(statement).all()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=30)
+    parser.add_argument(
+        "--legacy", action="store_true", help="single-column indexes"
+    )
+    args = parser.parse_args()
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+    for size in args.sizes:
+        with rollback_session() as session:
+            session.exec(INSERT_LEADS, params={"count": size})
+            if args.legacy:
+                for statement in LEGACY_INDEXES:
+                    session.exec(text(statement))
+            session.exec(text("ANALYZE businesslead"))
+
+            for name, (states, cities) in FILTERS.items():
+                statement = search_business_leads(
+                    BUSINESSES, states, cities, args.limit
+                )
+                seconds = best_of(session, statement, args.runs)
+                print(f"{name:<28} {size:>9} rows {seconds * 1000:>10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Compare the compiled CSV projection with the per-cell getattr loop
+write_to_csv used before, on in-memory leads, and with plain row tuples
+as a Core query returns them.
+
+    python -m app.benchmarks.csv_projection --rows 100000
+
+Only the CSV writing is measured, no database is involved.
+"""
+
+import argparse
+import csv
+from io import StringIO
+from typing import Any
+
+from app.api.routes.commands.commands import headers_business, headers_people
+from app.api.write_to_csv import compile_projection, stream_csv
+from app.benchmarks.synthetic import business_leads, people_leads
+from app.benchmarks.utils import report, timed
+from app.models import BusinessLead, BusinessOwnerInfo, PeopleLead
+
+
+def legacy_write(headers: list[str], scraped_datas: list[Any]) -> None:
+    # the loop write_to_csv used before the compiled projection
+    output = StringIO()
+    writer = csv.writer(output)
+    writer.writerow(headers)
+    for data in scraped_datas:
+        row = []
+        for header in headers:
+            if "." in header:
+                root_attr, nested_attr = header.split(".", 1)
+                root_value = getattr(data, root_attr, None)
+                if root_value:
+                    value = getattr(root_value, nested_attr, None)
+                else:
+                    value = None
+            else:
+                value = getattr(data, header, None)
+            row.append(value)
+        writer.writerow(row)
+
+
+def streamed_write(headers: list[str], rows: list[Any]) -> None:
+    chunks = (rows[i : i + 1000] for i in range(0, len(rows), 1000))
+    for _ in stream_csv(headers, chunks):
+        pass
+
+
+def business_objects(count: int) -> list[BusinessLead]:
+    leads = []
+    for lead in business_leads(count):
+        record = lead.model_dump(exclude={"employee"})
+        db_lead = BusinessLead(**record, received_date=lead.scraped_date)
+        if lead.employee:
+            db_lead.employee = BusinessOwnerInfo(**lead.employee.model_dump())
+        leads.append(db_lead)
+    return leads
+
+
+def people_objects(count: int) -> list[PeopleLead]:
+    return [
+        PeopleLead(
+            **lead.model_dump(exclude={"house", "work", "education"}),
+            scraped_date=None,
+            received_date=None,
+        )
+        for lead in people_leads(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    for source, headers, objects in (
+        ("business", headers_business, business_objects(args.rows)),
+        ("people", headers_people, people_objects(args.rows)),
+    ):
+        projection = compile_projection(headers)
+        tuples = [projection(data) for data in objects]
+        for name, rows, implementation in (
+            ("legacy getattr loop", objects, legacy_write),
+            ("compiled projection", objects, streamed_write),
+            ("row tuples", tuples, streamed_write),
+        ):
+            report(
+                f"{source}: {name}",
+                len(rows),
+                timed(implementation, headers, rows),
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Compare resolving the lead ids of a finished scraper task with one
+WHERE company_phone = ANY(:phones) query against the query per phone
+number finish-notification used before.
+
+    python -m app.benchmarks.lead_ids --sizes 100 1000 10000 50000
+
+Every run happens inside a transaction that is rolled back at the end.
+"""
+
+import argparse
+import logging
+
+from sqlmodel import Session
+
+from app.benchmarks.synthetic import business_leads
+from app.benchmarks.utils import report, rollback_session, timed
+from app.core.tasks.process_scraped_data import process_scraped_data
+from app.models import BusinessLead, PeopleLead
+from app.workflows.leads import resolve_lead_ids
+
+
+def legacy_resolve_lead_ids(
+    session: Session, source: str, keys: list[str]
+) -> list[int]:
+    # the loop finish_notification used before the set-based lookup
+    internal_search_ids = []
+    for item in keys:
+        lead: BusinessLead | PeopleLead | None
+        if source == "business":
+            lead = (
+                session.query(BusinessLead)
+                .filter_by(company_phone=item)
+                .first()
+            )
+        else:
+            lead = session.query(PeopleLead).filter_by(name=item).first()
+        if lead:
+            internal_search_ids.append(lead.id)
+    return internal_search_ids
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 1000, 10000, 50000]
+    )
+    parser.add_argument(
+        "--skip-legacy",
+        action="store_true",
+        help="only run the set-based lookup",
+    )
+    args = parser.parse_args()
+
+    # statement logging would dominate the measurement
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+    implementations = [("ANY(:phones)", resolve_lead_ids)]
+    if not args.skip_legacy:
+        implementations.append(("query per phone", legacy_resolve_lead_ids))
+
+    with rollback_session() as session:
+        leads = business_leads(max(args.sizes))
+        process_scraped_data(leads, session)
+        phones = [lead.company_phone for lead in leads]
+
+        for size in args.sizes:
+            for name, implementation in implementations:
+                session.expunge_all()
+                report(
+                    name,
+                    size,
+                    timed(implementation, session, "business", phones[:size]),
+                )
+
+
+if __name__ == "__main__":
+    main()
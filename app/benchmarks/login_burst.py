@@ -0,0 +1,159 @@
+"""
+Latency of an unrelated endpoint (GET /users/me) while the API takes a
+burst of logins. Compares bcrypt in the password pool with bcrypt in the
+thread pool of the sync routes, where the login route ran it before.
+
+    python -m app.benchmarks.login_burst --rate 200 --seconds 5
+
+The requests go through the ASGI app in this process, like behind one
+uvicorn worker. The logins use one user, created for the run and deleted
+at the end, redis is replaced by fakeredis.
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
+from typing import Any
+
+import httpx
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+
+from app import crud
+from app.core import redis_client, security
+from app.core.config import settings
+from app.core.db import engine
+from app.models import User, UserCreate
+from main import app, lifespan
+
+PASSWORD = "login-burst-password"
+
+
+async def _in_thread_pool(func: Callable[..., Any], *args: Any) -> Any:
+    # bcrypt on the threads of the sync routes, like before the pool
+    return await run_in_threadpool(func, *args)
+
+
+async def timed(request: Awaitable[httpx.Response]) -> float:
+    start = time.perf_counter()
+    response = await request
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def login_burst(
+    client: httpx.AsyncClient, email: str, rate: int, seconds: float
+) -> list[float]:
+    # requests are started on schedule, whether the previous ones are done
+    started = time.perf_counter()
+    logins = []
+    for i in range(int(rate * seconds)):
+        delay = started + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        request = client.post(
+            f"{settings.API_V1_STR}/login/access-token",
+            data={"username": email, "password": PASSWORD},
+        )
+        logins.append(asyncio.create_task(timed(request)))
+    return list(await asyncio.gather(*logins))
+
+
+async def probe(
+    client: httpx.AsyncClient, headers: dict[str, str], stop: asyncio.Event
+) -> list[float]:
+    latencies = []
+    while not stop.is_set():
+        request = client.get(
+            f"{settings.API_V1_STR}/users/me", headers=headers
+        )
+        latencies.append(await timed(request))
+        await asyncio.sleep(0.01)
+    return latencies
+
+
+def percentile(latencies: list[float], p: int) -> float:
+    return (
+        statistics.quantiles(latencies, n=100, method="inclusive")[p - 1]
+        * 1000
+    )
+
+
+async def run(mode: str, user: User, rate: int, seconds: float) -> None:
+    if mode == "thread pool":
+        security._in_password_pool = _in_thread_pool  # type: ignore
+    headers = {
+        "Authorization": "Bearer "
+        + security.create_access_token(user.id, timedelta(minutes=10))
+    }
+    transport = httpx.ASGITransport(app=app)  # type: ignore[arg-type]
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        # warm up the password pool and the user cache
+        await login_burst(client, user.email, rate=10, seconds=0.5)
+        await client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+
+        stop = asyncio.Event()
+        probing = asyncio.create_task(probe(client, headers, stop))
+        logins = await login_burst(client, user.email, rate, seconds)
+        stop.set()
+        probes = await probing
+
+    print(
+        f"{mode:<14} {len(logins):>7} {percentile(logins, 99):>12.0f} "
+        f"{percentile(probes, 50):>12.1f} {percentile(probes, 99):>12.1f} "
+        f"{max(probes) * 1000:>12.1f}"
+    )
+
+
+async def main_async(args: argparse.Namespace, user: User) -> None:
+    redis_client.use_fake_redis()
+    async with lifespan(app):
+        print(
+            f"{'bcrypt in':<14} {'logins':>7} {'login p99':>12} "
+            f"{'me p50 ms':>12} {'me p99 ms':>12} {'me max ms':>12}"
+        )
+        for mode in args.modes:
+            await run(mode, user, args.rate, args.seconds)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rate", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        default=["password pool", "thread pool"],
+        choices=["password pool", "thread pool"],
+    )
+    args = parser.parse_args()
+
+    # the request logging would dominate the measurement
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+    logging.disable(logging.INFO)
+
+    with Session(engine) as session:
+        user = crud.create_user(
+            session=session,
+            user_create=UserCreate(
+                email=f"login-burst-{uuid.uuid4().hex}@example.com",
+                password=PASSWORD,
+            ),
+        )
+        try:
+            asyncio.run(main_async(args, user))
+        finally:
+            session.delete(user.credits)
+            session.delete(user)
+            session.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Compare the single-query people lead search with the query per item
+read_people_lead ran before, for a request of 20 addresses.
+
+    python -m app.benchmarks.people_lead_search --sizes 100000 1000000
+    python -m app.benchmarks.people_lead_search --without-index
+
+The people are generated in the database, 200 streets in each of 2,000
+cities in 50 states, inside a transaction that is rolled back at the end.
+"""
+
+import argparse
+import logging
+import time
+
+from sqlalchemy import text
+from sqlmodel import Session, select
+
+from app.benchmarks.utils import rollback_session
+from app.models import PeopleDataRequest, PeopleLead
+from app.workflows.leads import search_people_leads
+
+INSERT_PEOPLE = text(
+    """
+    INSERT INTO peoplelead (
+        name, age, street, city, state, phones, emails, scraped_date,
+        received_date
+    )
+    SELECT
+        'Person ' || g, 18 + g % 70, 'Street ' || g / 2000 % 200,
+        'City ' || g % 2000, 'State ' || g % 2000 % 50,
+        '["+15550000000"]', '["person@example.com"]', now(), now()
+    FROM generate_series(1, :count) AS g
+    """
+)
+
+
+def requested_items(count: int) -> list[PeopleDataRequest]:
+    # every other address is a whole city, the rest a few streets of it
+    items = []
+    for i in range(count):
+        city = i * 97 % 2000
+        streets = None if i % 2 else [f"Street {i}", f"Street {i + 1}"]
+        items.append(
+            PeopleDataRequest(
+                city=f"City {city}",
+                state=f"State {city % 50}",
+                streets=streets,
+            )
+        )
+    return items
+
+
+def legacy_search(
+    session: Session, items: list[PeopleDataRequest], limit: int
+) -> list[PeopleLead]:
+    # one query per item, as read_people_lead did before
+    people_leads = []
+    for item in items:
+        statement = select(PeopleLead).where(
+            PeopleLead.city == item.city, PeopleLead.state == item.state
+        )
+        if item.streets:
+            statement = statement.where(PeopleLead.street.in_(item.streets))
+        people_leads.extend(session.exec(statement.limit(limit)).all())
+    return people_leads
+
+
+def single_query_search(
+    session: Session, items: list[PeopleDataRequest], limit: int
+) -> list[PeopleLead]:
+    return list(session.exec(search_people_leads(items, limit)).all())
+
+
+def best_of(func, session: Session, items, limit: int, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(session, items, limit)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000])
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=30)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--without-index",
+        action="store_true",
+        help="drop ix_peoplelead_state_city_street first",
+    )
+    args = parser.parse_args()
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+    items = requested_items(args.items)
+    for size in args.sizes:
+        with rollback_session() as session:
+            session.exec(INSERT_PEOPLE, params={"count": size})
+            if args.without_index:
+                session.exec(
+                    text("DROP INDEX ix_peoplelead_state_city_street")
+                )
+            session.exec(text("ANALYZE peoplelead"))
+
+            # without an ORDER BY both may return any matching leads
+            assert len(legacy_search(session, items, args.limit)) == len(
+                single_query_search(session, items, args.limit)
+            )
+            for name, func in (
+                ("query per item", legacy_search),
+                ("single query", single_query_search),
+            ):
+                seconds = best_of(func, session, items, args.limit, args.runs)
+                print(f"{name:<20} {size:>9} rows {seconds * 1000:>10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
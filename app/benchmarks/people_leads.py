@@ -0,0 +1,80 @@
+"""
+Compare the batched people lead pipeline with the flush-per-row loop it
+replaced, on synthetic PeopleLeadInternal batches.
+
+    python -m app.benchmarks.people_leads --sizes 1000 10000
+
+Every run happens inside a transaction that is rolled back at the end.
+"""
+
+import argparse
+import datetime
+import logging
+
+from sqlmodel import Session
+
+from app.benchmarks.synthetic import people_leads
+from app.benchmarks.utils import report, rollback_session, timed
+from app.core.tasks.process_scraped_data import process_people_data
+from app.models import Education, House, PeopleLead, PeopleLeadInternal, Work
+
+
+def legacy_process_people_data(
+    scraped_data: list[PeopleLeadInternal], session: Session
+) -> None:
+    # the loop process_people_data used before the batched pipeline
+    for data in scraped_data:
+        scraped_record = data.model_dump(exclude_unset=True)
+        scraped_record["scraped_date"] = datetime.datetime.now()
+        scraped_record["received_date"] = datetime.datetime.now()
+        house = scraped_record.pop("house", None)
+        works = scraped_record.pop("work", None)
+        education = scraped_record.pop("education", None)
+
+        if house:
+            db_obj_house = House.model_validate(house)
+            session.add(db_obj_house)
+            session.flush()
+
+        if education:
+            db_obj_ed = Education.model_validate(education)
+            session.add(db_obj_ed)
+            session.flush()
+
+        works_id = []
+        for work in works or []:
+            db_obj_work = Work.model_validate(work)
+            session.add(db_obj_work)
+            session.flush()
+            works_id.append(db_obj_work.id)
+
+        scraped_record["education_id"] = db_obj_ed.id if education else None
+        scraped_record["house_id"] = db_obj_house.id if house else None
+        scraped_record["works_id"] = works_id if works else None
+        session.add(PeopleLead.model_validate(scraped_record))
+
+    session.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    # statement logging would dominate the measurement
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+    implementations = [("batched pipeline", process_people_data)]
+    if not args.skip_legacy:
+        implementations.append(("legacy loop", legacy_process_people_data))
+
+    for size in args.sizes:
+        people = people_leads(size)
+        for name, implementation in implementations:
+            with rollback_session() as session:
+                report(name, size, timed(implementation, people, session))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import datetime
+import random
+import uuid
+
+from app.models import (
+    BusinessLeadInternal,
+    BusinessOwnerInfoCreate,
+    EducationInternal,
+    HouseInternal,
+    PeopleLeadInternal,
+    WorkInternal,
+)
+
+
+def business_leads(count: int, seed: int = 0) -> list[BusinessLeadInternal]:
+    """
+    Scraper-like business leads with unique phone numbers, roughly half of
+    them carry owner info.
+    """
+    rnd = random.Random(seed)
+    run = uuid.uuid4().hex[:8]
+    scraped_date = datetime.datetime.now()
+    leads = []
+    for i in range(count):
+        employee = None
+        if rnd.random() < 0.5:
+            employee = BusinessOwnerInfoCreate(
+                company_socials=[f"https://www.facebook.com/company{i}"],
+                person_name=f"Owner {i}",
+                person_position="Owner",
+                person_socials=[f"https://www.linkedin.com/in/owner{i}"],
+                person_summary="Synthetic owner",
+                business_management={"owner": f"Owner {i}"},
+                person_email=f"owner{i}@example.com",
+                person_phone=f"+1555{i:07d}",
+            )
+        leads.append(
+            BusinessLeadInternal(
+                company_name=f"Company {i}",
+                company_address=f"{i} Main St",
+                company_phone=f"bench-{run}-{i}",
+                website=f"https://company{i}.example.com",
+                business_type=rnd.choice(["Plumber", "Dentist", "Bakery"]),
+                state=rnd.choice(["CA", "NY", "TX"]),
+                country="United States",
+                city=rnd.choice(["Austin", "Boston", "Denver"]),
+                zip_code=f"{rnd.randint(10000, 99999)}",
+                schedule_dict={"Monday": "9AM-5PM"},
+                tags=["synthetic"],
+                services=["benchmark"],
+                scraped_date=scraped_date,
+                employee=employee,
+            )
+        )
+    return leads
+
+
+def people_leads(count: int, seed: int = 0) -> list[PeopleLeadInternal]:
+    """
+    Scraper-like people leads, most with a house and an education and
+    zero to three works each.
+    """
+    rnd = random.Random(seed)
+    people = []
+    for i in range(count):
+        house = None
+        if rnd.random() < 0.8:
+            house = HouseInternal(
+                address=f"{i} Oak Ave", price=rnd.randint(1, 900) * 1000.0
+            )
+        education = None
+        if rnd.random() < 0.6:
+            education = EducationInternal(
+                college=f"College {i % 50}",
+                degree="BSc",
+                from_date="2001",
+                to_date="2005",
+            )
+        works = [
+            WorkInternal(
+                company_name=f"Employer {j}",
+                position="Engineer",
+                work_from="2010",
+                work_to="2020",
+            )
+            for j in range(rnd.randint(0, 3))
+        ]
+        people.append(
+            PeopleLeadInternal(
+                name=f"Person {i}",
+                age=rnd.randint(18, 90),
+                city=rnd.choice(["Austin", "Boston", "Denver"]),
+                state=rnd.choice(["TX", "MA", "CO"]),
+                street=f"Street {i % 200}",
+                phones=[f"+1555{i:07d}"],
+                emails=[f"person{i}@example.com"],
+                house=house,
+                work=works or None,
+                education=education,
+            )
+        )
+    return people
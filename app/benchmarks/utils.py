@@ -0,0 +1,36 @@
+import time
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+from typing import Any
+
+from sqlmodel import Session
+
+from app.core.db import engine
+
+
+@contextmanager
+def rollback_session() -> Generator[Session, None, None]:
+    """
+    Session whose commits only release a savepoint, everything written
+    through it is rolled back when the block exits.
+    """
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            with Session(
+                bind=connection, join_transaction_mode="create_savepoint"
+            ) as session:
+                yield session
+        finally:
+            transaction.rollback()
+
+
+def timed(func: Callable[..., Any], *args: Any, **kwargs: Any) -> float:
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def report(name: str, rows: int, seconds: float) -> None:
+    rate = rows / seconds if seconds else float("inf")
+    print(f"{name:<32} {rows:>9} rows {seconds:>10.3f} s {rate:>12.0f} rows/s")
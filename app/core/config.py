@@ -63,6 +63,70 @@ class Settings(BaseSettings):
     REDIS_USER: str
     REDIS_PASSWORD: str
     REDIS_DB: int
+    # shared connection pools, see app/core/redis_client.py. Every open
+    # progress stream holds one connection of the async pool
+    REDIS_MAX_CONNECTIONS: int = 100
+    REDIS_POOL_TIMEOUT: float = 5.0
+    REDIS_CONNECT_TIMEOUT: float = 5.0
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+
+    # scraper callbacks are queued on redis streams, see ingestion_worker.py
+    INGESTION_READ_COUNT: int = 10
+    INGESTION_BLOCK_MS: int = 5000
+    INGESTION_MAX_RETRIES: int = 5
+    INGESTION_CLAIM_IDLE_MS: int = 60 * 1000
+    # wait after a redis error before reading again
+    INGESTION_ERROR_BACKOFF_SECONDS: float = 5.0
+    # rows per transaction of the streaming ndjson endpoints
+    INGESTION_STREAM_CHUNK_SIZE: int = 1000
+    INGESTION_STREAM_MAX_LINE_BYTES: int = 1024 * 1024
+
+    # internal scraper API client, see app/core/scraper_client.py
+    SCRAPER_CONNECT_TIMEOUT: float = 5.0
+    SCRAPER_READ_TIMEOUT: float = 30.0
+    SCRAPER_MAX_CONNECTIONS: int = 20
+    SCRAPER_MAX_ATTEMPTS: int = 3
+    SCRAPER_CIRCUIT_FAILURES: int = 5
+    SCRAPER_CIRCUIT_RESET_SECONDS: float = 30.0
+    # progress streams read the progress at least this often
+    SCRAPER_PROGRESS_POLL_SECONDS: float = 5.0
+    # see progress_flusher.py
+    PROGRESS_FLUSH_INTERVAL_SECONDS: float = 5.0
+    PROGRESS_FLUSH_BATCH_SIZE: int = 500
+    # events running longer are no longer flushed, and their reserved
+    # credits are given back
+    SCRAPER_EVENT_MAX_SECONDS: int = 24 * 60 * 60
+    # reservations of a scraper start that never got its task id
+    PENDING_RESERVATION_MAX_SECONDS: int = 15 * 60
+
+    # seconds /users/me/stats answers from the per-process cache
+    USER_STATS_CACHE_TTL: int = 30
+    # bcrypt runs in a pool of processes, see app/core/security.py
+    PASSWORD_HASH_WORKERS: int = 2
+    # failed logins per email before the email is locked for the window
+    LOGIN_MAX_FAILED_ATTEMPTS: int = 5
+    LOGIN_FAILED_WINDOW_SECONDS: int = 5 * 60
+
+    # per-process snapshots of the authenticated users, see user_cache.py
+    USER_CACHE_TTL: int = 10
+    USER_CACHE_SIZE: int = 10000
+    # seconds between checks for a business type catalog changed elsewhere
+    BUSINESS_TYPE_CATALOG_CHECK_SECONDS: float = 30.0
+
+    # unset logs DEBUG locally and INFO elsewhere, see app/core/logs.py
+    LOG_LEVEL: Literal["DEBUG", "INFO", "WARNING", "ERROR"] | None = None
+    LOG_FILE: str = "logfile.log"
+    # share of the DEBUG records that are written, the rest are dropped
+    LOG_DEBUG_SAMPLE_RATE: float = 1.0
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def log_level(self) -> str:
+        if self.LOG_LEVEL:
+            return self.LOG_LEVEL
+        if self.ENVIRONMENT == "local":
+            return "DEBUG"
+        return "INFO"
 
     SMTP_EMAIL: str
     SMTP_PASSWORD: str
@@ -4,8 +4,9 @@ from sqlmodel import Session, create_engine, select
 
 from app import crud
 from app.core.config import settings
-from app.models import User, UserCreate, BusinessType, BusinessTypeCreate
 from app.fixtures.business_types import BUSINESS_TYPES
+from app.models import User, UserCreate
+from app.workflows.business_types import seed_business_types
 
 
 def get_url():
@@ -32,14 +33,7 @@ def fixtures(session: Session) -> None:
         )
         user = crud.create_user(session=session, user_create=user_in)
 
-    business_types = session.exec(select(BusinessType)).all()
-    if not business_types:
-        for business_type in BUSINESS_TYPES:
-            business_type_in = BusinessTypeCreate(name=business_type)
-            db_obj = BusinessType.model_validate(business_type_in)
-            session.add(db_obj)
-
-        session.commit()
+    seed_business_types(session, BUSINESS_TYPES)
 
 
 def init_db(session: Session) -> None:
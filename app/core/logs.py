@@ -1,19 +1,108 @@
+import atexit
+import copy
+import json
 import logging
+import queue
+import random
+import threading
+from logging.handlers import QueueHandler, QueueListener
 
+from app.core.config import settings
 
-def _init_logger(name: str):
-    # logger configuration
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        filename="logfile.log",
-    )
-    logger = logging.getLogger(name)
-    return logger
+_listener: QueueListener | None = None
+_queue_handler: QueueHandler | None = None
+_lock = threading.Lock()
 
 
-def get_logger(name: str = "BE"):
-    return _init_logger(name)
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DebugSampler(logging.Filter):
+    """
+    Keeps a share of rate of the DEBUG records, all the others pass.
+    """
+
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1:
+            return True
+        return random.random() < self.rate
+
+
+class _ThreadQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the arguments may change before the listener formats the record,
+        # the traceback can stay as the listener is a thread of this process
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def configure_logging() -> None:
+    """
+    Sends the records of every logger to a queue once per process. A
+    listener thread writes them to LOG_FILE, so the request path never
+    waits on the file.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+    with _lock:
+        if _listener is not None:
+            return
+        records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+        _queue_handler = _ThreadQueueHandler(records)
+        # dropped records are never formatted nor enqueued
+        _queue_handler.addFilter(DebugSampler(settings.LOG_DEBUG_SAMPLE_RATE))
+
+        file_handler = logging.FileHandler(settings.LOG_FILE)
+        file_handler.setFormatter(JsonFormatter())
+
+        root = logging.getLogger()
+        root.setLevel(settings.log_level)
+        root.addHandler(_queue_handler)
+        _listener = QueueListener(records, file_handler)
+        _listener.start()
+        atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """
+    Writes the records still in the queue and stops the listener.
+    """
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is None:
+            return
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+        _queue_handler = None
+
+
+def get_logger(name: str = "BE") -> logging.Logger:
+    configure_logging()
+    return logging.getLogger(name)
 
 
 logger = get_logger()
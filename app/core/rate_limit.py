@@ -0,0 +1,51 @@
+import redis
+
+from app.core.logs import get_logger
+from app.core.redis_client import get_sync_redis
+
+logger = get_logger()
+
+
+class RateLimiter:
+    """
+    Counts events per key in fixed windows of window_seconds in redis,
+    shared by all the processes. Once limit events are counted the key is
+    limited until its window ends.
+
+    Blocking, async routes call it in the thread pool. When redis is not
+    reachable nothing is limited.
+    """
+
+    def __init__(self, prefix: str, limit: int, window_seconds: int) -> None:
+        self.prefix = prefix
+        self.limit = limit
+        self.window_seconds = window_seconds
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    def retry_after(self, key: str) -> int:
+        """
+        Seconds until the key is no longer limited, 0 when it is not.
+        """
+        pipeline = get_sync_redis().pipeline(transaction=False)
+        pipeline.get(self._key(key))
+        pipeline.ttl(self._key(key))
+        try:
+            count, ttl = pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Rate limit of {self.prefix} not checked: {e!r}")
+            return 0
+        if count is None or int(count) < self.limit:
+            return 0
+        return max(ttl, 1)
+
+    def hit(self, key: str) -> None:
+        pipeline = get_sync_redis().pipeline(transaction=True)
+        pipeline.incr(self._key(key))
+        # the window starts with its first event
+        pipeline.expire(self._key(key), self.window_seconds, nx=True)
+        try:
+            pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Rate limit of {self.prefix} not counted: {e!r}")
@@ -0,0 +1,125 @@
+import json
+from collections.abc import Mapping, Sequence
+from typing import Any
+
+import redis
+import redis.asyncio
+
+from app.core.config import settings
+from app.core.logs import get_logger
+
+logger = get_logger()
+
+_client: redis.asyncio.Redis | None = None
+_sync_client: redis.Redis | None = None
+
+
+def _pool_options() -> dict[str, Any]:
+    return {
+        "max_connections": settings.REDIS_MAX_CONNECTIONS,
+        # seconds to wait for a free connection once all are in use
+        "timeout": settings.REDIS_POOL_TIMEOUT,
+        "socket_connect_timeout": settings.REDIS_CONNECT_TIMEOUT,
+        # idle connections are pinged before they are used again
+        "health_check_interval": settings.REDIS_HEALTH_CHECK_INTERVAL,
+        "decode_responses": True,
+    }
+
+
+def _create_client() -> redis.asyncio.Redis:
+    pool = redis.asyncio.BlockingConnectionPool.from_url(
+        settings.REDIS_URI, **_pool_options()
+    )
+    return redis.asyncio.Redis(connection_pool=pool)
+
+
+def _create_sync_client() -> redis.Redis:
+    pool = redis.BlockingConnectionPool.from_url(
+        settings.REDIS_URI, **_pool_options()
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+async def open_redis() -> redis.asyncio.Redis:
+    global _client
+    # connections are made on first use, /utils/health-check/ pings redis
+    if _client is None:
+        _client = _create_client()
+    return _client
+
+
+async def close_redis() -> None:
+    global _client, _sync_client
+    if _client is not None:
+        await _client.aclose(close_connection_pool=True)
+        _client = None
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client.connection_pool.disconnect()
+        _sync_client = None
+
+
+def get_redis() -> redis.asyncio.Redis:
+    # opened in the app lifespan, created on first use everywhere else
+    global _client
+    if _client is None:
+        _client = _create_client()
+    return _client
+
+
+def get_sync_redis() -> redis.Redis:
+    """
+    Client for code that runs in the thread pool and for the workers,
+    with its own pool of the same size as the async one.
+    """
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = _create_sync_client()
+    return _sync_client
+
+
+def use_fake_redis() -> redis.Redis:
+    """
+    Replace both clients with fakeredis ones sharing a new in-memory
+    server, for tests. Returns the sync client.
+    """
+    import fakeredis
+
+    global _client, _sync_client
+    server = fakeredis.FakeServer()
+    _client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    _sync_client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    return _sync_client
+
+
+async def ping_redis() -> bool:
+    try:
+        return bool(await get_redis().ping())
+    except redis.RedisError as e:
+        logger.warning(f"Redis ping failed: {e!r}")
+        return False
+
+
+async def get_json_many(keys: Sequence[str]) -> list[Any]:
+    """
+    Values of the keys decoded from json in one MGET, None for the
+    missing ones.
+    """
+    if not keys:
+        return []
+    raws = await get_redis().mget(keys)
+    return [json.loads(raw) if raw is not None else None for raw in raws]
+
+
+async def set_json_many(
+    values: Mapping[str, Any], ex: int | None = None
+) -> None:
+    """
+    Set the keys to their values encoded as json, in one round trip.
+    """
+    if not values:
+        return
+    pipeline = get_redis().pipeline(transaction=False)
+    for key, value in values.items():
+        pipeline.set(key, json.dumps(value), ex=ex)
+    await pipeline.execute()
@@ -0,0 +1,165 @@
+import time
+from typing import Any
+
+import httpx
+from tenacity import (
+    AsyncRetrying,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+from app.core.config import settings
+from app.core.logs import get_logger
+
+logger = get_logger()
+
+# the scraper did not get the request, sending it again cannot start a
+# second scrape
+RETRYABLE_ERRORS = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.PoolTimeout,
+)
+RETRYABLE_STATUS_CODES = {502, 503}
+
+
+class ScraperUnavailable(Exception):
+    pass
+
+
+class _RetryableStatus(Exception):
+    def __init__(self, response: httpx.Response) -> None:
+        super().__init__(f"Scraper answered {response.status_code}")
+        self.response = response
+
+
+class CircuitBreaker:
+    """
+    Opens after failures consecutive failed calls and fails the calls of
+    the next reset_seconds at once. Then lets calls through again, the
+    first failure opens it again and the first success closes it.
+    """
+
+    def __init__(self, failures: int, reset_seconds: float) -> None:
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+
+    @property
+    def is_open(self) -> bool:
+        if self.opened_at is None:
+            return False
+        return time.monotonic() - self.opened_at < self.reset_seconds
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.opened_at is not None or (
+            self.consecutive_failures >= self.failures
+        ):
+            self.opened_at = time.monotonic()
+
+
+class ScraperClient:
+    """
+    Connection-pooled async client of the internal scraper API, one per
+    process for the lifespan of the app.
+
+    Requests that did not reach the scraper are retried a bounded number
+    of times with jittered exponential backoff. Calls still failing count
+    towards the circuit breaker, while it is open calls raise
+    ScraperUnavailable without a request.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport | None = None):
+        self.http = httpx.AsyncClient(
+            base_url=settings.INTERNAL_SCRAPER_API_ADDRESS,
+            timeout=httpx.Timeout(
+                settings.SCRAPER_READ_TIMEOUT,
+                connect=settings.SCRAPER_CONNECT_TIMEOUT,
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.SCRAPER_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.SCRAPER_MAX_CONNECTIONS,
+            ),
+            transport=transport,
+        )
+        self.circuit = CircuitBreaker(
+            settings.SCRAPER_CIRCUIT_FAILURES,
+            settings.SCRAPER_CIRCUIT_RESET_SECONDS,
+        )
+
+    async def close(self) -> None:
+        await self.http.aclose()
+
+    async def _post_once(self, path: str, payload: Any) -> httpx.Response:
+        response = await self.http.post(
+            path, params={"token": "supersecrettoken"}, json=payload
+        )
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            raise _RetryableStatus(response)
+        return response
+
+    async def post(self, path: str, payload: Any) -> httpx.Response:
+        if self.circuit.is_open:
+            raise ScraperUnavailable("Scraper circuit is open")
+
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(settings.SCRAPER_MAX_ATTEMPTS),
+            wait=wait_random_exponential(multiplier=0.2, max=2),
+            retry=retry_if_exception_type(
+                RETRYABLE_ERRORS + (_RetryableStatus,)
+            ),
+            reraise=True,
+        )
+        try:
+            response = await retrying(self._post_once, path, payload)
+        except _RetryableStatus as e:
+            self.circuit.record_failure()
+            return e.response
+        except httpx.HTTPError as e:
+            self.circuit.record_failure()
+            logger.error(f"Scraper request {path} failed: {e!r}")
+            raise ScraperUnavailable(str(e)) from e
+
+        if response.status_code >= 500:
+            self.circuit.record_failure()
+        else:
+            self.circuit.record_success()
+        return response
+
+    async def start_scraping(
+        self, source: str, payload: dict[str, Any]
+    ) -> httpx.Response:
+        if source == "business":
+            return await self.post("/start-scraping", payload)
+        return await self.post("/start-scraping-people", payload)
+
+
+_client: ScraperClient | None = None
+
+
+async def open_scraper_client() -> ScraperClient:
+    global _client
+    _client = ScraperClient()
+    return _client
+
+
+async def close_scraper_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def get_scraper_client() -> ScraperClient:
+    # opened in the app lifespan, created on first use everywhere else
+    global _client
+    if _client is None:
+        _client = ScraperClient()
+    return _client
@@ -1,16 +1,25 @@
+import asyncio
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any
+from typing import Any, TypeVar
 
 import jwt
-from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.core.passwords import (  # noqa: F401
+    get_password_hash,
+    pwd_context,
+    verify_password,
+)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
+T = TypeVar("T")
 
 ALGORITHM = "HS256"
 
+_password_pool: ProcessPoolExecutor | None = None
+
 
 def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
     expire = datetime.utcnow() + expires_delta
@@ -21,9 +30,41 @@ def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
     return encoded_jwt
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+def get_password_pool() -> ProcessPoolExecutor:
+    """
+    Processes that run bcrypt, so a burst of logins neither takes the
+    threads of the sync routes nor the CPU of the event loop. Started on
+    the first password check.
+    """
+    global _password_pool
+    if _password_pool is None:
+        _password_pool = ProcessPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            # forking a process with running threads is not safe
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _password_pool
+
+
+def close_password_pool() -> None:
+    global _password_pool
+    if _password_pool is not None:
+        _password_pool.shutdown(cancel_futures=True)
+        _password_pool = None
+
+
+async def _in_password_pool(func: Callable[..., T], *args: Any) -> T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_password_pool(), func, *args)
+
+
+async def verify_password_async(
+    plain_password: str, hashed_password: str
+) -> bool:
+    return await _in_password_pool(
+        verify_password, plain_password, hashed_password
+    )
 
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def get_password_hash_async(password: str) -> str:
+    return await _in_password_pool(get_password_hash, password)
@@ -0,0 +1,215 @@
+import json
+import threading
+from collections.abc import Callable
+from typing import Any
+
+import redis
+from pydantic import TypeAdapter, ValidationError
+from sqlmodel import Session, SQLModel
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.logs import get_logger
+from app.core.redis_client import get_sync_redis
+from app.core.tasks.process_scraped_data import (
+    process_people_data,
+    process_scraped_data,
+)
+from app.models import BusinessLeadInternal, PeopleLeadInternal
+
+logger = get_logger()
+
+CONSUMER_GROUP = "ingestion-workers"
+DEAD_LETTER_STREAM = "ingestion:dead-letter"
+
+# source -> (stream, payload schema, processor)
+SOURCES: dict[str, tuple[str, TypeAdapter, Callable[..., None]]] = {
+    "business": (
+        "ingestion:business",
+        TypeAdapter(list[BusinessLeadInternal]),
+        process_scraped_data,
+    ),
+    "people": (
+        "ingestion:people",
+        TypeAdapter(list[PeopleLeadInternal]),
+        process_people_data,
+    ),
+}
+
+
+def enqueue_batch(
+    source: str, rows: list[SQLModel], client: redis.Redis | None = None
+) -> str:
+    """
+    Append a scraped batch to the stream of its source and return the
+    message id. The batch is processed later by the ingestion worker.
+    """
+    stream = SOURCES[source][0]
+    payload = json.dumps([row.model_dump(mode="json") for row in rows])
+    client = client if client is not None else get_sync_redis()
+    return client.xadd(stream, {"source": source, "payload": payload})
+
+
+class IngestionWorker:
+    """
+    Consumes scraped batches from the ingestion streams as a member of a
+    consumer group, so any number of workers on any number of nodes share
+    the load.
+
+    A batch is acknowledged only once it is committed. Batches that fail
+    stay pending and are claimed again after INGESTION_CLAIM_IDLE_MS, by
+    this or any other worker. Batches that still fail after
+    INGESTION_MAX_RETRIES retries, or that do not validate at all, go to
+    the dead-letter stream. A redis error does not end the worker, it
+    reads again after INGESTION_ERROR_BACKOFF_SECONDS.
+    """
+
+    def __init__(
+        self,
+        consumer: str,
+        client: redis.Redis | None = None,
+        session_factory: Callable[[], Session] = lambda: Session(engine),
+    ) -> None:
+        self.consumer = consumer
+        self.client = client if client is not None else get_sync_redis()
+        self.session_factory = session_factory
+        self.streams = {
+            stream: source for source, (stream, *_) in SOURCES.items()
+        }
+
+    def ensure_groups(self) -> None:
+        for stream in self.streams:
+            try:
+                self.client.xgroup_create(
+                    stream, CONSUMER_GROUP, id="0", mkstream=True
+                )
+            except redis.ResponseError as e:
+                # BUSYGROUP, another worker created it first
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+    def run(self, stop: threading.Event) -> None:
+        logger.info(f"Ingestion worker {self.consumer} started")
+        groups_ready = False
+        while not stop.is_set():
+            try:
+                if not groups_ready:
+                    self.ensure_groups()
+                    groups_ready = True
+                self.run_once()
+            except redis.RedisError:
+                # batches that fail are handled in run_once, this is redis
+                # itself. A restarted redis may have lost the groups.
+                logger.exception(
+                    f"Ingestion worker {self.consumer} failed to read"
+                )
+                groups_ready = False
+                stop.wait(settings.INGESTION_ERROR_BACKOFF_SECONDS)
+        logger.info(f"Ingestion worker {self.consumer} stopped")
+
+    def run_once(self) -> int:
+        """
+        Retry or dead-letter stale pending batches, then block for new
+        ones. Returns the number of batches handled.
+        """
+        handled = self._reclaim()
+        response = self.client.xreadgroup(
+            CONSUMER_GROUP,
+            self.consumer,
+            {stream: ">" for stream in self.streams},
+            count=settings.INGESTION_READ_COUNT,
+            block=settings.INGESTION_BLOCK_MS,
+        )
+        for stream, messages in response or []:
+            for message_id, fields in messages:
+                self._handle(stream, message_id, fields)
+                handled += 1
+        return handled
+
+    def _reclaim(self) -> int:
+        handled = 0
+        for stream in self.streams:
+            pending = self.client.xpending_range(
+                stream,
+                CONSUMER_GROUP,
+                min="-",
+                max="+",
+                count=settings.INGESTION_READ_COUNT,
+                idle=settings.INGESTION_CLAIM_IDLE_MS,
+            )
+            for entry in pending:
+                claimed = self.client.xclaim(
+                    stream,
+                    CONSUMER_GROUP,
+                    self.consumer,
+                    settings.INGESTION_CLAIM_IDLE_MS,
+                    [entry["message_id"]],
+                )
+                for message_id, fields in claimed:
+                    if not fields:
+                        # deleted while pending, nothing left to process
+                        self._ack(stream, message_id)
+                    elif (
+                        entry["times_delivered"]
+                        > settings.INGESTION_MAX_RETRIES
+                    ):
+                        self._dead_letter(
+                            stream, message_id, fields, "max retries exceeded"
+                        )
+                    else:
+                        self._handle(stream, message_id, fields)
+                    handled += 1
+        return handled
+
+    def _handle(
+        self, stream: str, message_id: str, fields: dict[str, Any]
+    ) -> None:
+        _, schema, processor = SOURCES[self.streams[stream]]
+        try:
+            rows = schema.validate_json(fields["payload"])
+        except (KeyError, ValidationError) as e:
+            self._dead_letter(stream, message_id, fields, f"invalid: {e}")
+            return
+
+        try:
+            with self.session_factory() as session:
+                processor(rows, session)
+        except Exception:
+            # stays pending and is claimed again once it is idle
+            logger.exception(
+                f"Failed to process batch {message_id} from {stream}"
+            )
+            return
+
+        self._ack(stream, message_id)
+        logger.info(f"Processed batch {message_id} from {stream}")
+
+    def _ack(self, stream: str, message_id: str) -> None:
+        pipe = self.client.pipeline()
+        pipe.xack(stream, CONSUMER_GROUP, message_id)
+        pipe.xdel(stream, message_id)
+        pipe.execute()
+
+    def _dead_letter(
+        self,
+        stream: str,
+        message_id: str,
+        fields: dict[str, Any],
+        reason: str,
+    ) -> None:
+        logger.error(
+            f"Dead-lettering batch {message_id} from {stream}: {reason}"
+        )
+        pipe = self.client.pipeline()
+        pipe.xadd(
+            DEAD_LETTER_STREAM,
+            {
+                **fields,
+                "stream": stream,
+                "message_id": message_id,
+                "reason": reason[:1000],
+            },
+        )
+        pipe.xack(stream, CONSUMER_GROUP, message_id)
+        pipe.xdel(stream, message_id)
+        pipe.execute()
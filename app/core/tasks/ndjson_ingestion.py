@@ -0,0 +1,181 @@
+import zlib
+from collections.abc import AsyncIterable, AsyncIterator, Callable
+
+from pydantic import ValidationError
+from sqlmodel import Session, SQLModel
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.logs import get_logger
+from app.models import IngestionChunkReport, IngestionReport, RejectedRow
+
+logger = get_logger()
+
+# accept gzip headers only, concatenated members are allowed
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+# upper bound of decompressed bytes per decompress() call
+DECOMPRESS_SIZE = 64 * 1024
+
+
+class NDJSONError(ValueError):
+    # set by ingest_ndjson to the chunks saved before the error
+    report: IngestionReport | None = None
+
+
+async def gunzip(body: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    # bounded output per call, so a small compressed body can't expand
+    # into one huge buffer
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+    pending = False
+    try:
+        async for data in body:
+            while data:
+                pending = True
+                output = decompressor.decompress(data, DECOMPRESS_SIZE)
+                if output:
+                    yield output
+                if decompressor.eof:
+                    data = decompressor.unused_data
+                    decompressor = zlib.decompressobj(GZIP_WBITS)
+                    pending = False
+                else:
+                    data = decompressor.unconsumed_tail
+        output = decompressor.flush()
+    except zlib.error as e:
+        raise NDJSONError(f"Invalid gzip stream: {e}") from e
+    if output:
+        yield output
+    if pending:
+        raise NDJSONError("Truncated gzip stream")
+
+
+async def iter_lines(
+    chunks: AsyncIterable[bytes], max_line_bytes: int
+) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for data in chunks:
+        *lines, buffer = (buffer + data).split(b"\n")
+        for line in lines:
+            yield line
+        if len(buffer) > max_line_bytes:
+            raise NDJSONError(f"Line exceeds {max_line_bytes} bytes")
+    if buffer:
+        yield buffer
+
+
+def _error_detail(error: ValidationError) -> str:
+    details = []
+    for e in error.errors():
+        location = ".".join(map(str, e["loc"]))
+        details.append(f"{location}: {e['msg']}" if location else e["msg"])
+    return "; ".join(details)
+
+
+def _save_rows(
+    processor: Callable[[list, Session], None],
+    rows: list[SQLModel],
+    session_factory: Callable[[], Session],
+) -> None:
+    with session_factory() as session:
+        processor(rows, session)
+
+
+class _ChunkWriter:
+    def __init__(
+        self,
+        processor: Callable[[list, Session], None],
+        session_factory: Callable[[], Session],
+    ) -> None:
+        self.processor = processor
+        self.session_factory = session_factory
+        self.report = IngestionReport(accepted=0, rejected=0, chunks=[])
+        self.rows: list[tuple[int, SQLModel]] = []
+        self.errors: list[RejectedRow] = []
+        self.line = 0
+
+    def __len__(self) -> int:
+        return len(self.rows) + len(self.errors)
+
+    async def flush(self) -> None:
+        if not len(self):
+            return
+
+        chunk = len(self.report.chunks)
+        accepted = len(self.rows)
+        if self.rows:
+            try:
+                await run_in_threadpool(
+                    _save_rows,
+                    self.processor,
+                    [row for _, row in self.rows],
+                    self.session_factory,
+                )
+            except Exception:
+                logger.exception(f"Failed to save chunk {chunk}")
+                accepted = 0
+                self.errors.extend(
+                    RejectedRow(line=line, detail="Chunk could not be saved")
+                    for line, _ in self.rows
+                )
+
+        self.errors.sort(key=lambda error: error.line)
+        self.report.chunks.append(
+            IngestionChunkReport(
+                chunk=chunk,
+                accepted=accepted,
+                rejected=len(self.errors),
+                errors=self.errors,
+            )
+        )
+        self.report.accepted += accepted
+        self.report.rejected += len(self.errors)
+        self.report.lines = self.line
+        self.rows, self.errors = [], []
+
+
+async def ingest_ndjson(
+    body: AsyncIterable[bytes],
+    schema: type[SQLModel],
+    processor: Callable[[list, Session], None],
+    gzipped: bool = True,
+    session_factory: Callable[[], Session] = lambda: Session(engine),
+) -> IngestionReport:
+    """
+    Validate and save newline-delimited JSON rows while the body is still
+    being read. Every INGESTION_STREAM_CHUNK_SIZE lines are saved in their
+    own transaction, so only one chunk of rows is held in memory.
+
+    A body that can't be read raises NDJSONError carrying the report of the
+    chunks already saved. The rows read since the last chunk are dropped,
+    so the body can be resent from the line after report.lines.
+    """
+    writer = _ChunkWriter(processor, session_factory)
+    chunks = gunzip(body) if gzipped else body
+    lines = iter_lines(chunks, settings.INGESTION_STREAM_MAX_LINE_BYTES)
+
+    try:
+        async for line in lines:
+            writer.line += 1
+            if not line.strip():
+                continue
+            try:
+                writer.rows.append(
+                    (writer.line, schema.model_validate_json(line))
+                )
+            except ValidationError as e:
+                writer.errors.append(
+                    RejectedRow(line=writer.line, detail=_error_detail(e))
+                )
+            if len(writer) >= settings.INGESTION_STREAM_CHUNK_SIZE:
+                await writer.flush()
+    except NDJSONError as e:
+        e.report = writer.report
+        raise
+    await writer.flush()
+
+    logger.info(
+        f"NDJSON ingestion completed [{writer.report.accepted} accepted, "
+        f"{writer.report.rejected} rejected]"
+    )
+    return writer.report
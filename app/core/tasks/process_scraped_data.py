@@ -1,14 +1,16 @@
 import datetime
-import logging
+from collections.abc import Iterable, Iterator
+from typing import Any
 
-from sqlmodel import Session, select
+from sqlalchemy import Integer, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlmodel import Session, SQLModel, delete, func, update
 
 from app.core.logs import get_logger
 from app.models import (
     BusinessLead,
     BusinessLeadInternal,
     BusinessOwnerInfo,
-    BusinessOwnerInfoCreate,
     Education,
     House,
     PeopleLead,
@@ -16,101 +18,218 @@ from app.models import (
     Work,
 )
 
-logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
-
 logger = get_logger()
 
+# ids per DELETE ... IN statement
+BULK_CHUNK_SIZE = 1000
 
-def process_scraped_data(
-    scraped_data: list[BusinessLeadInternal], session: Session
-) -> None:
-    # Process & save scraped data
-    # check if phone number already exists
-    # if exists, update the record
-    # else create a new record
 
-    logger.info(f"Processing scraped data [{len(scraped_data)} records]")
+def _chunks(items: list, size: int) -> Iterator[list]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
 
+def _dedupe_business_leads(
+    scraped_data: list[BusinessLeadInternal],
+) -> tuple[dict[str, dict[str, Any]], dict[str, dict[str, Any]]]:
+    # duplicates of a phone number are merged in batch order, the same
+    # way the record-by-record updates used to overwrite each other
+    records: dict[str, dict[str, Any]] = {}
+    employees: dict[str, dict[str, Any]] = {}
     for data in scraped_data:
         if not data.company_phone:
             logger.warning("Skipping record: company_phone is missing")
             continue
+        if data.company_phone in records:
+            records[data.company_phone].update(
+                data.model_dump(exclude_unset=True, exclude={"employee"})
+            )
+        else:
+            records[data.company_phone] = data.model_dump(exclude={"employee"})
+        if data.employee:
+            employees[data.company_phone] = data.employee.model_dump()
+    return records, employees
 
-        scraped_record = data.model_dump(exclude_unset=True)
-        scraped_record["received_date"] = datetime.datetime.now()
-        employee = scraped_record.pop("employee")
-        statement = select(BusinessLead).where(
-            BusinessLead.company_phone == data.company_phone
+
+def _business_lead_update_columns(excluded: Any, columns: Iterable[str]):
+    # optional fields the scraper left empty must not wipe stored values
+    update_columns = {}
+    for column in columns:
+        if column == "company_phone":
+            continue
+        field = BusinessLeadInternal.model_fields.get(column)
+        if field is not None and not field.is_required():
+            update_columns[column] = func.coalesce(
+                excluded[column], BusinessLead.__table__.c[column]
+            )
+        else:
+            update_columns[column] = excluded[column]
+    return update_columns
+
+
+def _upsert_business_leads(
+    session: Session, records: list[dict[str, Any]]
+) -> dict[str, int]:
+    # executed as a core executemany on the session's connection,
+    # sqlalchemy batches the parameter sets into multi-row VALUES
+    # statements; the ORM bulk path would split them by their NULL columns
+    statement = insert(BusinessLead.__table__)
+    statement = statement.on_conflict_do_update(
+        index_elements=[BusinessLead.company_phone],
+        set_=_business_lead_update_columns(
+            statement.excluded, records[0].keys()
+        ),
+    ).returning(BusinessLead.id, BusinessLead.company_phone)
+    return {
+        company_phone: lead_id
+        for lead_id, company_phone in session.connection().execute(
+            statement, records
         )
-        db_data = session.exec(statement).first()
+    }
 
-        db_data_employee = None
 
-        if db_data:
-            db_data.sqlmodel_update(scraped_record)
-            session.add(db_data)
-        else:
-            db_obj = BusinessLead.model_validate(scraped_record)
-            session.add(db_obj)
-            session.flush()
-
-        if employee:
-            if db_data:
-                employee["business_lead_id"] = db_data.id
-            else:
-                employee["business_lead_id"] = db_obj.id
-            db_obj_employee = BusinessOwnerInfo.model_validate(employee)
-            session.add(db_obj_employee)
+def _replace_business_owners(
+    session: Session, employees: list[dict[str, Any]]
+) -> None:
+    lead_ids = [employee["business_lead_id"] for employee in employees]
+    for chunk in _chunks(lead_ids, BULK_CHUNK_SIZE):
+        session.exec(
+            delete(BusinessOwnerInfo).where(
+                BusinessOwnerInfo.business_lead_id.in_(chunk)
+            )
+        )
+    session.connection().execute(
+        insert(BusinessOwnerInfo.__table__), employees
+    )
+
+
+def process_scraped_data(
+    scraped_data: list[BusinessLeadInternal], session: Session
+) -> None:
+    # Process & save scraped data
+    # dedupe the batch by phone number, upsert all leads with
+    # INSERT ... ON CONFLICT (company_phone) DO UPDATE ... RETURNING id
+    # and bulk insert the owner info with the returned ids
+
+    logger.info(f"Processing scraped data [{len(scraped_data)} records]")
+
+    records, employees = _dedupe_business_leads(scraped_data)
+    received_date = datetime.datetime.now()
+    for scraped_record in records.values():
+        scraped_record["received_date"] = received_date
+
+    if not records:
+        logger.info("Scraped data processing completed")
+        return
+
+    lead_ids = _upsert_business_leads(session, list(records.values()))
+
+    owners = [
+        {**employee, "business_lead_id": lead_ids[company_phone]}
+        for company_phone, employee in employees.items()
+    ]
+    if owners:
+        _replace_business_owners(session, owners)
 
     session.commit()
-    logger.info("Scraped data processing completed")
+    logger.info(
+        f"Scraped data processing completed [{len(lead_ids)} leads upserted]"
+    )
+
+
+def _insert_returning_ids(
+    session: Session, model: type[SQLModel], rows: list[dict[str, Any]]
+) -> list[int]:
+    # multi-row INSERT ... RETURNING id, ids come back in the order of rows
+    if not rows:
+        return []
+    table = model.__table__
+    statement = insert(table).returning(
+        table.c.id, sort_by_parameter_order=True
+    )
+    return list(session.connection().execute(statement, rows).scalars())
 
 
 def process_people_data(
     scraped_data: list[PeopleLeadInternal], session: Session
 ) -> None:
     # Process & save scraped data
-    # check if phone number already exists
-    # if exists, update the record
-    # else create a new record
+    # insert houses, educations and works of the whole batch first,
+    # map their ids back to the people, insert the people and finally
+    # point every work at its person
 
     logger.info(f"Processing scraped data [{len(scraped_data)} records]")
 
-    for data in scraped_data:
-
-        scraped_record = data.model_dump(exclude_unset=True)
-        scraped_record["scraped_date"] = datetime.datetime.now()
-        scraped_record["received_date"] = datetime.datetime.now()
-        house = scraped_record.pop("house")
-        works = scraped_record.pop("work")
-        education = scraped_record.pop("education")
-
-        if house:
-            db_obj_house = House.model_validate(house)
-            session.add(db_obj_house)
-            session.flush()
-
-        if education:
-            db_obj_ed = Education.model_validate(education)
-            session.add(db_obj_ed)
-            session.flush()
-
-        works_id = []
-        if works:
-            for work in works:
-                db_obj_work = Work.model_validate(work)
-                session.add(db_obj_work)
-                session.flush()
-                works_id.append(db_obj_work.id)
-
-        if scraped_record:
-            scraped_record["education_id"] = (
-                db_obj_ed.id if education else None
+    if not scraped_data:
+        logger.info("Scraped data processing completed")
+        return
+
+    now = datetime.datetime.now()
+    records = []
+    houses, house_owners = [], []
+    educations, education_owners = [], []
+    works, work_owners = [], []
+    for index, data in enumerate(scraped_data):
+        scraped_record = data.model_dump(
+            exclude={"house", "work", "education"}
+        )
+        scraped_record["scraped_date"] = now
+        scraped_record["received_date"] = now
+        scraped_record["house_id"] = None
+        scraped_record["education_id"] = None
+        scraped_record["works_id"] = [] if data.work else None
+        records.append(scraped_record)
+
+        if data.house:
+            houses.append(data.house.model_dump())
+            house_owners.append(index)
+        if data.education:
+            educations.append(data.education.model_dump())
+            education_owners.append(index)
+        for work in data.work or []:
+            works.append(work.model_dump())
+            work_owners.append(index)
+
+    house_ids = _insert_returning_ids(session, House, houses)
+    for index, house_id in zip(house_owners, house_ids, strict=True):
+        records[index]["house_id"] = house_id
+
+    education_ids = _insert_returning_ids(session, Education, educations)
+    for index, education_id in zip(
+        education_owners, education_ids, strict=True
+    ):
+        records[index]["education_id"] = education_id
+
+    work_ids = _insert_returning_ids(session, Work, works)
+    for index, work_id in zip(work_owners, work_ids, strict=True):
+        records[index]["works_id"].append(work_id)
+
+    people_ids = _insert_returning_ids(session, PeopleLead, records)
+
+    if work_ids:
+        # one UPDATE ... FROM unnest(:work_ids, :people_ids)
+        owners = (
+            func.unnest(
+                bindparam("work_ids", work_ids, type_=ARRAY(Integer)),
+                bindparam(
+                    "people_ids",
+                    [people_ids[index] for index in work_owners],
+                    type_=ARRAY(Integer),
+                ),
             )
-            scraped_record["house_id"] = db_obj_house.id if house else None
-            scraped_record["works_id"] = works_id if works else None
-            db_obj = PeopleLead.model_validate(scraped_record)
-            session.add(db_obj)
+            .table_valued("work_id", "person_id")
+            .render_derived()
+        )
+        session.exec(
+            update(Work)
+            .where(Work.id == owners.c.work_id)
+            .values(person_id=owners.c.person_id)
+            .execution_options(synchronize_session=False)
+        )
 
     session.commit()
-    logger.info("Scraped data processing completed")
+    logger.info(
+        f"Scraped data processing completed [{len(people_ids)} people, "
+        f"{len(house_ids)} houses, {len(education_ids)} educations, "
+        f"{len(work_ids)} works inserted]"
+    )
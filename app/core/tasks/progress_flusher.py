@@ -0,0 +1,153 @@
+import json
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+import redis
+from sqlalchemy import Integer, Update, column, func, literal, update, values
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.logs import get_logger
+from app.core.redis_client import get_sync_redis
+from app.models import ScraperEventData
+from app.workflows.credits import release_stale_reservations
+from app.workflows.scraper import ACTIVE_EVENTS, progress_key
+
+logger = get_logger()
+
+COUNTERS = ("scraped_results", "total_results", "looked_owner")
+
+
+def bulk_progress_update(rows: list[tuple[int, Any, Any, Any]]) -> Update:
+    # one UPDATE ... FROM (VALUES ...) for all the changed events. Every
+    # value is an integer parameter, so a column of NULLs is still typed,
+    # and a counter missing from the progress keeps the stored value.
+    progress = values(
+        column("id", Integer),
+        *(column(counter, Integer) for counter in COUNTERS),
+        name="progress",
+    ).data([tuple(literal(value, Integer) for value in row) for row in rows])
+    return (
+        update(ScraperEventData)
+        .where(ScraperEventData.id == progress.c.id)
+        .values(
+            {
+                counter: func.coalesce(
+                    progress.c[counter], getattr(ScraperEventData, counter)
+                )
+                for counter in COUNTERS
+            }
+        )
+    )
+
+
+class ProgressFlusher:
+    """
+    Copies the progress the scraper reports to redis onto the events in
+    postgres, in the background instead of on every status read.
+
+    Every PROGRESS_FLUSH_INTERVAL_SECONDS the keys of the active events
+    are read with MGET, compared with the values this flusher persisted
+    last, and the changed ones are written with a single UPDATE per batch
+    of PROGRESS_FLUSH_BATCH_SIZE events. Several flushers can run, they
+    only write the same values twice.
+
+    Events whose key is gone, or that started more than
+    SCRAPER_EVENT_MAX_SECONDS ago, are dropped from the active events, so
+    scrapers that died without a final status are not read forever. The
+    credits reserved for scrapers that never started or never reported
+    their end are given back on the same interval.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis | None = None,
+        session_factory: Callable[[], Session] = lambda: Session(engine),
+    ) -> None:
+        self.client = client if client is not None else get_sync_redis()
+        self.session_factory = session_factory
+        # event id -> raw progress last written to postgres
+        self.persisted: dict[int, str] = {}
+
+    def track_running_events(self) -> None:
+        # events started before the active set existed
+        with self.session_factory() as session:
+            statement = select(ScraperEventData.id).where(
+                ScraperEventData.status == "running"
+            )
+            ids = session.exec(statement).all()
+        if ids:
+            self.client.zadd(
+                ACTIVE_EVENTS, {id: time.time() for id in ids}, nx=True
+            )
+
+    def run(self, stop: threading.Event) -> None:
+        self.track_running_events()
+        logger.info("Progress flusher started")
+        while not stop.is_set():
+            try:
+                self.run_once()
+                self.release_stale_reservations()
+            except (redis.RedisError, SQLAlchemyError):
+                # the next run reads the progress again
+                logger.exception("Failed to flush scraper progress")
+            stop.wait(settings.PROGRESS_FLUSH_INTERVAL_SECONDS)
+        logger.info("Progress flusher stopped")
+
+    def release_stale_reservations(self) -> int:
+        with self.session_factory() as session:
+            released = release_stale_reservations(session)
+        if released:
+            logger.info(f"Released {released} stale credit reservations")
+        return released
+
+    def run_once(self) -> int:
+        """
+        Flush the progress that changed since the last run. Returns the
+        number of events written.
+        """
+        started_before = time.time() - settings.SCRAPER_EVENT_MAX_SECONDS
+        self.client.zremrangebyscore(ACTIVE_EVENTS, "-inf", started_before)
+        ids = sorted(
+            int(id) for id in self.client.zrange(ACTIVE_EVENTS, 0, -1)
+        )
+        active = set(ids)
+        self.persisted = {
+            id: raw for id, raw in self.persisted.items() if id in active
+        }
+
+        flushed = 0
+        batch_size = settings.PROGRESS_FLUSH_BATCH_SIZE
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start : start + batch_size]
+            raws = self.client.mget([progress_key(id) for id in batch])
+            missing = [
+                id for id, raw in zip(batch, raws, strict=True) if raw is None
+            ]
+            if missing:
+                self.client.zrem(ACTIVE_EVENTS, *missing)
+            changed = {
+                id: raw
+                for id, raw in zip(batch, raws, strict=True)
+                if raw is not None and self.persisted.get(id) != raw
+            }
+            rows = []
+            for id, raw in changed.items():
+                try:
+                    progress = json.loads(raw)
+                    rows.append(
+                        (id, *(progress.get(counter) for counter in COUNTERS))
+                    )
+                except (ValueError, AttributeError):
+                    logger.error(f"Invalid progress of scraper event {id}")
+            if rows:
+                with self.session_factory() as session:
+                    session.exec(bulk_progress_update(rows))
+                    session.commit()
+            self.persisted.update(changed)
+            flushed += len(rows)
+        return flushed
@@ -4,15 +4,28 @@ from typing import Any
 from sqlmodel import Session, select
 
 from app.core.security import get_password_hash, verify_password
-from app.models import User, UserCreate, UserUpdate
+from app.models import Credit, User, UserCreate, UserUpdate
 
 
-def create_user(*, session: Session, user_create: UserCreate) -> User:
+def create_user(
+    *,
+    session: Session,
+    user_create: UserCreate,
+    hashed_password: str | None = None,
+) -> User:
+    # routes hash the password in the password pool and pass it in
     user_create = user_create.model_dump(exclude_unset=True, mode="json")
     user_create["last_password_reset_time"] = datetime.now()
+    if hashed_password is None:
+        hashed_password = get_password_hash(user_create["password"])
     db_obj = User.model_validate(
-        user_create,
-        update={"hashed_password": get_password_hash(user_create["password"])},
+        user_create, update={"hashed_password": hashed_password}
+    )
+    # the balance row is created with the user, credit changes only ever
+    # update it
+    now = datetime.now()
+    db_obj.credits = Credit(
+        total_credit=0, used_credit=0, created_at=now, updated_at=now
     )
     session.add(db_obj)
     session.commit()
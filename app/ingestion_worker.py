@@ -0,0 +1,27 @@
+import os
+import signal
+import socket
+import threading
+
+from app.core.logs import get_logger
+from app.core.tasks.ingestion_queue import IngestionWorker
+
+logger = get_logger()
+
+
+def main() -> None:
+    stop = threading.Event()
+
+    def _stop(signum: int, _frame: object) -> None:
+        logger.info(f"Received signal {signum}, finishing current batch")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    worker = IngestionWorker(consumer=f"{socket.gethostname()}-{os.getpid()}")
+    worker.run(stop)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 import re
-from datetime import datetime, timedelta
+from datetime import date, datetime
 
 from phonenumbers import (
     NumberParseException,
@@ -11,7 +11,8 @@ from phonenumbers import (
     parse as parse_phone_number,
 )
 from pydantic import AnyHttpUrl, field_validator
-from sqlalchemy import JSON, CheckConstraint, Column
+from sqlalchemy import JSON, CheckConstraint, Column, Index
+from sqlalchemy.orm import object_session
 from sqlmodel import Field, Relationship, SQLModel
 
 MOBILE_NUMBER_TYPES = (
@@ -228,6 +229,14 @@ class User(UserBase, table=True):
 
     search_history: list["SearchHistory"] = Relationship(back_populates="user")
 
+    def _usage_this_month(self) -> "MonthlyUsage | None":
+        # one primary key lookup in the rollup, whatever the history size
+        session = object_session(self)
+        if session is None or self.id is None:
+            return None
+        month = datetime.now().date().replace(day=1)
+        return session.get(MonthlyUsage, (self.id, month))
+
     @property
     def available_credit(self) -> int:
         if not self.credits and self.free_credit <= 0:
@@ -244,74 +253,25 @@ class User(UserBase, table=True):
 
     @property
     def reserved_credit(self) -> int:
-        if not self.reserved_credits:
+        if not self.credits:
             return 0
 
-        return sum(
-            reserved.credits_reserved
-            for reserved in self.reserved_credits
-            if reserved.status == "reserved" and reserved.credits_reserved
-        )
+        return self.credits.reserved_credit
 
     @property
     def credit_usage(self) -> int:
-        if not self.search_history:
-            return 0
-
-        current_month_start = datetime.now().replace(
-            day=1, hour=0, minute=0, second=0, microsecond=0
-        )
-        next_month = current_month_start.replace(
-            month=current_month_start.month % 12 + 1
-        )
-        current_month_end = next_month - timedelta(seconds=1)
-
-        return sum(
-            action.credits_used
-            for action in self.search_history
-            if current_month_start <= action.search_time <= current_month_end
-        )
+        usage = self._usage_this_month()
+        return usage.credits_used if usage else 0
 
     @property
     def leads_collected(self) -> int:
-        if not self.search_history:
-            return 0
-
-        current_month_start = datetime.now().replace(
-            day=1, hour=0, minute=0, second=0, microsecond=0
-        )
-        next_month = current_month_start.replace(
-            month=current_month_start.month % 12 + 1
-        )
-        current_month_end = next_month - timedelta(seconds=1)
-
-        return sum(
-            action.credits_used
-            for action in self.search_history
-            if current_month_start <= action.search_time <= current_month_end
-        )
+        usage = self._usage_this_month()
+        return usage.credits_used if usage else 0
 
     @property
     def money_spent(self) -> float:
-        if not self.transactions:
-            return 0
-
-        current_month_start = datetime.now().replace(
-            day=1, hour=0, minute=0, second=0, microsecond=0
-        )
-        next_month = current_month_start.replace(
-            month=current_month_start.month % 12 + 1
-        )
-        current_month_end = next_month - timedelta(seconds=1)
-
-        return sum(
-            transaction.amount
-            for transaction in self.transactions
-            if transaction.status == "succeeded"
-            and current_month_start
-            <= transaction.created_at
-            <= current_month_end
-        )
+        usage = self._usage_this_month()
+        return usage.money_spent if usage else 0
 
 
 # Properties to return via API, id is always required
@@ -324,6 +284,15 @@ class UserPublic(UserBase):
     money_spent: float
 
 
+class UserStats(SQLModel):
+    month: date
+    searches: int
+    credits_used: int
+    leads_collected: int
+    transactions: int
+    money_spent: float
+
+
 class UsersPublic(SQLModel):
     data: list[UserPublic]
     count: int
@@ -366,7 +335,8 @@ class BusinessLeadBase(SQLModel):
 
 class BusinessLead(BusinessLeadBase, table=True):
     id: int | None = Field(default=None, primary_key=True)
-    business_type: str = Field(index=True)
+    company_phone: str
+    business_type: str
 
     # location related fields
     state: str | None = Field(index=True)
@@ -386,6 +356,27 @@ class BusinessLead(BusinessLeadBase, table=True):
         back_populates="business_lead"
     )
 
+    __table_args__ = (
+        # unique so that scraped batches can be upserted on the phone
+        # number, includes id so phone numbers resolve to lead ids from the
+        # index
+        Index(
+            "ix_businesslead_company_phone",
+            "company_phone",
+            unique=True,
+            postgresql_include=["id"],
+        ),
+        # the filter combinations of read_business_lead, business type with
+        # states, with states and cities, or with cities only
+        Index(
+            "ix_businesslead_business_type_state_city",
+            "business_type",
+            "state",
+            "city",
+        ),
+        Index("ix_businesslead_business_type_city", "business_type", "city"),
+    )
+
 
 class BusinessLeadPublic(BusinessLeadBase):
     id: int
@@ -412,9 +403,14 @@ class CreditBase(SQLModel):
 class Credit(CreditBase, table=True):
     id: int | None = Field(default=None, primary_key=True)
 
-    user_id: int | None = Field(default=None, foreign_key="user.id")
+    # one balance row per user, locked by every credit change
+    user_id: int | None = Field(
+        default=None, foreign_key="user.id", unique=True, index=True
+    )
     total_credit: int = Field(default=0, nullable=False)
     used_credit: int = Field(default=0, nullable=False)
+    # credits of the reservations still in the "reserved" status
+    reserved_credit: int = Field(default=0, nullable=False)
 
     created_at: datetime = Field(default=datetime.now())
     updated_at: datetime = Field(default=datetime.now())
@@ -426,6 +422,19 @@ class Credit(CreditBase, table=True):
         return self.total_credit - self.used_credit
 
 
+class MonthlyUsage(SQLModel, table=True):
+    """
+    Credits used and money spent by a user in a calendar month, kept up to
+    date by app.workflows.ledger together with the search history and
+    transaction changes they sum.
+    """
+
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    month: date = Field(primary_key=True)
+    credits_used: int = Field(default=0, nullable=False)
+    money_spent: float = Field(default=0.00, nullable=False)
+
+
 class TransactionBase(SQLModel):
     amount: float = Field(default=0.00, nullable=False)
     credits_purchased: int = Field(default=0, nullable=True)
@@ -442,6 +451,16 @@ class Transaction(TransactionBase, table=True):
     created_at: datetime = Field(default=datetime.now(), nullable=False)
     user: User = Relationship(back_populates="transactions")
 
+    # billing history of a user, newest first
+    __table_args__ = (
+        Index(
+            "ix_transaction_user_id_created_at_id",
+            "user_id",
+            "created_at",
+            "id",
+        ),
+    )
+
 
 class TransactionCreate(SQLModel):
     user_id: int
@@ -619,6 +638,16 @@ class SearchHistory(SQLModel, table=True):
 
     user: User = Relationship(back_populates="search_history")
 
+    # search history of a user, newest first
+    __table_args__ = (
+        Index(
+            "ix_searchhistory_user_id_search_time_id",
+            "user_id",
+            "search_time",
+            "id",
+        ),
+    )
+
 
 class SearchHistoryCreate(SQLModel):
     internal_search_ids: dict
@@ -657,8 +686,9 @@ class BusinessOwnerInfo(SQLModel, table=True):
     person_email: str | None = Field(default=None)
     person_phone: str | None = Field(default=None)
 
+    # a lead has one owner, exports join it without multiplying rows
     business_lead_id: int | None = Field(
-        default=None, foreign_key="businesslead.id"
+        default=None, foreign_key="businesslead.id", unique=True, index=True
     )
 
     business_lead: BusinessLead = Relationship(back_populates="employee")
@@ -740,6 +770,12 @@ class PeopleLead(SQLModel, table=True):
     scraped_date: datetime
     received_date: datetime
 
+    # read_people_lead looks people up by state and city, and street when
+    # the request has streets
+    __table_args__ = (
+        Index("ix_peoplelead_state_city_street", "state", "city", "street"),
+    )
+
     @property
     def property_price(self) -> float | None:
         if self.house:
@@ -830,3 +866,23 @@ class PeopleLeadInternal(SQLModel):
     house: HouseInternal | None = None
     work: list[WorkInternal] | None = None
     education: EducationInternal | None = None
+
+
+class RejectedRow(SQLModel):
+    line: int
+    detail: str
+
+
+class IngestionChunkReport(SQLModel):
+    chunk: int
+    accepted: int
+    rejected: int
+    errors: list[RejectedRow]
+
+
+class IngestionReport(SQLModel):
+    accepted: int
+    rejected: int
+    # body lines covered by the chunks, saved or rejected
+    lines: int = 0
+    chunks: list[IngestionChunkReport]
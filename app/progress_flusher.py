@@ -0,0 +1,24 @@
+import signal
+import threading
+
+from app.core.logs import get_logger
+from app.core.tasks.progress_flusher import ProgressFlusher
+
+logger = get_logger()
+
+
+def main() -> None:
+    stop = threading.Event()
+
+    def _stop(signum: int, _frame: object) -> None:
+        logger.info(f"Received signal {signum}, stopping")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    ProgressFlusher().run(stop)
+
+
+if __name__ == "__main__":
+    main()
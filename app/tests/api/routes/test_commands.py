@@ -0,0 +1,102 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app import crud
+from app.api.routes.commands import commands
+from app.core.config import settings
+from app.models import Credit, ReservedCredit, SearchHistory, User
+from app.workflows.credits import get_credit
+
+START_REQUEST = {
+    "items": [{"city": "Springfield", "state": "IL", "streets": ["Main St"]}],
+    "limit": 5,
+    "email": "leads@example.com",
+}
+
+
+def funded_user(db: Session) -> User:
+    user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    get_credit(db, user.id, 10)  # type: ignore
+    return user  # type: ignore
+
+
+def reserved_credits(db: Session, user: User) -> int:
+    db.expire_all()
+    statement = select(Credit.reserved_credit).where(Credit.user_id == user.id)
+    return db.exec(statement).one()
+
+
+def test_failed_start_gives_the_reserved_credits_back(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    db: Session,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    user = funded_user(db)
+    reserved = reserved_credits(db, user)
+
+    async def failed_start(*_args: object) -> dict:
+        # the credits are reserved before the scraper is asked to start
+        assert reserved_credits(db, user) == reserved + 5
+        return {"status": False}
+
+    monkeypatch.setattr(commands, "send_start_scraper_command", failed_start)
+    r = client.post(
+        f"{settings.API_V1_STR}/commands/start-scraper",
+        headers=normal_user_token_headers,
+        params={"source": "people"},
+        json=START_REQUEST,
+    )
+
+    assert r.status_code == 400
+    assert reserved_credits(db, user) == reserved
+    statement = select(SearchHistory).where(
+        SearchHistory.user_id == user.id,
+        SearchHistory.task_id.startswith("pending-"),  # type: ignore
+    )
+    assert db.exec(statement).first() is None
+
+
+def test_started_scraper_owns_the_reservation(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    db: Session,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    user = funded_user(db)
+    task_id = uuid.uuid4().hex
+
+    async def started(*_args: object) -> dict:
+        return {"status": True, "task_id": task_id, "internal_id": 1}
+
+    monkeypatch.setattr(commands, "send_start_scraper_command", started)
+    r = client.post(
+        f"{settings.API_V1_STR}/commands/start-scraper",
+        headers=normal_user_token_headers,
+        params={"source": "people"},
+        json=START_REQUEST,
+    )
+
+    assert r.status_code == 200
+    reserved_credit = db.exec(
+        select(ReservedCredit).where(ReservedCredit.task_id == task_id)
+    ).one()
+    assert reserved_credit.status == "reserved"
+    assert reserved_credit.credits_reserved == 5
+    search_history = db.exec(
+        select(SearchHistory).where(SearchHistory.task_id == task_id)
+    ).one()
+    assert search_history.user_id == user.id
+
+
+def test_finish_notification_of_an_unknown_task(client: TestClient) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/commands/finish-notification/unknown",
+        params={"token": "supersecrettoken"},
+        json=[],
+    )
+
+    assert r.status_code == 404
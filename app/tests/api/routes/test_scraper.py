@@ -0,0 +1,36 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.benchmarks.synthetic import business_leads
+from app.core.config import settings
+from app.models import BusinessLead
+
+
+def test_broken_stream_reports_the_saved_chunks(
+    client: TestClient, db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "INGESTION_STREAM_CHUNK_SIZE", 2)
+    monkeypatch.setattr(settings, "INGESTION_STREAM_MAX_LINE_BYTES", 1000)
+    leads = business_leads(3)
+    body = "".join(f"{lead.model_dump_json()}\n" for lead in leads)
+    # a line longer than the limit ends the body after the first chunk
+    body += "x" * 2000
+
+    r = client.post(
+        f"{settings.API_V1_STR}/internal/scraped-data/stream",
+        params={"token": "supersecrettoken"},
+        content=body.encode(),
+    )
+
+    assert r.status_code == 400
+    report = r.json()["report"]
+    assert report["accepted"] == 2
+    assert report["lines"] == 2
+    phones = [lead.company_phone for lead in leads]
+    saved = db.exec(
+        select(BusinessLead.company_phone).where(
+            BusinessLead.company_phone.in_(phones)  # type: ignore
+        )
+    ).all()
+    assert sorted(saved) == sorted(phones[:2])
@@ -0,0 +1,148 @@
+import datetime
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app import crud
+from app.benchmarks.synthetic import business_leads, people_leads
+from app.core.config import settings
+from app.core.tasks.process_scraped_data import (
+    process_people_data,
+    process_scraped_data,
+)
+from app.models import BusinessLead, PeopleLead, SearchHistory
+from app.tests.utils.utils import count_queries
+
+
+def create_search_history(db: Session, source: str, size: int) -> int:
+    if source == "business":
+        leads = business_leads(size)
+        process_scraped_data(leads, db)
+        statement = select(BusinessLead.id).where(
+            BusinessLead.company_phone.in_(
+                [lead.company_phone for lead in leads]
+            )
+        )
+    else:
+        process_people_data(people_leads(size), db)
+        statement = (
+            select(PeopleLead.id).order_by(PeopleLead.id.desc()).limit(size)
+        )
+    lead_ids = list(db.exec(statement))
+
+    user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    search_history = SearchHistory(
+        user_id=user.id,
+        source=source,
+        status="Finished",
+        internal_search_ids={"internal_search_ids": lead_ids},
+    )
+    db.add(search_history)
+    db.commit()
+    return search_history.id
+
+
+def get_search_history_queries(
+    client: TestClient, headers: dict[str, str], search_history_id: int
+) -> tuple[dict, int]:
+    with count_queries() as statements:
+        r = client.get(
+            f"{settings.API_V1_STR}/users/me/search-history/{search_history_id}",
+            headers=headers,
+        )
+    assert r.status_code == 200
+    return r.json(), len(statements)
+
+
+def test_search_history_query_count_is_constant(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    # the current user is looked up once, then served from the user cache
+    client.get(
+        f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers
+    )
+    for source in ("business", "people"):
+        small, small_queries = get_search_history_queries(
+            client,
+            normal_user_token_headers,
+            create_search_history(db, source, 10),
+        )
+        large, large_queries = get_search_history_queries(
+            client,
+            normal_user_token_headers,
+            create_search_history(db, source, 200),
+        )
+        assert len(small["internal_search"]) == 10
+        assert len(large["internal_search"]) == 200
+        assert small_queries == large_queries
+
+
+def test_search_history_pagination(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    search_history_id = create_search_history(db, "people", 30)
+
+    r = client.get(
+        f"{settings.API_V1_STR}/users/me/search-history/{search_history_id}",
+        headers=normal_user_token_headers,
+    )
+    everything = r.json()["internal_search"]
+    r = client.get(
+        f"{settings.API_V1_STR}/users/me/search-history/{search_history_id}",
+        headers=normal_user_token_headers,
+        params={"offset": 10, "limit": 5},
+    )
+    page = r.json()
+
+    assert page["total"] == 30
+    assert [lead["name"] for lead in page["internal_search"]] == [
+        lead["name"] for lead in everything[10:15]
+    ]
+
+
+def test_search_history_pages_match_cursor_pages(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    search_time = datetime.datetime.now()
+    # same search time for all, the id decides the order
+    db.add_all(
+        SearchHistory(
+            user_id=user.id,
+            source="business",
+            search_time=search_time,
+            internal_search_ids={"internal_search_ids": []},
+        )
+        for _ in range(25)
+    )
+    db.commit()
+
+    by_offset, offset = [], 0
+    while True:
+        r = client.get(
+            f"{settings.API_V1_STR}/users/me/search-history",
+            headers=normal_user_token_headers,
+            params={"offset": offset, "limit": 10},
+        )
+        page = r.json()
+        by_offset += [item["id"] for item in page["items"]]
+        offset += 10
+        if offset >= page["total"]:
+            break
+    assert len(by_offset) == page["total"]
+
+    by_cursor, params = [], {"size": 10}
+    while True:
+        r = client.get(
+            f"{settings.API_V1_STR}/users/me/search-history/cursor",
+            headers=normal_user_token_headers,
+            params=params,
+        )
+        page = r.json()
+        by_cursor += [item["id"] for item in page["items"]]
+        if not page["next_page"]:
+            break
+        params = {"size": 10, "cursor": page["next_page"]}
+
+    assert by_cursor == by_offset
+    assert len(set(by_cursor)) == len(by_cursor)
@@ -36,6 +36,25 @@ def test_get_users_normal_user_me(
     assert current_user["email"] == settings.EMAIL_TEST_USER
 
 
+def test_get_users_normal_user_me_stats(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/me/stats",
+        headers=normal_user_token_headers,
+        params={"month": "2000-02-15"},
+    )
+    assert r.status_code == 200
+    assert r.json() == {
+        "month": "2000-02-01",
+        "searches": 0,
+        "credits_used": 0,
+        "leads_collected": 0,
+        "transactions": 0,
+        "money_spent": 0.0,
+    }
+
+
 def test_create_user_new_email(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -0,0 +1,59 @@
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.api.columnar import arrow_schema, stream_arrow, stream_parquet
+from app.api.routes.commands.commands import headers_business, headers_people
+
+
+def test_arrow_schema_keeps_json_column_types() -> None:
+    schema = arrow_schema("business", headers_business)
+
+    assert schema.field("company_name").type == pa.string()
+    assert schema.field("employee.company_socials").type == pa.list_(
+        pa.string()
+    )
+    assert schema.field("employee.business_management").type == pa.map_(
+        pa.string(), pa.string()
+    )
+
+
+def test_expanded_people_view_has_one_phone_per_row() -> None:
+    schema = arrow_schema("people", headers_people, view="expanded")
+
+    assert schema.field("age").type == pa.int64()
+    assert schema.field("phones").type == pa.string()
+
+
+def test_streams_round_trip() -> None:
+    headers = ["company_name", "schedule_dict", "tags", "scraped_date"]
+    schema = arrow_schema("business", headers)
+    now = datetime(2024, 7, 1, 12, 30)
+    chunks = [
+        [("Bakery", {"Monday": "9AM-5PM", "days": [1, 2]}, ["a"], now)],
+        [],
+        [("Dentist", None, None, now)],
+    ]
+
+    arrow = pa.ipc.open_stream(b"".join(stream_arrow(schema, chunks)))
+    parquet = pq.read_table(
+        pa.BufferReader(b"".join(stream_parquet(schema, chunks)))
+    )
+
+    table = arrow.read_all()
+    assert table.equals(parquet)
+    assert table.to_pylist() == [
+        {
+            "company_name": "Bakery",
+            "schedule_dict": [("Monday", "9AM-5PM"), ("days", "[1, 2]")],
+            "tags": ["a"],
+            "scraped_date": now,
+        },
+        {
+            "company_name": "Dentist",
+            "schedule_dict": None,
+            "tags": None,
+            "scraped_date": now,
+        },
+    ]
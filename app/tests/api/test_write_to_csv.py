@@ -0,0 +1,41 @@
+import csv
+from pathlib import Path
+from types import SimpleNamespace
+
+from app.api.write_to_csv import compile_projection, stream_csv, write_to_csv
+
+
+def test_projection_reads_nested_headers() -> None:
+    projection = compile_projection(["name", "employee.person_name", "age"])
+
+    lead = SimpleNamespace(
+        name="Bakery", age=3, employee=SimpleNamespace(person_name="Ann")
+    )
+    assert projection(lead) == ("Bakery", "Ann", 3)
+
+    lead.employee = None
+    assert projection(lead) == ("Bakery", None, 3)
+
+
+def test_projection_with_a_single_header() -> None:
+    assert compile_projection(["name"])(SimpleNamespace(name="a")) == ("a",)
+
+
+def test_write_to_csv_accepts_objects_and_row_tuples(tmp_path: Path) -> None:
+    headers = ["name", "employee.person_name"]
+    objects = [
+        SimpleNamespace(name="a", employee=SimpleNamespace(person_name="b"))
+    ]
+
+    write_to_csv(str(tmp_path / "objects.csv"), headers, objects)
+    write_to_csv(str(tmp_path / "tuples.csv"), headers, [("a", "b")])
+
+    for name in ("objects.csv", "tuples.csv"):
+        with open(tmp_path / name, newline="") as file:
+            assert list(csv.reader(file)) == [headers, ["a", "b"]]
+
+
+def test_stream_csv_sends_the_header_first() -> None:
+    chunks = stream_csv(["name", "age"], [[("a", 1)], [], [("b", 2)]])
+
+    assert list(chunks) == ["name,age\r\n", "a,1\r\n", "", "b,2\r\n"]
@@ -1,9 +1,11 @@
 from collections.abc import Generator
 
+import fakeredis
 import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import Session, delete
 
+from app.core import redis_client
 from app.core.config import settings
 from app.core.db import engine, init_db
 from app.models import Item, User
@@ -42,3 +44,11 @@ def normal_user_token_headers(
     return authentication_token_from_email(
         client=client, email=settings.EMAIL_TEST_USER, db=db
     )
+
+
+@pytest.fixture
+def redis_db(monkeypatch: pytest.MonkeyPatch) -> fakeredis.FakeRedis:
+    # the clients are restored after the test
+    monkeypatch.setattr(redis_client, "_client", None)
+    monkeypatch.setattr(redis_client, "_sync_client", None)
+    return redis_client.use_fake_redis()
@@ -0,0 +1,143 @@
+import threading
+from collections.abc import Generator
+from unittest.mock import MagicMock
+
+import fakeredis
+import pytest
+import redis
+
+from app.benchmarks.synthetic import business_leads
+from app.core.config import settings
+from app.core.tasks import ingestion_queue
+from app.core.tasks.ingestion_queue import (
+    CONSUMER_GROUP,
+    DEAD_LETTER_STREAM,
+    IngestionWorker,
+    enqueue_batch,
+)
+from app.models import BusinessLeadInternal
+
+STREAM = "ingestion:business"
+
+
+@pytest.fixture
+def client() -> fakeredis.FakeRedis:
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+@pytest.fixture
+def processor(
+    monkeypatch: pytest.MonkeyPatch,
+) -> Generator[MagicMock, None, None]:
+    processor = MagicMock()
+    stream, schema, _ = ingestion_queue.SOURCES["business"]
+    monkeypatch.setitem(
+        ingestion_queue.SOURCES, "business", (stream, schema, processor)
+    )
+    monkeypatch.setattr(settings, "INGESTION_BLOCK_MS", 1)
+    monkeypatch.setattr(settings, "INGESTION_CLAIM_IDLE_MS", 0)
+    monkeypatch.setattr(settings, "INGESTION_MAX_RETRIES", 2)
+    yield processor
+
+
+def make_worker(client: fakeredis.FakeRedis) -> IngestionWorker:
+    worker = IngestionWorker(
+        consumer="test", client=client, session_factory=MagicMock
+    )
+    worker.ensure_groups()
+    return worker
+
+
+def lead() -> BusinessLeadInternal:
+    [lead] = business_leads(1)
+    return lead
+
+
+def test_batch_is_processed_and_acknowledged(
+    client: fakeredis.FakeRedis, processor: MagicMock
+) -> None:
+    worker = make_worker(client)
+    enqueue_batch("business", [lead()], client=client)
+
+    assert worker.run_once() == 1
+
+    [row] = processor.call_args.args[0]
+    assert row.company_phone.startswith("bench-")
+    assert client.xlen(STREAM) == 0
+    assert client.xpending(STREAM, CONSUMER_GROUP)["pending"] == 0
+
+
+def test_failed_batch_is_retried(
+    client: fakeredis.FakeRedis, processor: MagicMock
+) -> None:
+    worker = make_worker(client)
+    enqueue_batch("business", [lead()], client=client)
+    processor.side_effect = [RuntimeError("db is down"), None]
+
+    worker.run_once()
+    assert client.xpending(STREAM, CONSUMER_GROUP)["pending"] == 1
+
+    worker.run_once()
+    assert processor.call_count == 2
+    assert client.xlen(STREAM) == 0
+    assert client.xlen(DEAD_LETTER_STREAM) == 0
+
+
+def test_batch_is_dead_lettered_after_max_retries(
+    client: fakeredis.FakeRedis, processor: MagicMock
+) -> None:
+    worker = make_worker(client)
+    message_id = enqueue_batch("business", [lead()], client=client)
+    processor.side_effect = RuntimeError("bad row")
+
+    for _ in range(settings.INGESTION_MAX_RETRIES + 2):
+        worker.run_once()
+
+    assert processor.call_count == settings.INGESTION_MAX_RETRIES + 1
+    assert client.xlen(STREAM) == 0
+    [(_, fields)] = client.xrange(DEAD_LETTER_STREAM)
+    assert fields["message_id"] == message_id
+    assert fields["reason"] == "max retries exceeded"
+
+
+def test_invalid_batch_is_dead_lettered(
+    client: fakeredis.FakeRedis, processor: MagicMock
+) -> None:
+    worker = make_worker(client)
+    client.xadd(STREAM, {"source": "business", "payload": '[{"city": 1}]'})
+
+    worker.run_once()
+
+    processor.assert_not_called()
+    assert client.xlen(STREAM) == 0
+    [(_, fields)] = client.xrange(DEAD_LETTER_STREAM)
+    assert fields["reason"].startswith("invalid")
+
+
+def test_run_keeps_going_after_a_redis_error(
+    client: fakeredis.FakeRedis,
+    processor: MagicMock,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "INGESTION_ERROR_BACKOFF_SECONDS", 0)
+    worker = IngestionWorker(
+        consumer="test", client=client, session_factory=MagicMock
+    )
+    enqueue_batch("business", [lead()], client=client)
+    stop = threading.Event()
+    run_once = worker.run_once
+    runs = []
+
+    def flaky_run_once() -> int:
+        runs.append(len(runs))
+        if len(runs) == 1:
+            raise redis.ConnectionError("redis is down")
+        stop.set()
+        return run_once()
+
+    monkeypatch.setattr(worker, "run_once", flaky_run_once)
+    worker.run(stop)
+
+    assert runs == [0, 1]
+    processor.assert_called_once()
+    assert client.xlen(STREAM) == 0
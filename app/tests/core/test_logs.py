@@ -0,0 +1,63 @@
+import json
+import logging
+import logging.handlers
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from app.core import logs
+from app.core.config import settings
+
+
+@pytest.fixture
+def log_file(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> Iterator[Path]:
+    path = tmp_path / "test.log"
+    logs.stop_logging()
+    monkeypatch.setattr(settings, "LOG_FILE", str(path))
+    monkeypatch.setattr(settings, "LOG_DEBUG_SAMPLE_RATE", 0.0)
+    yield path
+    logs.stop_logging()
+    monkeypatch.undo()
+    logs.configure_logging()
+
+
+def test_records_are_written_as_json_by_the_listener(log_file: Path) -> None:
+    logger = logs.get_logger("test")
+    assert logs.get_logger("test") is logger
+    queue_handlers = [
+        handler
+        for handler in logging.getLogger().handlers
+        if isinstance(handler, logging.handlers.QueueHandler)
+    ]
+    assert len(queue_handlers) == 1
+
+    items = ["a"]
+    logger.info("items %s", items)
+    # formatted with the arguments of the call
+    items.append("b")
+    logger.debug("sampled out")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed")
+    logs.stop_logging()
+
+    lines = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert [(line["level"], line["message"]) for line in lines] == [
+        ("INFO", "items ['a']"),
+        ("ERROR", "failed"),
+    ]
+    assert lines[0]["logger"] == "test"
+    assert "ValueError: boom" in lines[1]["exc_info"]
+
+
+def test_debug_records_are_sampled() -> None:
+    def record(level: int) -> logging.LogRecord:
+        return logging.LogRecord("test", level, __file__, 1, "x", None, None)
+
+    assert logs.DebugSampler(1.0).filter(record(logging.DEBUG))
+    assert not logs.DebugSampler(0.0).filter(record(logging.DEBUG))
+    assert logs.DebugSampler(0.0).filter(record(logging.INFO))
@@ -0,0 +1,110 @@
+import asyncio
+import gzip
+import json
+from collections.abc import AsyncIterator
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.benchmarks.synthetic import business_leads
+from app.core.config import settings
+from app.core.tasks.ndjson_ingestion import NDJSONError, ingest_ndjson
+from app.models import BusinessLeadInternal, IngestionReport
+
+
+async def body(data: bytes, size: int = 1000) -> AsyncIterator[bytes]:
+    for i in range(0, len(data), size):
+        yield data[i : i + size]
+
+
+def ndjson(rows: list[str]) -> bytes:
+    return "\n".join(rows).encode() + b"\n"
+
+
+def ingest(data: bytes, processor: MagicMock, **kwargs) -> IngestionReport:
+    return asyncio.run(
+        ingest_ndjson(
+            body(data),
+            BusinessLeadInternal,
+            processor,
+            session_factory=MagicMock,
+            **kwargs,
+        )
+    )
+
+
+@pytest.fixture(autouse=True)
+def chunk_size(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "INGESTION_STREAM_CHUNK_SIZE", 10)
+
+
+def test_rows_are_saved_in_chunks() -> None:
+    leads = [lead.model_dump_json() for lead in business_leads(25)]
+    processor = MagicMock()
+
+    report = ingest(gzip.compress(ndjson(leads)), processor)
+
+    assert [len(call.args[0]) for call in processor.call_args_list] == [
+        10,
+        10,
+        5,
+    ]
+    assert report.accepted == 25
+    assert report.rejected == 0
+    assert [chunk.accepted for chunk in report.chunks] == [10, 10, 5]
+
+
+def test_invalid_rows_are_reported_per_chunk() -> None:
+    leads = [lead.model_dump_json() for lead in business_leads(12)]
+    leads[3] = json.dumps({"company_name": "No phone"})
+    leads[11] = "{not json"
+    processor = MagicMock()
+
+    report = ingest(ndjson(leads), processor, gzipped=False)
+
+    assert report.accepted == 10
+    assert report.rejected == 2
+    assert [chunk.rejected for chunk in report.chunks] == [1, 1]
+    assert report.chunks[0].errors[0].line == 4
+    assert "company_phone" in report.chunks[0].errors[0].detail
+    assert report.chunks[1].errors[0].line == 12
+
+
+def test_failed_chunk_is_rejected() -> None:
+    leads = [lead.model_dump_json() for lead in business_leads(15)]
+    processor = MagicMock(side_effect=[RuntimeError("db is down"), None])
+
+    report = ingest(ndjson(leads), processor, gzipped=False)
+
+    assert [chunk.rejected for chunk in report.chunks] == [10, 0]
+    assert report.accepted == 5
+
+
+def test_concatenated_gzip_members() -> None:
+    leads = [lead.model_dump_json() for lead in business_leads(4)]
+    data = gzip.compress(ndjson(leads[:2])) + gzip.compress(ndjson(leads[2:]))
+
+    report = ingest(data, MagicMock())
+
+    assert report.accepted == 4
+
+
+def test_truncated_gzip_is_an_error() -> None:
+    leads = [lead.model_dump_json() for lead in business_leads(4)]
+
+    with pytest.raises(NDJSONError):
+        ingest(gzip.compress(ndjson(leads))[:-10], MagicMock())
+
+
+def test_error_carries_the_saved_chunks() -> None:
+    leads = [lead.model_dump_json() for lead in business_leads(15)]
+    processor = MagicMock()
+
+    with pytest.raises(NDJSONError) as error:
+        ingest(gzip.compress(ndjson(leads))[:-10], processor)
+
+    # the rows after the first chunk are not saved
+    assert processor.call_count == 1
+    assert error.value.report is not None
+    assert error.value.report.accepted == 10
+    assert error.value.report.lines == 10
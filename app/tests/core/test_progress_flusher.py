@@ -0,0 +1,140 @@
+import json
+import threading
+import time
+
+import fakeredis
+import pytest
+import redis
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.tasks.progress_flusher import ProgressFlusher
+from app.models import ScraperEventData
+from app.tests.utils.user import create_random_user
+from app.tests.utils.utils import count_queries
+from app.workflows.scraper import ACTIVE_EVENTS, progress_key
+
+
+@pytest.fixture
+def client() -> fakeredis.FakeRedis:
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def create_events(db: Session, count: int) -> list[int]:
+    user = create_random_user(db)
+    events = [
+        ScraperEventData(user_id=user.id, status="running", source="business")
+        for _ in range(count)
+    ]
+    db.add_all(events)
+    db.commit()
+    return [scraper_event.id for scraper_event in events]
+
+
+def report(client: fakeredis.FakeRedis, event_id: int, scraped: int) -> None:
+    client.zadd(ACTIVE_EVENTS, {event_id: time.time()}, nx=True)
+    client.set(
+        progress_key(event_id),
+        json.dumps(
+            {
+                "scraped_results": scraped,
+                "total_results": 10,
+                "looked_owner": 0,
+            }
+        ),
+    )
+
+
+def test_flushes_changed_progress_in_one_update(
+    db: Session, client: fakeredis.FakeRedis
+) -> None:
+    first, second, third = create_events(db, 3)
+    for event_id in (first, second, third):
+        report(client, event_id, 1)
+    flusher = ProgressFlusher(client=client)
+
+    with count_queries() as statements:
+        assert flusher.run_once() == 3
+        assert flusher.run_once() == 0
+        report(client, second, 7)
+        assert flusher.run_once() == 1
+    updates = [
+        statement
+        for statement in statements
+        if statement.startswith("UPDATE scrapereventdata")
+    ]
+    assert len(updates) == 2
+
+    db.expire_all()
+    assert [
+        (db.get(ScraperEventData, id).scraped_results)  # type: ignore
+        for id in (first, second, third)
+    ] == [1, 7, 1]
+    assert db.get(ScraperEventData, second).total_results == 10  # type: ignore
+
+
+def test_finished_events_are_no_longer_read(
+    db: Session, client: fakeredis.FakeRedis
+) -> None:
+    (event_id,) = create_events(db, 1)
+    report(client, event_id, 1)
+    flusher = ProgressFlusher(client=client)
+    flusher.run_once()
+
+    client.zrem(ACTIVE_EVENTS, event_id)
+    client.set(progress_key(event_id), json.dumps({"scraped_results": 9}))
+
+    assert flusher.run_once() == 0
+    assert flusher.persisted == {}
+
+
+def test_events_without_progress_or_too_old_are_dropped(
+    db: Session, client: fakeredis.FakeRedis
+) -> None:
+    gone, old, running = create_events(db, 3)
+    for event_id in (gone, old, running):
+        report(client, event_id, 1)
+    client.delete(progress_key(gone))
+    # started before SCRAPER_EVENT_MAX_SECONDS
+    client.zadd(ACTIVE_EVENTS, {old: 0})
+
+    assert ProgressFlusher(client=client).run_once() == 1
+    assert client.zrange(ACTIVE_EVENTS, 0, -1) == [str(running)]
+
+
+def test_missing_counters_keep_the_stored_values(
+    db: Session, client: fakeredis.FakeRedis
+) -> None:
+    (event_id,) = create_events(db, 1)
+    report(client, event_id, 4)
+    flusher = ProgressFlusher(client=client)
+    flusher.run_once()
+
+    client.set(progress_key(event_id), json.dumps({"scraped_results": 6}))
+    assert flusher.run_once() == 1
+
+    db.expire_all()
+    scraper_event = db.get(ScraperEventData, event_id)
+    assert scraper_event.scraped_results == 6  # type: ignore
+    assert scraper_event.total_results == 10  # type: ignore
+
+
+def test_run_keeps_going_after_a_failed_flush(
+    client: fakeredis.FakeRedis, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "PROGRESS_FLUSH_INTERVAL_SECONDS", 0)
+    flusher = ProgressFlusher(client=client)
+    stop = threading.Event()
+    runs = []
+
+    def run_once() -> int:
+        runs.append(len(runs))
+        if len(runs) == 1:
+            raise redis.ConnectionError("redis is down")
+        stop.set()
+        return 0
+
+    monkeypatch.setattr(flusher, "run_once", run_once)
+    flusher.run(stop)
+
+    assert runs == [0, 1]
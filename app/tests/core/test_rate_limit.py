@@ -0,0 +1,33 @@
+import fakeredis
+
+from app.core.rate_limit import RateLimiter
+
+
+def test_key_is_limited_for_the_rest_of_its_window(
+    redis_db: fakeredis.FakeRedis,
+) -> None:
+    limiter = RateLimiter("test", limit=3, window_seconds=60)
+
+    for _ in range(2):
+        limiter.hit("a@example.com")
+    assert limiter.retry_after("a@example.com") == 0
+
+    limiter.hit("a@example.com")
+    assert 0 < limiter.retry_after("a@example.com") <= 60
+    assert limiter.retry_after("b@example.com") == 0
+
+    # later events do not move the end of the window
+    redis_db.expire("test:a@example.com", 5)
+    limiter.hit("a@example.com")
+    assert limiter.retry_after("a@example.com") <= 5
+
+
+def test_nothing_is_limited_without_redis(
+    redis_db: fakeredis.FakeRedis,
+) -> None:
+    limiter = RateLimiter("test", limit=1, window_seconds=60)
+    limiter.hit("a@example.com")
+    redis_db.connection_pool.connection_kwargs["server"].connected = False
+
+    limiter.hit("a@example.com")
+    assert limiter.retry_after("a@example.com") == 0
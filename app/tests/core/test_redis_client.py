@@ -0,0 +1,55 @@
+import json
+
+import fakeredis
+import pytest
+import redis
+
+from app.core import redis_client
+from app.core.config import settings
+from app.core.redis_client import (
+    get_json_many,
+    get_redis,
+    get_sync_redis,
+    ping_redis,
+    set_json_many,
+)
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.mark.anyio
+async def test_json_values_round_trip_in_one_call(
+    redis_db: fakeredis.FakeRedis,
+) -> None:
+    await set_json_many({"a": {"x": 1}, "b": [2]}, ex=60)
+
+    assert json.loads(redis_db.get("a")) == {"x": 1}
+    assert 0 < redis_db.ttl("b") <= 60
+    assert await get_json_many(["a", "missing", "b"]) == [{"x": 1}, None, [2]]
+    assert await get_json_many([]) == []
+
+
+@pytest.mark.anyio
+@pytest.mark.usefixtures("redis_db")
+async def test_fake_clients_share_one_server() -> None:
+    get_sync_redis().set("key", "value")
+
+    assert await get_redis().get("key") == "value"
+    assert await ping_redis()
+
+
+def test_pools_are_bounded_by_settings(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(redis_client, "_sync_client", None)
+    monkeypatch.setattr(settings, "REDIS_MAX_CONNECTIONS", 7)
+
+    pool = get_sync_redis().connection_pool
+    assert isinstance(pool, redis.BlockingConnectionPool)
+    assert pool.max_connections == 7
+    assert pool.connection_kwargs["health_check_interval"] == (
+        settings.REDIS_HEALTH_CHECK_INTERVAL
+    )
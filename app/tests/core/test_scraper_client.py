@@ -0,0 +1,88 @@
+from collections.abc import Callable
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.core.scraper_client import ScraperClient, ScraperUnavailable
+
+Handler = Callable[[httpx.Request], httpx.Response]
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+def fast_settings(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "INTERNAL_SCRAPER_API_ADDRESS", "http://s")
+    monkeypatch.setattr(settings, "SCRAPER_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(settings, "SCRAPER_CIRCUIT_FAILURES", 2)
+    monkeypatch.setattr(settings, "SCRAPER_CIRCUIT_RESET_SECONDS", 60)
+
+
+def scraper(
+    *responses: httpx.Response | Exception,
+) -> tuple[ScraperClient, list[httpx.Request]]:
+    # answers the requests with the given responses, in order
+    requests: list[httpx.Request] = []
+    pending = list(responses)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        response = pending.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    return ScraperClient(httpx.MockTransport(handler)), requests
+
+
+@pytest.mark.anyio
+async def test_retries_requests_the_scraper_did_not_get() -> None:
+    client, requests = scraper(
+        httpx.ConnectError("refused"),
+        httpx.Response(503),
+        httpx.Response(200, json={"task_id": "task"}),
+    )
+
+    response = await client.start_scraping("people", {"limit": 5})
+
+    assert response.json() == {"task_id": "task"}
+    assert len(requests) == 3
+    assert (
+        requests[0].url
+        == "http://s/start-scraping-people?token=supersecrettoken"
+    )
+    assert client.circuit.consecutive_failures == 0
+
+
+@pytest.mark.anyio
+async def test_read_timeouts_are_not_retried() -> None:
+    # the scraper may have started already, a retry could start it twice
+    client, requests = scraper(httpx.ReadTimeout("slow"))
+
+    with pytest.raises(ScraperUnavailable):
+        await client.start_scraping("business", {"limit": 5})
+    assert len(requests) == 1
+
+
+@pytest.mark.anyio
+async def test_circuit_opens_after_consecutive_failures() -> None:
+    client, requests = scraper(
+        httpx.Response(500),
+        httpx.Response(500),
+        httpx.Response(200, json={"task_id": "task"}),
+    )
+
+    assert (await client.start_scraping("business", {})).status_code == 500
+    assert (await client.start_scraping("business", {})).status_code == 500
+    with pytest.raises(ScraperUnavailable):
+        await client.start_scraping("business", {})
+    assert len(requests) == 2
+
+    # half open once the reset time passed, a success closes it
+    client.circuit.opened_at -= settings.SCRAPER_CIRCUIT_RESET_SECONDS
+    assert (await client.start_scraping("business", {})).status_code == 200
+    assert not client.circuit.is_open
@@ -0,0 +1,31 @@
+from collections.abc import Iterator
+
+import pytest
+
+from app.core.security import (
+    close_password_pool,
+    get_password_hash_async,
+    verify_password,
+    verify_password_async,
+)
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture
+def password_pool() -> Iterator[None]:
+    yield
+    close_password_pool()
+
+
+@pytest.mark.anyio
+@pytest.mark.usefixtures("password_pool")
+async def test_passwords_are_hashed_in_the_password_pool() -> None:
+    hashed = await get_password_hash_async("secret")
+
+    assert verify_password("secret", hashed)
+    assert await verify_password_async("secret", hashed)
+    assert not await verify_password_async("wrong", hashed)
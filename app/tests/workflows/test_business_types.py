@@ -0,0 +1,111 @@
+import uuid
+
+import fakeredis
+import pytest
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models import BusinessType
+from app.workflows import business_types
+from app.workflows.business_types import (
+    BusinessTypeCatalog,
+    get_business_type_catalog,
+    seed_business_types,
+)
+
+BUSINESS_TYPES = [
+    (1, "Art Cafe"),
+    (2, "Cafeteria"),
+    (3, "Cafe"),
+    (4, "Internet Cafe"),
+    (5, "Decaf Coffee Roaster"),
+    (6, "Boat Club"),
+]
+
+
+@pytest.fixture
+def catalog_state(monkeypatch: pytest.MonkeyPatch) -> None:
+    # the catalog of this process is restored after the test
+    monkeypatch.setattr(business_types, "_catalog", None)
+    monkeypatch.setattr(business_types, "_seen_version", None)
+    monkeypatch.setattr(business_types, "_checked_at", 0.0)
+
+
+def test_search_ranks_exact_prefix_word_and_substring_matches() -> None:
+    index = BusinessTypeCatalog(BUSINESS_TYPES)
+
+    assert [business_type.id for business_type in index.search("CAF")] == [
+        3,  # prefix, alphabetically first
+        2,  # prefix
+        1,  # word prefix
+        4,  # word prefix
+        5,  # substring
+    ]
+    assert [business_type.id for business_type in index.search("cafe")] == [
+        3,  # exact
+        2,
+        1,
+        4,
+    ]
+
+
+def test_search_matches_like_the_table() -> None:
+    index = BusinessTypeCatalog(BUSINESS_TYPES)
+
+    for query in ("", "a", "club", "e c", "t cafe", "missing"):
+        expected = {
+            id for id, name in BUSINESS_TYPES if query.lower() in name.lower()
+        }
+        assert {
+            business_type.id for business_type in index.search(query)
+        } == expected
+    assert len(index.search("")) == len(index) == len(BUSINESS_TYPES)
+
+
+def test_resolve_returns_catalog_spelling_and_unknown_names() -> None:
+    catalog = BusinessTypeCatalog(BUSINESS_TYPES)
+
+    assert catalog.resolve(["boat club", "Cafe", "Bakery"]) == (
+        ["Boat Club", "Cafe"],
+        ["Bakery"],
+    )
+    assert "CAFETERIA" in catalog
+    assert catalog.get("missing") is None
+
+
+def test_version_changes_with_content() -> None:
+    catalog = BusinessTypeCatalog(BUSINESS_TYPES)
+
+    assert catalog.version == BusinessTypeCatalog(BUSINESS_TYPES[::-1]).version
+    assert catalog.version != BusinessTypeCatalog(BUSINESS_TYPES[1:]).version
+
+
+@pytest.mark.usefixtures("redis_db", "catalog_state")
+def test_seed_business_types_adds_missing_names_once(db: Session) -> None:
+    names = [f"Business {uuid.uuid4().hex}" for _ in range(3)]
+
+    assert seed_business_types(db, names[:2]) == 2
+    assert seed_business_types(db, names + names) == 1
+
+    statement = select(BusinessType.name).where(BusinessType.name.in_(names))
+    assert sorted(db.exec(statement)) == sorted(names)
+
+
+@pytest.mark.usefixtures("catalog_state")
+def test_catalog_is_reloaded_when_another_process_seeds(
+    db: Session,
+    redis_db: fakeredis.FakeRedis,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "BUSINESS_TYPE_CATALOG_CHECK_SECONDS", 0)
+    catalog = get_business_type_catalog(db)
+    name = f"Business {uuid.uuid4().hex}"
+
+    # the seeding process publishes the version of its catalog
+    seed_business_types(db, [name])
+    monkeypatch.setattr(business_types, "_catalog", catalog)
+    assert redis_db.get(business_types.VERSION_KEY) != catalog.version
+
+    reloaded = get_business_type_catalog(db)
+    assert name in reloaded
+    assert get_business_type_catalog(db) is reloaded
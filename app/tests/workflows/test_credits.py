@@ -0,0 +1,147 @@
+import datetime
+import threading
+import uuid
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import Engine, func
+from sqlmodel import Session, create_engine, select
+
+from app.core.db import get_url
+from app.models import Credit, ReservedCredit, SearchHistory, User
+from app.tests.utils.user import create_random_user
+from app.workflows.credits import (
+    PENDING_TASK_PREFIX,
+    consume_credit,
+    get_credit,
+    release_stale_reservations,
+    reserve_credit,
+)
+
+PARALLEL_REQUESTS = 100
+
+
+@pytest.fixture(scope="module")
+def stress_engine() -> Iterator[Engine]:
+    # enough connections for the requests to really contend for the rows
+    engine = create_engine(get_url(), pool_size=30, max_overflow=0)
+    yield engine
+    engine.dispose()
+
+
+def run_in_parallel(engine: Engine, request: Callable[[Session], None]) -> int:
+    # number of requests that went through
+    barrier = threading.Barrier(PARALLEL_REQUESTS)
+
+    def one_request() -> bool:
+        barrier.wait()
+        with Session(engine) as session:
+            try:
+                request(session)
+            except ValueError:
+                session.rollback()
+                return False
+            session.commit()
+            return True
+
+    with ThreadPoolExecutor(max_workers=PARALLEL_REQUESTS) as executor:
+        futures = [
+            executor.submit(one_request) for _ in range(PARALLEL_REQUESTS)
+        ]
+        return sum(future.result() for future in futures)
+
+
+def create_account(db: Session, free_credit: int, paid_credit: int) -> int:
+    user = create_random_user(db)
+    user.free_credit = free_credit
+    db.commit()
+    get_credit(db, user.id, paid_credit)  # type: ignore
+    return user.id  # type: ignore
+
+
+def test_parallel_reservations_never_oversubscribe(
+    db: Session, stress_engine: Engine
+) -> None:
+    user_id = create_account(db, free_credit=10, paid_credit=20)
+
+    def reserve(session: Session) -> None:
+        user = session.get(User, user_id)
+        reserve_credit(session, user, 1, uuid.uuid4().hex)  # type: ignore
+
+    assert run_in_parallel(stress_engine, reserve) == 30
+
+    user = db.get(User, user_id, populate_existing=True)
+    assert user.reserved_credit == 30  # type: ignore
+    assert user.available_credit == 0  # type: ignore
+    reservations = db.exec(
+        select(func.count(ReservedCredit.id)).where(
+            ReservedCredit.user_id == user_id
+        )
+    ).one()
+    assert reservations == 30
+
+
+def test_parallel_consumption_never_overspends(
+    db: Session, stress_engine: Engine
+) -> None:
+    user_id = create_account(db, free_credit=10, paid_credit=30)
+
+    def consume(session: Session) -> None:
+        consume_credit(session, user_id, 1)
+
+    assert run_in_parallel(stress_engine, consume) == 40
+
+    user = db.get(User, user_id, populate_existing=True)
+    credit = db.exec(select(Credit).where(Credit.user_id == user_id)).one()
+    assert user.free_credit == 0  # type: ignore
+    assert credit.used_credit == credit.total_credit == 30
+
+
+def test_stale_reservations_are_released(db: Session) -> None:
+    user_id = create_account(db, free_credit=10, paid_credit=0)
+    user = db.get(User, user_id)
+    now = datetime.datetime.now()
+
+    def reserve(task_id: str, age: datetime.timedelta) -> ReservedCredit:
+        reserved_credit = reserve_credit(db, user, 1, task_id)  # type: ignore
+        reserved_credit.created_at = now - age
+        db.add(reserved_credit)
+        db.commit()
+        return reserved_credit
+
+    never_started = reserve(
+        f"{PENDING_TASK_PREFIX}{uuid.uuid4().hex}", datetime.timedelta(hours=1)
+    )
+    starting = reserve(
+        f"{PENDING_TASK_PREFIX}{uuid.uuid4().hex}",
+        datetime.timedelta(seconds=1),
+    )
+    never_finished = reserve(uuid.uuid4().hex, datetime.timedelta(days=2))
+    running = reserve(uuid.uuid4().hex, datetime.timedelta(hours=1))
+    db.add(
+        SearchHistory(
+            user_id=user_id,
+            internal_search_ids={"internal_search_ids": []},
+            credits_used=0,
+            source="people",
+            task_id=never_started.task_id,
+            status="In progress",
+            search_time=now,
+        )
+    )
+    db.commit()
+
+    assert release_stale_reservations(db) >= 2
+
+    for reserved_credit in (never_started, starting, never_finished, running):
+        db.refresh(reserved_credit)
+    assert never_started.status == never_finished.status == "released"
+    assert starting.status == running.status == "reserved"
+    assert db.get(User, user_id, populate_existing=True).reserved_credit == 2  # type: ignore
+    search_history = db.exec(
+        select(SearchHistory).where(
+            SearchHistory.task_id == never_started.task_id
+        )
+    ).first()
+    assert search_history is None
@@ -0,0 +1,56 @@
+import uuid
+
+from sqlmodel import Session, select
+
+from app.benchmarks.synthetic import business_leads, people_leads
+from app.core.tasks.process_scraped_data import (
+    process_people_data,
+    process_scraped_data,
+)
+from app.models import BusinessLead, PeopleDataRequest
+from app.workflows.leads import resolve_lead_ids, search_people_leads
+
+
+def test_resolve_lead_ids_keeps_input_order(db: Session) -> None:
+    leads = business_leads(3)
+    process_scraped_data(leads, db)
+    phones = [lead.company_phone for lead in leads]
+    ids = {
+        lead.company_phone: lead.id
+        for lead in db.exec(
+            select(BusinessLead).where(BusinessLead.company_phone.in_(phones))
+        )
+    }
+
+    keys = [phones[2], "unknown", phones[0], phones[2]]
+    lead_ids = resolve_lead_ids(db, "business", keys)
+
+    assert lead_ids == [ids[phones[2]], ids[phones[0]], ids[phones[2]]]
+
+
+def test_resolve_lead_ids_without_keys(db: Session) -> None:
+    assert resolve_lead_ids(db, "people", []) == []
+
+
+def test_search_people_leads_limits_each_item(db: Session) -> None:
+    city = f"City {uuid.uuid4().hex}"
+    people = people_leads(12)
+    for i, person in enumerate(people):
+        person.city, person.state = city, None if i % 2 else "TX"
+        person.street = f"Street {i % 3}"
+    process_people_data(people, db)
+
+    items = [
+        PeopleDataRequest(city=city, state=None, streets=["Street 1"]),
+        PeopleDataRequest(city=city, state="TX", streets=None),
+        PeopleDataRequest(city="Nowhere", state="TX", streets=None),
+        PeopleDataRequest(city=city, state=None, streets=["Street 1"]),
+    ]
+    leads = db.exec(search_people_leads(items, limit=3)).all()
+
+    # item after item, duplicates across items kept
+    assert [(lead.state, lead.street) for lead in leads[:2]] == [
+        (None, "Street 1")
+    ] * 2
+    assert [lead.state for lead in leads[2:5]] == ["TX"] * 3
+    assert [lead.id for lead in leads[5:]] == [lead.id for lead in leads[:2]]
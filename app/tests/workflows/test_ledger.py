@@ -0,0 +1,81 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import inspect
+from sqlmodel import Session
+
+from app.models import TransactionCreate, User
+from app.tests.utils.user import create_random_user
+from app.workflows.credits import (
+    get_credit,
+    release_credit,
+    reserve_credit,
+    return_reserved_credit,
+)
+from app.workflows.ledger import record_usage
+from app.workflows.transactions import (
+    create_transaction,
+    update_transaction_status,
+)
+
+
+def test_reservations_keep_the_balance_row_up_to_date(db: Session) -> None:
+    user = create_random_user(db)
+    user.free_credit = 5
+    db.commit()
+    get_credit(db, user.id, 100)  # type: ignore
+
+    reserve_credit(db, user, 30, uuid.uuid4().hex)  # type: ignore
+    reserve_credit(db, user, 20, uuid.uuid4().hex)  # type: ignore
+    db.refresh(user)
+    assert user.reserved_credit == 50
+    assert user.available_credit == 105 - 50
+
+    first, second = sorted(
+        user.reserved_credits, key=lambda reserved: reserved.id
+    )
+    release_credit(db, first, 10)
+    db.commit()
+    return_reserved_credit(db, second)
+    db.refresh(user)
+
+    assert user.reserved_credit == 0
+    assert user.free_credit == 0
+    assert user.credits.used_credit == 5
+    assert user.credits.total_credit == 120
+
+
+def test_monthly_usage_is_read_without_the_history(db: Session) -> None:
+    user = create_random_user(db)
+    now = datetime.now()
+    record_usage(db, user.id, 7, now)  # type: ignore
+    record_usage(db, user.id, 5, now)  # type: ignore
+    record_usage(db, user.id, 9, now.replace(year=now.year - 1))  # type: ignore
+
+    transaction = create_transaction(
+        db,
+        TransactionCreate(
+            user_id=user.id,  # type: ignore
+            stripe_payment_id=uuid.uuid4().hex,
+            amount=25.5,
+            credits_purchased=100,
+            currency="USD",
+            status="pending",
+            created_at=now,
+        ),
+    )
+    assert user.money_spent == 0
+    update_transaction_status(db, transaction, "succeeded")
+    update_transaction_status(db, transaction, "succeeded")
+
+    user = db.get(User, user.id)  # type: ignore
+    db.expire(user)
+    assert user.credit_usage == 12
+    assert user.leads_collected == 12
+    assert user.money_spent == 25.5
+
+    unloaded = inspect(user).unloaded
+    assert {"search_history", "transactions", "reserved_credits"} <= unloaded
+
+    update_transaction_status(db, transaction, "refunded")
+    assert user.money_spent == 0
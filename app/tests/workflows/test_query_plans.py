@@ -0,0 +1,118 @@
+import datetime
+import json
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlmodel import Session, text
+
+from app.benchmarks.synthetic import business_leads, people_leads
+from app.core.tasks.process_scraped_data import (
+    process_people_data,
+    process_scraped_data,
+)
+from app.models import PeopleDataRequest
+from app.workflows.leads import (
+    lead_ids_statement,
+    search_business_leads,
+    search_people_leads,
+)
+from app.workflows.stats import search_stats_statement, spend_stats_statement
+
+
+@pytest.fixture
+def plans(db: Session) -> Iterator[Session]:
+    # Postgres prefers a sequential scan on a table as small as the test
+    # one, with sequential scans priced out only a missing index makes the
+    # plan fall back to one
+    process_scraped_data(business_leads(50), db)
+    process_people_data(people_leads(50), db)
+    db.exec(text("ANALYZE businesslead"))
+    db.exec(text("ANALYZE peoplelead"))
+    db.exec(text("SET LOCAL enable_seqscan = off"))
+    yield db
+    db.rollback()
+
+
+def explain(session: Session, statement: Any) -> list[dict[str, Any]]:
+    compiled = statement.compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    )
+    (plan,) = session.exec(text(f"EXPLAIN (FORMAT JSON) {compiled}")).one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    nodes, pending = [], [plan[0]["Plan"]]
+    while pending:
+        node = pending.pop()
+        nodes.append(node)
+        pending.extend(node.get("Plans", []))
+    return nodes
+
+
+def assert_index_scan(nodes: list[dict[str, Any]], *indexes: str) -> None:
+    node_types = {node["Node Type"] for node in nodes}
+    assert "Seq Scan" not in node_types
+    assert "BitmapAnd" not in node_types
+    assert {node.get("Index Name") for node in nodes} & set(indexes)
+
+
+TYPE_STATE_CITY = "ix_businesslead_business_type_state_city"
+TYPE_CITY = "ix_businesslead_business_type_city"
+
+
+@pytest.mark.parametrize(
+    "states, cities, indexes",
+    [
+        (["TX"], None, [TYPE_STATE_CITY]),
+        (["TX", "CA"], ["Austin"], [TYPE_STATE_CITY, TYPE_CITY]),
+        (None, ["Austin", "Dallas"], [TYPE_CITY]),
+    ],
+)
+def test_business_lead_search_uses_composite_index(
+    plans: Session,
+    states: list[str] | None,
+    cities: list[str] | None,
+    indexes: list[str],
+) -> None:
+    statement = search_business_leads(
+        ["Cafe", "Bakery"], states, cities, limit=30
+    )
+
+    assert_index_scan(explain(plans, statement), *indexes)
+
+
+def test_lead_ids_resolve_from_the_phone_index(plans: Session) -> None:
+    statement = lead_ids_statement("business", ["+15550000001", "+15550002"])
+
+    assert_index_scan(
+        explain(plans, statement), "ix_businesslead_company_phone"
+    )
+
+
+def test_people_lead_search_uses_address_index(plans: Session) -> None:
+    items = [
+        PeopleDataRequest(city="Austin", state="TX", streets=["Street 1"]),
+        PeopleDataRequest(city="Boston", state="MA", streets=None),
+        PeopleDataRequest(city="Denver", state=None, streets=None),
+    ]
+
+    nodes = explain(plans, search_people_leads(items, limit=30))
+
+    assert_index_scan(nodes, "ix_peoplelead_state_city_street")
+    scans = [node for node in nodes if "Index Name" in node]
+    assert len(scans) == len(items)
+
+
+def test_monthly_stats_sum_index_ranges(plans: Session) -> None:
+    month = datetime.date(2024, 12, 1)
+
+    assert_index_scan(
+        explain(plans, search_stats_statement(1, month)),
+        "ix_searchhistory_user_id_search_time_id",
+    )
+    assert_index_scan(
+        explain(plans, spend_stats_statement(1, month)),
+        "ix_transaction_user_id_created_at_id",
+    )
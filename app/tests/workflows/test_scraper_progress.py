@@ -0,0 +1,189 @@
+import asyncio
+import json
+from typing import Any
+
+import fakeredis
+import pytest
+from redis.client import Pipeline
+from sqlmodel import Session
+
+from app.core.scraper_client import ScraperUnavailable
+from app.models import (
+    PeopleDataRequest,
+    PeopleLeadDataRequest,
+    ScraperEventData,
+)
+from app.tests.utils.user import create_random_user
+from app.workflows import scraper
+from app.workflows.scraper import (
+    ACTIVE_EVENTS,
+    iter_scraper_progress,
+    progress_key,
+    publish_scraper_progress,
+    read_scraper_event,
+    send_start_scraper_command,
+)
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+def running_event() -> ScraperEventData:
+    return ScraperEventData(
+        id=7,
+        user_id=1,
+        status="running",
+        scraped_results=0,
+        total_results=0,
+        looked_owner=0,
+    )
+
+
+@pytest.mark.anyio
+async def test_progress_stream_pushes_changes(
+    redis_db: fakeredis.FakeRedis,
+) -> None:
+    stream = iter_scraper_progress(running_event(), poll_seconds=30)
+    assert await anext(stream) == {
+        "status": "running",
+        "scraped_results": 0,
+        "total_results": 0,
+        "looked_owner": 0,
+    }
+
+    redis_db.set(
+        progress_key(7),
+        json.dumps({"scraped_results": 3, "total_results": 10}),
+    )
+    redis_db.publish(progress_key(7), "set")
+    delta = await asyncio.wait_for(anext(stream), 1)
+    assert delta == {"scraped_results": 3, "total_results": 10}
+
+    redis_db.zadd(ACTIVE_EVENTS, {7: 0})
+    publish_scraper_progress(7, status="finished")
+    assert await asyncio.wait_for(anext(stream), 1) == {"status": "finished"}
+    assert redis_db.zscore(ACTIVE_EVENTS, 7) is None
+    with pytest.raises(StopAsyncIteration):
+        await anext(stream)
+
+
+def test_progress_written_during_a_merge_is_kept(
+    redis_db: fakeredis.FakeRedis, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    redis_db.set(progress_key(7), json.dumps({"scraped_results": 1}))
+    read = Pipeline.get
+
+    def read_then_scraper_writes(self: Pipeline, name: str) -> Any:
+        value = read(self, name)
+        if json.loads(value) == {"scraped_results": 1}:
+            redis_db.set(name, json.dumps({"scraped_results": 2}))
+        return value
+
+    monkeypatch.setattr(Pipeline, "get", read_then_scraper_writes)
+    publish_scraper_progress(7, status="finished")
+
+    assert json.loads(redis_db.get(progress_key(7))) == {
+        "scraped_results": 2,
+        "status": "finished",
+    }
+
+
+@pytest.mark.anyio
+async def test_progress_stream_follows_keys_without_messages(
+    redis_db: fakeredis.FakeRedis,
+) -> None:
+    stream = iter_scraper_progress(running_event(), poll_seconds=0.01)
+    await anext(stream)
+    assert await anext(stream) == {}
+
+    redis_db.set(progress_key(7), json.dumps({"looked_owner": 2}))
+    deltas = [await anext(stream) for _ in range(2)]
+    assert {"looked_owner": 2} in deltas
+    await stream.aclose()
+
+
+@pytest.mark.anyio
+@pytest.mark.usefixtures("redis_db")
+async def test_finished_event_streams_its_state_only() -> None:
+    event = running_event()
+    event.status = "finished"
+
+    assert [delta async for delta in iter_scraper_progress(event, 30)] == [
+        {
+            "status": "finished",
+            "scraped_results": 0,
+            "total_results": 0,
+            "looked_owner": 0,
+        }
+    ]
+
+
+@pytest.mark.anyio
+async def test_status_read_writes_nothing(
+    db: Session, redis_db: fakeredis.FakeRedis
+) -> None:
+    user = create_random_user(db)
+    event = ScraperEventData(
+        user_id=user.id, status="running", source="business", task_id="t"
+    )
+    db.add(event)
+    db.commit()
+    redis_db.set(
+        progress_key(event.id),
+        json.dumps(
+            {"scraped_results": 4, "total_results": 9, "looked_owner": 1}
+        ),
+    )
+
+    read = await read_scraper_event(db, event.id, user.id)  # type: ignore
+
+    assert (read.status, read.task_id, read.scraped_results) == (  # type: ignore
+        "running",
+        "t",
+        4,
+    )
+    assert not db.dirty and not db.new
+    db.expire_all()
+    assert db.get(ScraperEventData, event.id).scraped_results is None  # type: ignore
+
+
+@pytest.mark.anyio
+async def test_failed_start_leaves_no_active_event(
+    db: Session,
+    redis_db: fakeredis.FakeRedis,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    class DownScraper:
+        async def start_scraping(self, *_args: Any) -> None:
+            raise ScraperUnavailable("down")
+
+    monkeypatch.setattr(scraper, "get_scraper_client", DownScraper)
+    user = create_random_user(db)
+    data = PeopleLeadDataRequest(
+        items=[PeopleDataRequest(city="A", state="B", streets=["C"])],
+        limit=1,
+        email="leads@example.com",
+    )
+
+    assert await send_start_scraper_command(db, user, data, "people") == {
+        "status": False
+    }
+    assert redis_db.zcard(ACTIVE_EVENTS) == 0
+    event = db.query(ScraperEventData).filter_by(user_id=user.id).one()
+    assert event.status == "failed"
+
+
+@pytest.mark.anyio
+@pytest.mark.usefixtures("redis_db")
+async def test_events_of_other_users_are_not_read(db: Session) -> None:
+    owner = create_random_user(db)
+    other = create_random_user(db)
+    event = ScraperEventData(
+        user_id=owner.id, status="running", source="business", task_id="t"
+    )
+    db.add(event)
+    db.commit()
+
+    assert await read_scraper_event(db, event.id, other.id) is None  # type: ignore
@@ -0,0 +1,83 @@
+import datetime
+import uuid
+
+from sqlmodel import Session
+
+from app.models import SearchHistory, TransactionCreate
+from app.tests.utils.user import create_random_user
+from app.workflows.ledger import record_usage
+from app.workflows.stats import (
+    compute_monthly_stats,
+    get_monthly_stats,
+    month_window,
+)
+from app.workflows.transactions import create_transaction
+
+
+def test_month_window_crosses_the_year() -> None:
+    assert month_window(datetime.date(2024, 12, 15)) == (
+        datetime.datetime(2024, 12, 1),
+        datetime.datetime(2025, 1, 1),
+    )
+
+
+def test_monthly_stats_match_the_ledger(db: Session) -> None:
+    user = create_random_user(db)
+    times = [
+        datetime.datetime(2024, 12, 1),
+        datetime.datetime(2024, 12, 31, 23, 59, 59, 999999),
+        datetime.datetime(2025, 1, 1),
+    ]
+    for search_time in times:
+        db.add(
+            SearchHistory(
+                user_id=user.id,
+                search_time=search_time,
+                internal_search_ids={"internal_search_ids": []},
+                credits_used=4,
+                source="business",
+            )
+        )
+        record_usage(db, user.id, 4, search_time)  # type: ignore
+    for amount, status in [(10.0, "succeeded"), (99.0, "pending")]:
+        create_transaction(
+            db,
+            TransactionCreate(
+                user_id=user.id,  # type: ignore
+                stripe_payment_id=uuid.uuid4().hex,
+                amount=amount,
+                credits_purchased=100,
+                currency="USD",
+                status=status,
+                created_at=times[1],
+            ),
+        )
+
+    stats = compute_monthly_stats(db, user.id, datetime.date(2024, 12, 9))  # type: ignore
+
+    assert stats.month == datetime.date(2024, 12, 1)
+    assert (stats.searches, stats.credits_used, stats.leads_collected) == (
+        2,
+        8,
+        8,
+    )
+    assert (stats.transactions, stats.money_spent) == (1, 10.0)
+
+
+def test_monthly_stats_are_cached(db: Session) -> None:
+    user = create_random_user(db)
+    month = datetime.date(2024, 6, 1)
+    stats = get_monthly_stats(db, user.id, month)  # type: ignore
+    db.add(
+        SearchHistory(
+            user_id=user.id,
+            search_time=datetime.datetime(2024, 6, 2),
+            internal_search_ids={"internal_search_ids": []},
+            credits_used=3,
+            source="people",
+        )
+    )
+    db.commit()
+
+    assert get_monthly_stats(db, user.id, month) is stats  # type: ignore
+    assert compute_monthly_stats(db, user.id, month).credits_used == 3  # type: ignore
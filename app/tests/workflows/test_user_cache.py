@@ -0,0 +1,41 @@
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.tests.utils.user import create_random_user
+from app.tests.utils.utils import count_queries
+from app.workflows.credits import consume_credit
+from app.workflows.user_cache import get_user_snapshot
+
+
+def test_snapshot_is_served_from_the_cache(db: Session) -> None:
+    user = create_random_user(db)
+
+    with Session(engine) as session:
+        first = get_user_snapshot(session, user.id)  # type: ignore
+    with count_queries() as statements, Session(engine) as session:
+        second = get_user_snapshot(session, user.id)  # type: ignore
+
+    assert second is first
+    assert statements == []
+
+
+def test_committed_changes_drop_the_snapshot(db: Session) -> None:
+    user = create_random_user(db)
+    user_id: int = user.id  # type: ignore
+    before = get_user_snapshot(db, user_id)
+
+    # ORM changes of the user
+    user.full_name = "Renamed"
+    db.commit()
+    renamed = get_user_snapshot(db, user_id)
+    assert renamed.full_name == "Renamed"  # type: ignore
+
+    # credit statements that bypass the ORM, a request reading before the
+    # commit caches the old balance until the commit
+    consume_credit(db, user_id, 5)
+    with Session(engine) as session:
+        stale = get_user_snapshot(session, user_id)
+    assert stale.available_credit == before.available_credit  # type: ignore
+    db.commit()
+    after = get_user_snapshot(db, user_id)
+    assert after.available_credit == before.available_credit - 5  # type: ignore
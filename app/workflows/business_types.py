@@ -0,0 +1,185 @@
+import hashlib
+import time
+from bisect import bisect_left
+from collections.abc import Iterable
+from functools import lru_cache
+
+import redis
+from sqlalchemy import insert
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.logs import get_logger
+from app.core.redis_client import get_sync_redis
+from app.models import BusinessType, PublicBusinessType
+
+logger = get_logger()
+
+# version of the table content, written when the table changes
+VERSION_KEY = "business_types:version"
+
+# match ranks, lower is better
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING = range(4)
+# sorts after every suffix that starts with the query
+_LAST = chr(0x10FFFF)
+
+
+def _rank(name: str, query: str) -> int:
+    position = name.find(query)
+    if position == 0:
+        return EXACT if len(name) == len(query) else PREFIX
+    if name[position - 1] == " " or f" {query}" in name:
+        return WORD_PREFIX
+    return SUBSTRING
+
+
+class BusinessTypeCatalog:
+    """
+    Immutable in-process copy of the business type table, sorted by name.
+
+    search() answers the same "name contains" searches as the table,
+    ranked exact match first, then names starting with the query, then
+    names with a word starting with it, then any other match,
+    alphabetically within a rank. The matches are found by bisecting a
+    sorted array of every suffix of the lowercased names, the suffixes
+    starting with the query belong to the names that contain it. get()
+    and resolve() look names up case-insensitively. version changes
+    whenever the content does.
+    """
+
+    def __init__(self, business_types: Iterable[tuple[int, str]]) -> None:
+        self.business_types = tuple(
+            PublicBusinessType(id=id, name=name)
+            for name, id in sorted((name, id) for id, name in business_types)
+        )
+        self.names = tuple(
+            business_type.name.lower() for business_type in self.business_types
+        )
+        self.by_name: dict[str, PublicBusinessType] = {}
+        for key, business_type in zip(
+            self.names, self.business_types, strict=True
+        ):
+            self.by_name.setdefault(key, business_type)
+
+        suffixes = sorted(
+            (key[start:], position)
+            for position, key in enumerate(self.names)
+            for start in range(len(key))
+        )
+        self.suffixes = [suffix for suffix, _ in suffixes]
+        self.suffix_owners = [position for _, position in suffixes]
+
+        content = "\n".join(
+            f"{business_type.id}\t{business_type.name}"
+            for business_type in self.business_types
+        )
+        self.version = hashlib.sha256(content.encode()).hexdigest()[:16]
+
+        # autocomplete asks for the same few letters over and over
+        self.search = lru_cache(maxsize=4096)(self._search)
+
+    def __len__(self) -> int:
+        return len(self.business_types)
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self.by_name
+
+    def get(self, name: str) -> PublicBusinessType | None:
+        return self.by_name.get(name.lower())
+
+    def resolve(self, names: Iterable[str]) -> tuple[list[str], list[str]]:
+        """
+        Catalog spelling of the given names and the names that are not in
+        the catalog.
+        """
+        known, unknown = [], []
+        for name in names:
+            business_type = self.get(name)
+            if business_type:
+                known.append(business_type.name)
+            else:
+                unknown.append(name)
+        return known, unknown
+
+    def _search(self, name: str) -> tuple[PublicBusinessType, ...]:
+        query = name.lower()
+        if not query:
+            return self.business_types
+
+        start = bisect_left(self.suffixes, query)
+        end = bisect_left(self.suffixes, query + _LAST, start)
+        matches = sorted(
+            (_rank(self.names[position], query), position)
+            for position in set(self.suffix_owners[start:end])
+        )
+        return tuple(self.business_types[position] for _, position in matches)
+
+
+_catalog: BusinessTypeCatalog | None = None
+# the stored version last compared with the catalog and when
+_seen_version: str | None = None
+_checked_at = 0.0
+
+
+def load_business_type_catalog(session: Session) -> BusinessTypeCatalog:
+    # replaces the catalog of this process with the current table content
+    global _catalog
+    statement = select(BusinessType.id, BusinessType.name)
+    _catalog = BusinessTypeCatalog(session.exec(statement).all())
+    logger.info(
+        f"Loaded {len(_catalog)} business types [version {_catalog.version}]"
+    )
+    return _catalog
+
+
+def _stored_version() -> str | None:
+    try:
+        return get_sync_redis().get(VERSION_KEY)
+    except redis.RedisError as e:
+        logger.warning(f"Business type version not read: {e!r}")
+        return None
+
+
+def get_business_type_catalog(session: Session) -> BusinessTypeCatalog:
+    """
+    The catalog of this process. It is loaded at startup, the session is
+    used when it was not or when another process changed the table, which
+    is checked at most every BUSINESS_TYPE_CATALOG_CHECK_SECONDS.
+    """
+    global _seen_version, _checked_at
+    if _catalog is None:
+        return load_business_type_catalog(session)
+    now = time.monotonic()
+    if now - _checked_at < settings.BUSINESS_TYPE_CATALOG_CHECK_SECONDS:
+        return _catalog
+    _checked_at = now
+    stored = _stored_version()
+    # reloads once per new version, a table changed without publishing
+    # its version must not reload on every check
+    if stored is not None and stored != _seen_version:
+        _seen_version = stored
+        if stored != _catalog.version:
+            return load_business_type_catalog(session)
+    return _catalog
+
+
+def seed_business_types(session: Session, names: Iterable[str]) -> int:
+    """
+    Add the names the table does not have yet with a single multi-row
+    insert and publish the new version to the other processes. Returns
+    the number of names added.
+    """
+    existing = set(session.exec(select(BusinessType.name)))
+    missing = [name for name in dict.fromkeys(names) if name not in existing]
+    if missing:
+        table = BusinessType.__table__
+        session.connection().execute(
+            insert(table).values([{"name": name} for name in missing])
+        )
+        session.commit()
+        version = load_business_type_catalog(session).version
+        try:
+            get_sync_redis().set(VERSION_KEY, version)
+        except redis.RedisError as e:
+            logger.warning(f"Business type version not published: {e!r}")
+    return len(missing)
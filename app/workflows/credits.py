@@ -1,8 +1,71 @@
 import datetime
 
-from sqlmodel import Session, select
+from sqlalchemy import and_, delete, func, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql.expression import CTE
+from sqlmodel import Session
 
-from app.models import Credit, ReservedCredit, User
+from app.core.config import settings
+from app.models import Credit, ReservedCredit, SearchHistory, User
+from app.workflows.user_cache import invalidate_user
+
+# task id of a reservation until the scraper API returns the real one
+PENDING_TASK_PREFIX = "pending-"
+
+# Every change to the credits of a user runs as a single statement that
+# first locks the user and the balance row with SELECT ... FOR UPDATE.
+# Locking both makes Postgres re-read both after waiting for a concurrent
+# change, so the balance check and the write that follows it in the same
+# statement always see the latest committed free and paid credits.
+
+
+def _account(user_id: int) -> CTE:
+    available = (
+        func.coalesce(User.free_credit, 0)
+        + Credit.total_credit
+        - Credit.used_credit
+        - Credit.reserved_credit
+    )
+    return (
+        select(
+            User.id.label("user_id"),
+            Credit.id.label("credit_id"),
+            func.greatest(func.coalesce(User.free_credit, 0), 0).label(
+                "free_credit"
+            ),
+            available.label("available"),
+        )
+        .join(Credit, Credit.user_id == User.id)
+        .where(User.id == user_id)
+        .with_for_update(of=[User.__table__, Credit.__table__])
+        .cte("account")
+    )
+
+
+def _expire_account(session: Session, user_id: int) -> None:
+    # the statements bypass the ORM, objects loaded before are stale
+    for obj in list(session.identity_map.values()):
+        if (isinstance(obj, User) and obj.id == user_id) or (
+            isinstance(obj, Credit) and obj.user_id == user_id
+        ):
+            session.expire(obj)
+    invalidate_user(session, user_id)
+
+
+def ensure_credit(session: Session, user_id: int) -> None:
+    # users created before the balance row was created with the user
+    now = datetime.datetime.now()
+    statement = insert(Credit.__table__).values(
+        user_id=user_id,
+        total_credit=0,
+        used_credit=0,
+        reserved_credit=0,
+        created_at=now,
+        updated_at=now,
+    )
+    session.connection().execute(
+        statement.on_conflict_do_nothing(index_elements=["user_id"])
+    )
 
 
 def create_credit(session: Session, user_id: int) -> Credit:
@@ -14,30 +77,80 @@ def create_credit(session: Session, user_id: int) -> Credit:
         updated_at=datetime.datetime.now(),
     )
     session.add(credit)
-    session.commit()
+    session.flush()
     return credit
 
 
 def get_credit(session: Session, user_id: int, amount: int) -> None:
-    statement = select(Credit).where(Credit.user_id == user_id)
-    credit = session.exec(statement).first()
-    if credit is None:
-        credit = create_credit(session, user_id)
-
-    credit.total_credit += amount
-    credit.updated_at = datetime.datetime.utcnow()
+    now = datetime.datetime.now()
+    table = Credit.__table__
+    statement = insert(table).values(
+        user_id=user_id,
+        total_credit=amount,
+        used_credit=0,
+        reserved_credit=0,
+        created_at=now,
+        updated_at=now,
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.user_id],
+        set_={
+            "total_credit": table.c.total_credit
+            + statement.excluded.total_credit,
+            "updated_at": statement.excluded.updated_at,
+        },
+    )
+    session.connection().execute(statement)
+    _expire_account(session, user_id)
     session.commit()
 
 
-def use_credit(session: Session, user_id: int, amount: int) -> None:
-    statement = select(Credit).where(Credit.user_id == user_id)
-    credit = session.exec(statement).first()
-    if credit is None:
-        credit = create_credit(session, user_id)
+def consume_credit(
+    session: Session, user_id: int, amount: int, release: int = 0
+) -> None:
+    """
+    Use amount credits, free credits first, and take release credits off
+    the reserved total, in one statement. Raises ValueError when the user
+    does not have the credits. The caller commits, together with the rest
+    of its changes.
+    """
+    if not amount and not release:
+        return
 
-    credit.used_credit += amount
-    credit.updated_at = datetime.datetime.now()
-    session.commit()
+    account = _account(user_id)
+    enough = account.c.available + release >= amount
+    from_free = func.least(account.c.free_credit, amount)
+    free = (
+        update(User)
+        .where(User.id == account.c.user_id, enough)
+        .values(free_credit=User.free_credit - from_free)
+        .returning(User.id)
+        .cte("free")
+    )
+    statement = (
+        update(Credit)
+        .where(
+            Credit.id == account.c.credit_id,
+            enough,
+            # keeps the free credit update in the statement
+            Credit.user_id.in_(select(free.c.id)),
+        )
+        .values(
+            used_credit=Credit.used_credit + amount - from_free,
+            reserved_credit=Credit.reserved_credit - release,
+            updated_at=datetime.datetime.now(),
+        )
+        .returning(Credit.id)
+    )
+    result = session.connection().execute(statement).first()
+    _expire_account(session, user_id)
+    if result is None:
+        raise ValueError("Insufficient credits")
+
+
+def use_credit(session: Session, user_id: int, amount: int) -> None:
+    # the caller commits, together with the rest of its changes
+    consume_credit(session, user_id, amount)
 
 
 def create_reserved_credit(
@@ -56,29 +169,120 @@ def create_reserved_credit(
     return reserved_credit
 
 
-def reserve_credit(
-    session: Session, user: User, amount: int, task_id: int
-) -> None:
-    statement = select(Credit).where(Credit.user_id == user.id)
-    credit = session.exec(statement).first()
-    if credit is None and user.free_credit <= 0:
-        raise ValueError("Insufficient credits. Create credit first.")
+def _reserve(
+    session: Session, user_id: int, amount: int, task_id: str
+) -> int | None:
+    now = datetime.datetime.now()
+    account = _account(user_id)
+    reserved = (
+        update(Credit)
+        .where(Credit.id == account.c.credit_id, account.c.available >= amount)
+        .values(
+            reserved_credit=Credit.reserved_credit + amount, updated_at=now
+        )
+        .returning(Credit.user_id)
+        .cte("reserved")
+    )
+    statement = (
+        insert(ReservedCredit.__table__)
+        .from_select(
+            [
+                "user_id",
+                "credits_reserved",
+                "task_id",
+                "status",
+                "created_at",
+                "updated_at",
+            ],
+            select(
+                reserved.c.user_id,
+                literal(amount),
+                literal(task_id),
+                literal("reserved"),
+                literal(now),
+                literal(now),
+            ),
+        )
+        .returning(ReservedCredit.__table__.c.id)
+    )
+    return session.connection().execute(statement).scalar()
 
-    if user.available_credit < amount:
-        raise ValueError("Insufficient credits")
 
-    create_reserved_credit(session, user.id, amount, task_id)  # type: ignore
-    # use_credit(session, user.id, amount)  # type: ignore
-    session.commit()
+def reserve_credit(
+    session: Session, user: User, amount: int, task_id: str
+) -> ReservedCredit:
+    """
+    Check the balance and reserve amount credits for the task in one
+    statement. Raises ValueError when the user does not have the credits.
+    The caller commits, together with the rest of its changes.
+    """
+    reserved_id = _reserve(session, user.id, amount, task_id)  # type: ignore
+    if reserved_id is None:
+        ensure_credit(session, user.id)  # type: ignore
+        reserved_id = _reserve(session, user.id, amount, task_id)  # type: ignore
+    _expire_account(session, user.id)  # type: ignore
+    if reserved_id is None:
+        raise ValueError("Insufficient credits")
+    return session.get(ReservedCredit, reserved_id)  # type: ignore
 
 
 def release_credit(
     session: Session, reserved_credit: ReservedCredit, credits_to_use: int
 ) -> None:
-    use_credit(session, reserved_credit.user_id, credits_to_use)
+    # the caller commits, together with the rest of its changes
+    release = 0
+    if reserved_credit.status == "reserved":
+        release = reserved_credit.credits_reserved or 0
+    consume_credit(
+        session, reserved_credit.user_id, credits_to_use, release  # type: ignore
+    )
     reserved_credit.updated_at = datetime.datetime.now()
     reserved_credit.status = "released"
+    session.add(reserved_credit)
+
+
+def release_stale_reservations(session: Session) -> int:
+    """
+    Give back the credits of reservations no finish notification will
+    release: those still under a pending task id after
+    PENDING_RESERVATION_MAX_SECONDS, as the scraper start never completed,
+    and any other after SCRAPER_EVENT_MAX_SECONDS. The searches that never
+    started are deleted. Returns the number of reservations released.
+    """
+    now = datetime.datetime.now()
+    pending_before = now - datetime.timedelta(
+        seconds=settings.PENDING_RESERVATION_MAX_SECONDS
+    )
+    started_before = now - datetime.timedelta(
+        seconds=settings.SCRAPER_EVENT_MAX_SECONDS
+    )
+    pending = ReservedCredit.task_id.startswith(  # type: ignore
+        PENDING_TASK_PREFIX
+    )
+    statement = (
+        select(ReservedCredit)
+        .where(
+            ReservedCredit.status == "reserved",
+            or_(
+                and_(pending, ReservedCredit.created_at < pending_before),
+                ReservedCredit.created_at < started_before,
+            ),
+        )
+        .with_for_update(skip_locked=True)
+    )
+    stale = session.scalars(statement).all()
+    for reserved_credit in stale:
+        release_credit(session, reserved_credit, 0)
+        if reserved_credit.task_id.startswith(  # type: ignore
+            PENDING_TASK_PREFIX
+        ):
+            session.execute(
+                delete(SearchHistory).where(
+                    SearchHistory.task_id == reserved_credit.task_id
+                )
+            )
     session.commit()
+    return len(stale)
 
 
 def return_reserved_credit(
@@ -86,6 +290,7 @@ def return_reserved_credit(
 ) -> None:
     amount = reserved_credit.credits_reserved
     user = session.get(User, reserved_credit.user_id)
-    get_credit(session, user.id, amount)  # type: ignore
+    if reserved_credit.status == "reserved":
+        consume_credit(session, user.id, 0, amount)  # type: ignore
     session.delete(reserved_credit)
-    session.commit()
+    get_credit(session, user.id, amount)  # type: ignore
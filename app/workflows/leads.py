@@ -0,0 +1,154 @@
+from typing import Any
+
+from sqlalchemy import Integer, String, any_, bindparam, literal, union_all
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import aliased, selectinload
+from sqlmodel import Session, func, select
+from sqlmodel.sql.expression import SelectOfScalar
+
+from app.models import BusinessLead, PeopleDataRequest, PeopleLead, Work
+
+
+def resolve_lead_ids(
+    session: Session, source: str, keys: list[str]
+) -> list[int]:
+    """
+    Ids of the business leads with the given phone numbers, or of the
+    people leads with the given names, in the order of keys. Keys without
+    a lead are skipped and a name shared by several people resolves to
+    the first of them.
+    """
+    if not keys:
+        return []
+
+    lead_ids = dict(session.exec(lead_ids_statement(source, keys)).all())
+    return [lead_ids[key] for key in keys if key in lead_ids]
+
+
+def lead_ids_statement(source: str, keys: list[str]) -> Any:
+    if source == "business":
+        id_column, key_column = BusinessLead.id, BusinessLead.company_phone
+    else:
+        id_column, key_column = PeopleLead.id, PeopleLead.name
+
+    # one WHERE key = ANY(:keys) instead of a query per key
+    return (
+        select(key_column, func.min(id_column))
+        .where(
+            key_column
+            == any_(bindparam("keys", list(set(keys)), type_=ARRAY(String)))
+        )
+        .group_by(key_column)
+    )
+
+
+def search_business_leads(
+    businesses: list[str] | None,
+    states: list[str] | None,
+    cities: list[str] | None,
+    limit: int,
+) -> SelectOfScalar[BusinessLead]:
+    """
+    Business leads of the given types in the given states and/or cities.
+    The indexes on (business_type, state, city) and (business_type, city)
+    are laid out for these filter combinations.
+    """
+    statement = select(BusinessLead)
+    if businesses:
+        statement = statement.where(BusinessLead.business_type.in_(businesses))
+    if states:
+        statement = statement.where(BusinessLead.state.in_(states))
+    if cities:
+        statement = statement.where(BusinessLead.city.in_(cities))
+    return statement.limit(limit)
+
+
+def search_people_leads(
+    items: list[PeopleDataRequest], limit: int
+) -> SelectOfScalar[PeopleLead]:
+    """
+    People leads of every item, up to limit per item, item after item, in
+    one query. Every item is a branch of a UNION ALL with its own LIMIT, so
+    each stops on the (state, city, street) index as soon as it has
+    enough leads.
+    """
+    branches = []
+    for number, item in enumerate(items):
+        statement = select(
+            PeopleLead, literal(number, Integer).label("item")
+        ).where(PeopleLead.city == item.city, PeopleLead.state == item.state)
+        if item.streets:
+            statement = statement.where(PeopleLead.street.in_(item.streets))
+        branches.append(statement.limit(limit))
+
+    leads = union_all(*branches).subquery()
+    return select(aliased(PeopleLead, leads)).order_by(leads.c.item)
+
+
+def _id_in(column: Any, ids: list[int]) -> Any:
+    # a single array parameter however many ids there are
+    return column == any_(bindparam(None, ids, type_=ARRAY(Integer)))
+
+
+def load_search_history_leads(
+    session: Session, source: str, lead_ids: list[int]
+) -> list[dict[str, Any]]:
+    """
+    The leads of a search history with their owner, or with their house,
+    education and works, in the order of lead_ids. Runs the same few
+    queries however many leads there are, ids of deleted leads are
+    skipped.
+    """
+    if not lead_ids:
+        return []
+
+    if source == "business":
+        statement = (
+            select(BusinessLead)
+            .where(_id_in(BusinessLead.id, lead_ids))
+            .options(selectinload(BusinessLead.employee))
+        )
+        leads = {lead.id: lead for lead in session.exec(statement)}
+        return [
+            {**lead.model_dump(), "employee": lead.employee}
+            for lead in (leads.get(lead_id) for lead_id in lead_ids)
+            if lead
+        ]
+
+    statement = (
+        select(PeopleLead)
+        .where(_id_in(PeopleLead.id, lead_ids))
+        .options(
+            selectinload(PeopleLead.house),
+            selectinload(PeopleLead.education),
+        )
+    )
+    leads = {lead.id: lead for lead in session.exec(statement)}
+
+    # works are referenced by the works_id list of the lead
+    work_ids = {
+        work_id
+        for lead in leads.values()
+        if isinstance(lead.works_id, list)
+        for work_id in lead.works_id
+    }
+    works = {}
+    if work_ids:
+        statement = select(Work).where(_id_in(Work.id, list(work_ids)))
+        works = {work.id: work for work in session.exec(statement)}
+
+    return [
+        {
+            **lead.model_dump(),
+            "house": lead.house,
+            "education": lead.education,
+            "works": [
+                works.get(work_id)
+                for work_id in (
+                    lead.works_id if isinstance(lead.works_id, list) else []
+                )
+            ],
+        }
+        for lead in (leads.get(lead_id) for lead_id in lead_ids)
+        if lead
+    ]
@@ -0,0 +1,74 @@
+import datetime
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session
+
+from app.models import MonthlyUsage
+from app.workflows.user_cache import invalidate_user
+
+
+def month_of(moment: datetime.datetime) -> datetime.date:
+    return moment.date().replace(day=1)
+
+
+def _add_to_month(
+    session: Session,
+    user_id: int,
+    moment: datetime.datetime,
+    credits_used: int = 0,
+    money_spent: float = 0,
+) -> None:
+    # a single upsert, concurrent requests of the same user add up instead
+    # of overwriting each other
+    table = MonthlyUsage.__table__
+    statement = insert(table).values(
+        user_id=user_id,
+        month=month_of(moment),
+        credits_used=credits_used,
+        money_spent=money_spent,
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.month],
+        set_={
+            "credits_used": table.c.credits_used
+            + statement.excluded.credits_used,
+            "money_spent": table.c.money_spent
+            + statement.excluded.money_spent,
+        },
+    )
+    session.connection().execute(statement)
+
+    # the row may already be in the identity map with the old totals
+    key = session.identity_key(MonthlyUsage, (user_id, month_of(moment)))
+    if key in session.identity_map:
+        session.expire(session.identity_map[key])
+    invalidate_user(session, user_id)
+
+
+def record_usage(
+    session: Session,
+    user_id: int,
+    credits_used: int,
+    search_time: datetime.datetime,
+) -> None:
+    """
+    Add the credits of a search to the month of its search_time. The caller
+    commits, together with the search history change.
+    """
+    if credits_used:
+        _add_to_month(session, user_id, search_time, credits_used=credits_used)
+
+
+def record_spend(
+    session: Session,
+    user_id: int,
+    amount: float,
+    created_at: datetime.datetime,
+) -> None:
+    """
+    Add a succeeded transaction to the month it was created in, a negative
+    amount takes it back out. The caller commits, together with the
+    transaction status change.
+    """
+    if amount:
+        _add_to_month(session, user_id, created_at, money_spent=amount)
@@ -1,14 +1,16 @@
 import json
-from typing import Dict
+import time
+from collections.abc import AsyncIterator
+from typing import Any
 
-import redis
-import requests
-from sqlmodel import Session, select
+from redis.client import Pipeline
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.core.config import settings
 from app.core.logs import get_logger
+from app.core.redis_client import get_json_many, get_redis, get_sync_redis
+from app.core.scraper_client import ScraperUnavailable, get_scraper_client
 from app.models import (
-    Address,
     InternalPeopleLeadDataRequest,
     InternalScrapingDataRequest,
     PeopleLeadDataRequest,
@@ -21,33 +23,139 @@ from app.models import (
 
 logger = get_logger()
 
-redis_db = redis.from_url(settings.REDIS_URI, decode_responses=True)
+PROGRESS_FIELDS = (
+    "status",
+    "scraped_results",
+    "total_results",
+    "looked_owner",
+)
+FINAL_STATUSES = {"finished", "failed"}
+# ids of the events the scraper is still reporting progress for, scored
+# by their start time, the progress flusher copies their progress to
+# postgres and drops the ones running for longer than
+# SCRAPER_EVENT_MAX_SECONDS
+ACTIVE_EVENTS = "scraping_events:running"
+
+
+def progress_key(event_id: int) -> str:
+    # the scraper sets this key, publishing to the channel of the same
+    # name wakes the progress streams up
+    return f"scraping_event_{event_id}"
+
+
+def publish_scraper_progress(event_id: int, **fields: Any) -> None:
+    """
+    Merge fields into the progress of the event and notify the progress
+    streams of it.
+    """
+    key = progress_key(event_id)
+
+    def merge(pipeline: Pipeline) -> None:
+        # the scraper writes the same key, the transaction is retried when
+        # the key changed after it was read
+        progress = json.loads(pipeline.get(key) or "{}")
+        progress.update(fields)
+        pipeline.multi()
+        pipeline.set(key, json.dumps(progress))
+        pipeline.publish(key, json.dumps(fields))
+        if fields.get("status") in FINAL_STATUSES:
+            pipeline.zrem(ACTIVE_EVENTS, event_id)
+
+    get_sync_redis().transaction(merge, key)
+
+
+async def iter_scraper_progress(
+    event: ScraperEventData, poll_seconds: float
+) -> AsyncIterator[dict[str, Any]]:
+    """
+    Progress of the event as it changes, read from redis only. The first
+    item is the whole state, then only the changed fields, an empty dict
+    when nothing happened for poll_seconds. Ends at a final status.
+
+    A message on the channel of the event makes the stream read the key
+    at once, without one it is read every poll_seconds, so scrapers that
+    only set the key are followed too.
+    """
+    key = progress_key(event.id)
+    last = {field: getattr(event, field) for field in PROGRESS_FIELDS}
+    yield dict(last)
+    if last["status"] in FINAL_STATUSES:
+        return
+
+    # waits on pub/sub, the stream must not hold a thread
+    client = get_redis()
+    pubsub = client.pubsub()
+    await pubsub.subscribe(key)
+    try:
+        while True:
+            progress = await client.get(key)
+            current = json.loads(progress) if progress else {}
+            delta = {
+                field: current[field]
+                for field in PROGRESS_FIELDS
+                if field in current and current[field] != last[field]
+            }
+            if delta:
+                last.update(delta)
+                yield delta
+            if last["status"] in FINAL_STATUSES:
+                return
+            # None also comes back right after the subscribe confirmation
+            waited_since = time.monotonic()
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=poll_seconds
+            )
+            if message is None and (
+                time.monotonic() - waited_since >= poll_seconds
+            ):
+                yield {}
+    finally:
+        await pubsub.unsubscribe(key)
+        await pubsub.aclose()
+
+
+async def read_scraper_event(
+    session: Session, event_id: int, user_id: int
+) -> ScraperEventData | None:
+    """
+    The event of the user with the progress the scraper reported to redis,
+    None for the events of other users. Nothing is written, the progress
+    flusher persists the progress.
+    """
+    event = await run_in_threadpool(session.get, ScraperEventData, event_id)
+    if event is None or event.user_id != user_id:
+        return None
+    (event_data,) = await get_json_many([progress_key(event.id)])
+    if event_data:
+        # a detached copy, the progress must not be flushed by the session
+        session.expunge(event)
+        event_data["task_id"] = event.task_id
+        event_data["status"] = event.status
+        event.sqlmodel_update(
+            ScraperEventUpdate(**event_data).model_dump(exclude_unset=True)
+        )
+    return event
 
 
-def update_scraper_data_event_from_redis(
-    session: Session, event_id: int
-) -> dict[str, int] | ScraperEventData:
-    event_data = redis_db.get(f"scraping_event_{event_id}")
+def apply_scraper_event_progress(
+    session: Session, event: ScraperEventData
+) -> bool:
+    """
+    Copy the progress the scraper reported to redis onto the event
+    without committing it. Returns False when there is no progress yet.
+    """
+    event_data = get_sync_redis().get(progress_key(event.id))
     if not event_data:
-        return {"status": 404}
+        return False
 
     event_data = json.loads(event_data)
-    event = _get_scraper_data_event(session, event_id)
-    if event is None:
-        return {"status": 404}
     event_data["task_id"] = event.task_id
     event_data["status"] = event.status
-    _update_scraper_data_event(
-        session, event, ScraperEventUpdate(**event_data)
+    event.sqlmodel_update(
+        ScraperEventUpdate(**event_data).model_dump(exclude_unset=True)
     )
-    return event
-
-
-def _get_scraper_data_event(
-    session: Session, event_id: int
-) -> ScraperEventData:
-    scraper_event = session.get(ScraperEventData, event_id)
-    return scraper_event
+    session.add(event)
+    return True
 
 
 def _create_scraper_data_event(session: Session, data: ScraperEventCreate):
@@ -68,20 +176,18 @@ def _update_scraper_data_event(
     session.refresh(scraper_event)
 
 
-def send_start_scraper_command(
-    session: Session,
-    user: User,
-    data: ScrapingDataRequest | PeopleLeadDataRequest,
-    source: str,
-) -> dict:
-    scraper_event = _create_scraper_data_event(
+async def _start_scraper_event(
+    session: Session, user: User, source: str
+) -> ScraperEventData:
+    scraper_event = await run_in_threadpool(
+        _create_scraper_data_event,
         session,
         ScraperEventCreate(user_id=user.id, status="started", source=source),
     )
 
-    redis_key = f"scraping_event_{scraper_event.id}"
-    redis_db.set(
-        redis_key,
+    pipeline = get_redis().pipeline(transaction=False)
+    pipeline.set(
+        progress_key(scraper_event.id),
         json.dumps(
             {
                 "scraped_results": 0,
@@ -90,6 +196,29 @@ def send_start_scraper_command(
             }
         ),
     )
+    pipeline.zadd(ACTIVE_EVENTS, {scraper_event.id: time.time()})
+    await pipeline.execute()
+    return scraper_event
+
+
+def _fail_scraper_event(
+    session: Session, scraper_event: ScraperEventData
+) -> None:
+    # the scraper did not start, nothing will report progress for the event
+    scraper_event.status = "failed"
+    session.add(scraper_event)
+    session.commit()
+    publish_scraper_progress(scraper_event.id, status="failed")
+
+
+async def send_start_scraper_command(
+    session: Session,
+    user: User,
+    data: ScrapingDataRequest | PeopleLeadDataRequest,
+    source: str,
+) -> dict:
+    # the database calls are blocking, they run in the thread pool
+    scraper_event = await _start_scraper_event(session, user, source)
 
     if source == "business":
         data = InternalScrapingDataRequest(
@@ -108,17 +237,20 @@ def send_start_scraper_command(
             email=data.email,
         )
 
-    if source == "business":
-        request_url = f"{settings.INTERNAL_SCRAPER_API_ADDRESS}/start-scraping?token=supersecrettoken"
-        response = requests.post(request_url, json=data.model_dump())
-    else:
-        request_url = f"{settings.INTERNAL_SCRAPER_API_ADDRESS}/start-scraping-people?token=supersecrettoken"
-        response = requests.post(request_url, json=data.model_dump())
+    try:
+        response = await get_scraper_client().start_scraping(
+            source, data.model_dump()
+        )
+    except ScraperUnavailable as e:
+        logger.error(f"Failed to start the scraper. {e}")
+        await run_in_threadpool(_fail_scraper_event, session, scraper_event)
+        return {"status": False}
 
     if response.status_code != 200:
         logger.error(
             f"Failed to start the scraper. Status code: {response.status_code}. Response: {response.text}"
         )
+        await run_in_threadpool(_fail_scraper_event, session, scraper_event)
         return {"status": False}
 
     task_id = response.json().get("task_id")
@@ -126,9 +258,11 @@ def send_start_scraper_command(
         logger.error(
             f"Failed to start the scraper. Task ID not found in response"
         )
+        await run_in_threadpool(_fail_scraper_event, session, scraper_event)
         return {"status": False}
 
-    _update_scraper_data_event(
+    await run_in_threadpool(
+        _update_scraper_data_event,
         session,
         scraper_event,
         ScraperEventUpdate(
@@ -0,0 +1,92 @@
+import datetime
+import threading
+
+from cachetools import TTLCache
+from sqlalchemy import func
+from sqlmodel import Session, select
+from sqlmodel.sql.expression import Select
+
+from app.core.config import settings
+from app.models import SearchHistory, Transaction, UserStats
+from app.workflows.ledger import month_of
+
+# sync routes run in a thread pool, TTLCache is not thread safe
+_stats_lock = threading.Lock()
+_stats_cache: TTLCache = TTLCache(
+    maxsize=10000, ttl=settings.USER_STATS_CACHE_TTL
+)
+
+
+def month_window(
+    month: datetime.date,
+) -> tuple[datetime.datetime, datetime.datetime]:
+    # half-open, [first day of the month, first day of the next one)
+    start = datetime.datetime.combine(month.replace(day=1), datetime.time())
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return start, end
+
+
+def search_stats_statement(user_id: int, month: datetime.date) -> Select:
+    start, end = month_window(month)
+    return select(
+        func.count(SearchHistory.id),
+        func.coalesce(func.sum(SearchHistory.credits_used), 0),
+    ).where(
+        SearchHistory.user_id == user_id,
+        SearchHistory.search_time >= start,
+        SearchHistory.search_time < end,
+    )
+
+
+def spend_stats_statement(user_id: int, month: datetime.date) -> Select:
+    start, end = month_window(month)
+    return select(
+        func.count(Transaction.id),
+        func.coalesce(func.sum(Transaction.amount), 0),
+    ).where(
+        Transaction.user_id == user_id,
+        Transaction.created_at >= start,
+        Transaction.created_at < end,
+        Transaction.status == "succeeded",
+    )
+
+
+def compute_monthly_stats(
+    session: Session, user_id: int, month: datetime.date
+) -> UserStats:
+    """
+    Usage of a user in a calendar month, summed by the database over the
+    (user_id, search_time) and (user_id, created_at) index ranges.
+    """
+    searches, credits_used = session.exec(
+        search_stats_statement(user_id, month)
+    ).one()
+    transactions, money_spent = session.exec(
+        spend_stats_statement(user_id, month)
+    ).one()
+    return UserStats(
+        month=month.replace(day=1),
+        searches=searches,
+        credits_used=credits_used,
+        leads_collected=credits_used,
+        transactions=transactions,
+        money_spent=money_spent,
+    )
+
+
+def get_monthly_stats(
+    session: Session, user_id: int, month: datetime.date | None = None
+) -> UserStats:
+    # dashboards poll the stats, a few seconds old numbers are fine
+    month = month_of(datetime.datetime.now()) if month is None else month
+    key = (user_id, month.replace(day=1))
+    with _stats_lock:
+        stats = _stats_cache.get(key)
+    if stats is None:
+        stats = compute_monthly_stats(session, user_id, month)
+        with _stats_lock:
+            _stats_cache[key] = stats
+    return stats
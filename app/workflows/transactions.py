@@ -1,10 +1,18 @@
 from app.models import Transaction, TransactionCreate
+from app.workflows.ledger import record_spend
 from sqlmodel import Session, select
 
 
 def create_transaction(session: Session, transaction: TransactionCreate):
     db_transaction = Transaction.model_validate(transaction)
     session.add(db_transaction)
+    if db_transaction.status == "succeeded":
+        record_spend(
+            session,
+            db_transaction.user_id,  # type: ignore
+            db_transaction.amount,
+            db_transaction.created_at,
+        )
     session.commit()
     session.refresh(db_transaction)
     return db_transaction
@@ -27,6 +35,22 @@ def get_transaction_by_stripe_payment_id(
 def update_transaction_status(
     session: Session, transaction: Transaction, status: str
 ):
+    # the monthly spend only counts succeeded transactions
+    succeeded = (transaction.status == "succeeded", status == "succeeded")
+    if succeeded == (False, True):
+        record_spend(
+            session,
+            transaction.user_id,  # type: ignore
+            transaction.amount,
+            transaction.created_at,
+        )
+    elif succeeded == (True, False):
+        record_spend(
+            session,
+            transaction.user_id,  # type: ignore
+            -transaction.amount,
+            transaction.created_at,
+        )
     transaction.status = status
     session.commit()
     session.refresh(transaction)
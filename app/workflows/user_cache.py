@@ -0,0 +1,87 @@
+import threading
+from typing import Any
+
+from cachetools import TTLCache
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models import Credit, User, UserPublic
+
+# sync routes run in a thread pool, TTLCache is not thread safe
+_users_lock = threading.Lock()
+_users_cache: TTLCache = TTLCache(
+    maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL
+)
+# bumped by every invalidation, a snapshot loaded before one is not cached
+_generation = 0
+
+_PENDING = "invalidated_user_ids"
+
+
+def load_user_snapshot(session: Session, user_id: int) -> UserPublic | None:
+    # the balance is joined, the month usage is one primary key lookup
+    statement = (
+        select(User).where(User.id == user_id).options(joinedload(User.credits))  # type: ignore
+    )
+    user = session.exec(statement).first()
+    if user is None:
+        return None
+    return UserPublic.model_validate(user)
+
+
+def get_user_snapshot(session: Session, user_id: int) -> UserPublic | None:
+    """
+    Read-only snapshot of the user with its credits, up to USER_CACHE_TTL
+    seconds old when the user changed in another process. Changes made in
+    this process drop the snapshot once they are committed.
+    """
+    with _users_lock:
+        snapshot = _users_cache.get(user_id)
+        generation = _generation
+    if snapshot is not None:
+        return snapshot
+
+    snapshot = load_user_snapshot(session, user_id)
+    if snapshot is not None:
+        with _users_lock:
+            if generation == _generation:
+                _users_cache[user_id] = snapshot
+    return snapshot
+
+
+def forget_user(user_id: int) -> None:
+    global _generation
+    with _users_lock:
+        _users_cache.pop(user_id, None)
+        _generation += 1
+
+
+def invalidate_user(session: Session, user_id: int) -> None:
+    """
+    Drop the snapshot of the user now and again when the session commits,
+    so a request reading in between does not keep the old values.
+    """
+    forget_user(user_id)
+    session.info.setdefault(_PENDING, set()).add(user_id)
+
+
+@event.listens_for(Session, "before_flush")
+def _invalidate_flushed_users(session: Session, *_args: Any) -> None:
+    for obj in (*session.dirty, *session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            invalidate_user(session, obj.id)
+        elif isinstance(obj, Credit) and obj.user_id is not None:
+            invalidate_user(session, obj.user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_committed_users(session: Session) -> None:
+    for user_id in session.info.pop(_PENDING, ()):
+        forget_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_users(session: Session) -> None:
+    session.info.pop(_PENDING, None)
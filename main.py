@@ -1,4 +1,5 @@
 import os
+from contextlib import asynccontextmanager
 
 import sentry_sdk
 from fastapi import FastAPI, Request, status
@@ -7,11 +8,17 @@ from fastapi.responses import JSONResponse
 from fastapi.routing import APIRoute
 from fastapi.staticfiles import StaticFiles
 from fastapi_pagination import add_pagination
+from sqlmodel import Session
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
 from app.core.config import settings
+from app.core.db import engine
 from app.core.logs import get_logger
+from app.core.redis_client import close_redis, open_redis
+from app.core.scraper_client import close_scraper_client, open_scraper_client
+from app.core.security import close_password_pool
+from app.workflows.business_types import load_business_type_catalog
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -39,7 +46,24 @@ def read_markdown(file_path):
 file_path = "description.md"
 description = read_markdown(file_path)
 
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # validation and search of business types run against this copy
+    with Session(engine) as session:
+        load_business_type_catalog(session)
+    # one connection pool to the scraper API for the whole process
+    await open_scraper_client()
+    # one redis connection pool for the whole process
+    await open_redis()
+    yield
+    await close_scraper_client()
+    await close_redis()
+    close_password_pool()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
@@ -55,11 +79,16 @@ app.mount(
 )
 
 
+request_logger = get_logger("fastapi")
+
+
 @app.middleware("http")
 async def log_stuff(request: Request, call_next):
-    logger = get_logger("fastapi")
     response = await call_next(request)
-    logger.debug(f"{request.method} {request.url} {response.status_code}")
+    # formatted only for the records that are kept, see app/core/logs.py
+    request_logger.debug(
+        "%s %s %s", request.method, request.url, response.status_code
+    )
     return response
 
 